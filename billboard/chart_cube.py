@@ -0,0 +1,318 @@
+"""
+Precomputed count cube for the Billboard chart analyses.
+
+The notebooks recompute groupby('Year').count() and groupby(['Genre', 'Year'])
+on the whole chart for every plot, and then filter each decade and each genre
+again with boolean masks inside Python loops. Here the counts are built once
+into a Year x Country x Genre x Position bucket array, saved to an .npz file
+and reused:
+
+    cube = ChartCube.load_or_build()
+    cube.rollup('Year', country='United States')         # songsUS.groupby('Year').count()
+    cube.rollup(['Genre', 'Year'], country='Brazil')      # groupby(['Genre', 'Year'])
+    cube.rollup('Genre', decade=1990, country='Brazil')   # the per-decade loop
+    cube.count(genre='rock', bucket='1-10')               # one number
+
+The year axis is contiguous, so a year is an offset, and a running sum along
+it makes any year or decade range two array lookups. The cost of a query
+depends only on the size of the slice asked for, never on the number of
+chart rows.
+
+update() only counts the years that are not in the cube yet; new countries
+and genres extend their axes. The .npz also records the byte length of the
+CSV it was counted from and a hash of those bytes. load_or_build() then:
+- returns the saved cube if the CSV is the same;
+- if the CSV only grew (its first bytes still hash the same) and the new
+  rows are all of years the cube does not have, parses only the appended
+  tail and passes it to update();
+- otherwise (past rows edited, e.g. by enrich_artists.py, or rows appended
+  to a year already counted) counts the whole CSV again.
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+SONGS_CSV = 'songs_and_artists_updated.csv'
+CUBE_FILE = 'chart_cube.npz'
+# Position buckets: [1, 10], [11, 25], [26, 50], [51, 100]
+BUCKET_EDGES = (1, 11, 26, 51, 101)
+UNKNOWN = 'Unknown'
+DIMENSIONS = ('Year', 'Country', 'Genre', 'Bucket')
+
+
+def bucket_labels(edges=BUCKET_EDGES):
+    return [f"{start}-{end - 1}" for start, end in zip(edges[:-1], edges[1:])]
+
+
+def _hash_prefix(csv_path, length):
+    """BLAKE2b of the first `length` bytes of the file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(csv_path, 'rb') as f:
+        while length > 0:
+            block = f.read(min(length, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            length -= len(block)
+    return digest.hexdigest()
+
+
+def csv_signature(csv_path, length=None):
+    """'length:hash' of the CSV's first `length` bytes (the whole file by default)."""
+    if length is None:
+        length = os.path.getsize(csv_path)
+    return f"{length}:{_hash_prefix(csv_path, length)}"
+
+
+def read_csv_tail(csv_path, offset):
+    """The rows after byte `offset` (a line boundary) as a DataFrame, with the CSV's header."""
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        tail = f.read()
+    return pd.read_csv(io.BytesIO(header + tail))
+
+
+class ChartCube:
+    """Song counts by Year x Country x Genre x Position bucket, with O(1) year ranges."""
+
+    def __init__(self, counts, first_year, countries, genres, bucket_edges=BUCKET_EDGES, source=None):
+        self.counts = counts
+        self.first_year = int(first_year)
+        self.countries = list(countries)
+        self.genres = list(genres)
+        self.bucket_edges = tuple(int(edge) for edge in bucket_edges)
+        self.buckets = bucket_labels(self.bucket_edges)
+        self.source = source  # "length:hash" of the CSV bytes the cube was counted from
+        self._index = {
+            'Country': {name: i for i, name in enumerate(self.countries)},
+            'Genre': {name: i for i, name in enumerate(self.genres)},
+            'Bucket': {name: i for i, name in enumerate(self.buckets)},
+        }
+        self._running = None  # running sum along the years, computed on the first range query
+
+    @property
+    def years(self):
+        return list(range(self.first_year, self.first_year + self.counts.shape[0]))
+
+    # --- building ---
+
+    @classmethod
+    def build(cls, df, bucket_edges=BUCKET_EDGES):
+        """Count every row of the chart DataFrame (Year, Position, Country, Genre)."""
+        years = df['Year'].astype(int)
+        cube = cls(np.zeros((0, 0, 0, len(bucket_edges) - 1), dtype=np.uint32),
+                   years.min() if len(df) else 0, [], [], bucket_edges)
+        cube._add(df)
+        return cube
+
+    def update(self, df):
+        """Count the rows of the years that are not in the cube yet. Returns the years added."""
+        years = df['Year'].astype(int)
+        if self.counts.shape[0]:
+            known = (years >= self.first_year) & (years < self.first_year + self.counts.shape[0])
+            df = df[~known.to_numpy()]
+        new_years = sorted(int(year) for year in df['Year'].astype(int).unique())
+        if new_years:
+            self._add(df)
+        return new_years
+
+    def _codes(self, dimension, values):
+        """Axis index of each value, appending the labels the cube has not seen."""
+        labels = self.countries if dimension == 'Country' else self.genres
+        index = self._index[dimension]
+        for value in pd.unique(values):
+            if value not in index:
+                index[value] = len(labels)
+                labels.append(value)
+        return values.map(index).to_numpy()
+
+    def _add(self, df):
+        years = df['Year'].astype(int).to_numpy()
+        countries = self._codes('Country', df['Country'].fillna(UNKNOWN).astype(str))
+        genres = self._codes('Genre', df['Genre'].fillna(UNKNOWN).astype(str))
+        buckets = np.searchsorted(self.bucket_edges, df['Position'].astype(int).to_numpy(), side='right') - 1
+        if ((buckets < 0) | (buckets >= len(self.buckets))).any():
+            raise ValueError(f"positions outside of the buckets {self.buckets}")
+
+        if not self.counts.shape[0]:
+            self.first_year = int(years.min())
+        first_year = min(self.first_year, int(years.min()))
+        last_year = max(self.first_year + self.counts.shape[0] - 1, int(years.max()))
+        before = self.first_year - first_year
+        padding = ((before, last_year - first_year + 1 - before - self.counts.shape[0]),
+                   (0, len(self.countries) - self.counts.shape[1]),
+                   (0, len(self.genres) - self.counts.shape[2]),
+                   (0, 0))
+        self.counts = np.pad(self.counts, padding)
+        self.first_year = first_year
+        np.add.at(self.counts, (years - first_year, countries, genres, buckets), 1)
+        self._running = None
+
+    # --- persistence ---
+
+    def save(self, path=CUBE_FILE):
+        np.savez_compressed(path, counts=self.counts, first_year=self.first_year,
+                            countries=np.array(self.countries, dtype=str), genres=np.array(self.genres, dtype=str),
+                            bucket_edges=np.array(self.bucket_edges), source=np.array(self.source or '', dtype=str))
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        with np.load(path, allow_pickle=False) as saved:
+            source = str(saved['source']) if 'source' in saved.files else None
+            return cls(saved['counts'], saved['first_year'], saved['countries'].tolist(),
+                       saved['genres'].tolist(), saved['bucket_edges'].tolist(), source or None)
+
+    @classmethod
+    def build_from_csv(cls, csv_path=SONGS_CSV):
+        """build() from the CSV, remembering its size and modification time."""
+        source = csv_signature(csv_path)
+        cube = cls.build(pd.read_csv(csv_path))
+        cube.source = source
+        return cube
+
+    @classmethod
+    def load_or_build(cls, csv_path=SONGS_CSV, path=CUBE_FILE):
+        """
+        The saved cube, extended with the rows appended to the CSV since it was
+        saved; counted again from the whole CSV when older rows changed.
+        """
+        if os.path.exists(path):
+            cube = cls.load(path)
+            if cube._extend_from(csv_path):
+                cube.save(path)
+                return cube
+            if cube.source == csv_signature(csv_path):
+                return cube
+        cube = cls.build_from_csv(csv_path)
+        cube.save(path)
+        return cube
+
+    def _extend_from(self, csv_path):
+        """
+        update() with the rows appended to the CSV after the bytes the cube was
+        counted from. False if the CSV did not just grow with rows of new years.
+        """
+        length, _, digest = (self.source or '').partition(':')
+        if not length.isdigit() or not int(length) < os.path.getsize(csv_path):
+            return False
+        length = int(length)
+        if _hash_prefix(csv_path, length) != digest:
+            return False
+        with open(csv_path, 'rb') as f:
+            f.seek(length - 1)
+            if f.read(1) != b'\n':
+                return False  # the old last line was continued
+        tail = read_csv_tail(csv_path, length)
+        years = tail['Year'].astype(int)
+        if len(tail) and ((years >= self.first_year) & (years < self.first_year + self.counts.shape[0])).any():
+            return False  # rows of years already counted: update() would skip them
+        self.update(tail)
+        self.source = csv_signature(csv_path)
+        return True
+
+    # --- queries ---
+
+    def _selection(self, dimension, value):
+        """Axis indices (a slice or a list) for a label or a list of labels (None = all)."""
+        if value is None:
+            return slice(None)
+        values = [value] if isinstance(value, str) else list(value)
+        return [self._index[dimension][v] for v in values if v in self._index[dimension]]
+
+    def _year_range(self, years=None, decade=None):
+        """(start, stop) offsets on the year axis, clipped to the cube."""
+        if decade is not None:
+            years = (decade, decade + 9)
+        elif isinstance(years, (int, np.integer)):
+            years = (years, years)
+        start, end = years if years is not None else (self.first_year, self.first_year + self.counts.shape[0] - 1)
+        start = min(max(start - self.first_year, 0), self.counts.shape[0])
+        stop = min(max(end - self.first_year + 1, start), self.counts.shape[0])
+        return start, stop
+
+    def _range_total(self, start, stop):
+        """Counts summed over the years [start, stop) as a Country x Genre x Bucket array."""
+        if self._running is None:
+            self._running = np.concatenate([np.zeros((1,) + self.counts.shape[1:], dtype=np.uint32),
+                                            np.cumsum(self.counts, axis=0, dtype=np.uint32)])
+        return self._running[stop] - self._running[start]
+
+    def rollup(self, by, years=None, decade=None, country=None, genre=None, bucket=None):
+        """
+        Counts grouped by one or more of 'Year', 'Country', 'Genre' and 'Bucket',
+        for the years (a year or an inclusive (start, end) pair) or the decade
+        and the country/genre/bucket asked for (a label, a list, or None for all).
+        Groups with no songs are left out, like in a groupby.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        start, stop = self._year_range(years, decade)
+        if 'Year' in by:
+            block = self.counts[start:stop]
+            axes = {'Year': self.years[start:stop]}
+        else:
+            block = self._range_total(start, stop)[np.newaxis]
+            axes = {'Year': [None]}
+        axes.update(Country=self.countries, Genre=self.genres, Bucket=self.buckets)
+        for axis, (dimension, value) in enumerate(zip(DIMENSIONS[1:], (country, genre, bucket)), 1):
+            selection = self._selection(dimension, value)
+            block = np.take(block, np.arange(block.shape[axis])[selection], axis=axis)
+            axes[dimension] = np.asarray(axes[dimension], dtype=object)[selection]
+        kept = [axis for axis, dimension in enumerate(DIMENSIONS) if dimension in by]
+        block = block.sum(axis=tuple(axis for axis in range(4) if axis not in kept), dtype=np.int64)
+        if len(by) == 1:
+            result = pd.Series(block, index=pd.Index(axes[by[0]], name=by[0]), name='count')
+        else:
+            order = [dimension for dimension in DIMENSIONS if dimension in by]
+            index = pd.MultiIndex.from_product([axes[dimension] for dimension in order], names=order)
+            result = pd.Series(block.ravel(), index=index, name='count').reorder_levels(by)
+        return result[result > 0].sort_index()
+
+    def count(self, years=None, decade=None, country=None, genre=None, bucket=None):
+        """Number of chart entries in a slice (same filters as rollup)."""
+        start, stop = self._year_range(years, decade)
+        total = self._range_total(start, stop)
+        selections = [self._selection(dimension, value)
+                      for dimension, value in zip(DIMENSIONS[1:], (country, genre, bucket))]
+        return int(total[np.ix_(*(np.arange(size)[selection]
+                                 for size, selection in zip(total.shape, selections)))].sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the Billboard count cube.")
+    parser.add_argument('--songs', default=SONGS_CSV, help="chart CSV (Year, Position, Country, Genre)")
+    parser.add_argument('--cube', default=CUBE_FILE, help="where the cube is saved")
+    parser.add_argument('--rebuild', action='store_true', help="count every year again")
+    parser.add_argument('--by', nargs='+', choices=DIMENSIONS, help="print a roll-up by these dimensions")
+    parser.add_argument('--decade', type=int)
+    parser.add_argument('--country')
+    parser.add_argument('--genre')
+    parser.add_argument('--bucket')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.rebuild or not os.path.exists(args.cube):
+        cube = ChartCube.build_from_csv(args.songs)
+        cube.save(args.cube)
+    else:
+        cube = ChartCube.load_or_build(args.songs, args.cube)
+    print(f"Cube {cube.counts.shape} ({len(cube.years)} years, {len(cube.countries)} countries, "
+          f"{len(cube.genres)} genres, buckets {cube.buckets}) ready in {time.perf_counter() - start:.3f}s")
+
+    if args.by:
+        start = time.perf_counter()
+        result = cube.rollup(args.by, decade=args.decade, country=args.country, genre=args.genre,
+                             bucket=args.bucket)
+        elapsed = time.perf_counter() - start
+        print(result.to_string())
+        print(f"Roll-up in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
-import os
 import pandas as pd
 
-# Function to create a DataFrame from filenames in a folder
+import realbook_path  # noqa: F401  (the audio manifest is shared with the realbook scripts)
+from manifesto_audios import CAMINHO_BANCO as manifest_path, ManifestoAudios
+
+# manifest_path is the one audio manifest (SQLite) of all scripts: only new or modified files are read again
+
+# Function to create a DataFrame from the audio files of a folder, as listed by the manifest
 def create_dataframe(folder_path):
-    filenames = [filename for filename in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, filename))]
+    manifest = ManifestoAudios(manifest_path)
+    manifest.atualizar(folder_path, recursivo=False)
+    filenames = [row['nome'] for row in manifest.arquivos(pasta=folder_path)]
+    manifest.fechar()
     df = pd.DataFrame(filenames, columns=['filename'])
     return df
 
@@ -0,0 +1,181 @@
+"""
+Artist enrichment (country and genre) from MusicBrainz, cached and deduplicated.
+
+fetch_artist_info in Billboard_brasil.ipynb searched MusicBrainz once per
+chart row, with a time.sleep(1) after each one. The same artists chart year
+after year, so most of those hours went to repeated lookups. Here:
+
+- the artists are deduplicated (by a normalized name) before any lookup;
+- every answer goes to a persistent SQLite cache, artist -> (country, genre,
+  mbid), including "not found" answers (negative entries, retried after
+  NEGATIVE_TTL). Errors are not cached, so they are retried on the next run;
+- a single token bucket (realbook/controle_taxa.BaldeDeFichas) paces all the
+  lookups at RATE requests per second. The client library's own throttling
+  is turned off so there is only one scheduler.
+
+Each answer is committed as soon as it arrives. A run that stops in the
+middle resumes where it stopped, and later runs only look up new artists.
+
+The host can be pointed at a local stand-in of the MusicBrainz API
+(musicbrainz_local.py) with --host, e.g. for testing.
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+
+import musicbrainzngs as mbz
+import pandas as pd
+
+import realbook_path  # noqa: F401  (the rate limiter is shared with the realbook downloaders)
+from controle_taxa import BaldeDeFichas
+
+SONGS_CSV = 'songs_and_artists.csv'
+OUTPUT_CSV = 'songs_and_artists_updated.csv'
+CACHE_FILE = 'artist_cache.sqlite'
+RATE = 1.0  # requests per second (MusicBrainz allows about 1/s per client)
+NEGATIVE_TTL = 30 * 24 * 3600  # seconds before an artist that was not found is searched again
+UNKNOWN = 'Unknown'
+USER_AGENT = ("MyMusicApp", "1.0", "myemail@example.com")
+
+
+def artist_key(name):
+    """Cache key of an artist: case and spacing do not matter."""
+    return ' '.join(str(name).casefold().split())
+
+
+def fetch_artist_info(artist_name):
+    """
+    First MusicBrainz search result for the artist as {'country', 'genre', 'mbid'},
+    or None if nothing was found. Errors propagate (they are not cached).
+    """
+    result = mbz.search_artists(query=artist_name, limit=1)
+    if not result['artist-list']:
+        return None
+    artist = result['artist-list'][0]
+    tags = artist.get('tag-list', [])
+    return {
+        'country': artist.get('area', {}).get('name', UNKNOWN),
+        'genre': tags[0]['name'] if tags else UNKNOWN,
+        'mbid': artist.get('id'),
+    }
+
+
+class ArtistCache:
+    """Persistent artist -> (country, genre, mbid) cache, with negative entries."""
+
+    def __init__(self, db_path=CACHE_FILE, negative_ttl=NEGATIVE_TTL):
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS artists (
+                artist_key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                found INTEGER NOT NULL,
+                country TEXT,
+                genre TEXT,
+                mbid TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._connection.commit()
+
+    def known(self, now=None):
+        """Keys of the artists with a valid entry (found, or not found less than negative_ttl ago)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT artist_key FROM artists WHERE found = 1 OR fetched_at > ?", (now - self.negative_ttl,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def store(self, name, info):
+        """Save the answer for an artist (`info` is None when it was not found)."""
+        info = info or {}
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO artists (artist_key, name, found, country, genre, mbid, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (artist_key(name), name, bool(info), info.get('country'), info.get('genre'), info.get('mbid'),
+                 time.time()),
+            )
+
+    def table(self):
+        """All the entries as a DataFrame indexed by artist_key."""
+        with self._lock:
+            return pd.read_sql_query("SELECT * FROM artists", self._connection, index_col='artist_key')
+
+    def close(self):
+        self._connection.close()
+
+
+def enrich(df, cache, rate=RATE, fetch=fetch_artist_info):
+    """
+    Look up the artists of `df` that are not in the cache, one request per
+    distinct artist paced by a single token bucket, and return a copy of
+    `df` with the Country and Genre columns. Returns (df, stats).
+    """
+    names = df['Artist'].dropna().astype(str)
+    names = names[names.str.strip() != '']
+    distinct = names.groupby(names.map(artist_key)).first()
+    pending = distinct[~distinct.index.isin(cache.known())]
+    stats = {'rows': len(df), 'artists': len(distinct), 'cached': len(distinct) - len(pending),
+             'found': 0, 'not_found': 0, 'errors': 0}
+    print(f"{stats['rows']} rows, {stats['artists']} distinct artists, {len(pending)} to look up")
+
+    bucket = BaldeDeFichas(rate, capacidade=1)
+    for number, name in enumerate(pending, 1):
+        bucket.retirar()
+        start = time.monotonic()
+        try:
+            info = fetch(name)
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"Error fetching info for artist {name}: {e}")
+            continue
+        finally:
+            # musicbrainzngs retries a 503 by itself, behind the bucket's back: after a slow
+            # lookup the next request waits a full interval instead of following the retry
+            if time.monotonic() - start > 1 / rate:
+                bucket.esvaziar()
+        cache.store(name, info)
+        stats['found' if info else 'not_found'] += 1
+        if number % 100 == 0:
+            print(f"   {number}/{len(pending)} artists looked up")
+
+    table = cache.table()
+    keys = df['Artist'].map(artist_key, na_action='ignore')
+    df = df.copy()
+    df['Country'] = keys.map(table['country']).fillna(UNKNOWN)
+    df['Genre'] = keys.map(table['genre']).fillna(UNKNOWN)
+    return df, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add the artists' country and genre from MusicBrainz.")
+    parser.add_argument('--songs', default=SONGS_CSV, help="chart CSV with an 'Artist' column")
+    parser.add_argument('--out', default=OUTPUT_CSV, help="where to write the CSV with Country and Genre")
+    parser.add_argument('--cache', default=CACHE_FILE, help="SQLite artist cache")
+    parser.add_argument('--rate', type=float, default=RATE, help="MusicBrainz requests per second")
+    parser.add_argument('--host', help="MusicBrainz host (e.g. localhost:8001 for a local stand-in, over http)")
+    args = parser.parse_args()
+
+    mbz.set_useragent(*USER_AGENT)
+    mbz.set_rate_limit(False)  # The token bucket in enrich() is the only scheduler
+    if args.host:
+        mbz.set_hostname(args.host, use_https=False)
+
+    start = time.perf_counter()
+    cache = ArtistCache(args.cache)
+    df, stats = enrich(pd.read_csv(args.songs), cache, args.rate)
+    cache.close()
+    df.to_csv(args.out, index=False)
+    print(f"{stats['cached']} artists from the cache, {stats['found']} found, {stats['not_found']} not found, "
+          f"{stats['errors']} errors (retried on the next run)")
+    print(f"Saved to {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Local stand-in for the MusicBrainz artist search API (/ws/2/artist/?query=...).
+
+Answers from a CSV with Artist, Country and Genre columns (by default the
+songs_and_artists_updated.csv already enriched), in the XML format that
+musicbrainzngs parses. Artists with Unknown country and genre, or absent
+from the CSV, are not found. Each response waits `latency` seconds, and
+requests arriving less than `min_interval` seconds after the previous one
+get a 503, like the real service when a client goes over the rate limit.
+
+    python musicbrainz_local.py --port 8001
+    python enrich_artists.py --host localhost:8001 --cache /tmp/artists.sqlite
+"""
+
+import argparse
+import functools
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+import pandas as pd
+
+from enrich_artists import UNKNOWN, artist_key
+
+ARTISTS_CSV = 'songs_and_artists_updated.csv'
+PORT = 8001
+
+
+class MusicBrainzStandIn(BaseHTTPRequestHandler):
+    def __init__(self, *args, artists, stats, latency, min_interval, **kwargs):
+        self.artists = artists
+        self.stats = stats
+        self.latency = latency
+        self.min_interval = min_interval
+        super().__init__(*args, **kwargs)
+
+    def _too_fast(self):
+        with self.stats['lock']:
+            now = time.monotonic()
+            last, self.stats['last'] = self.stats['last'], now
+            self.stats['requests'] += 1
+            if last is not None and now - last < self.min_interval:
+                self.stats['rejected'] += 1
+                return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.startswith('/ws/2/artist'):
+            self.send_error(404)
+            return
+        if self._too_fast():
+            self.send_error(503, "Rate limit exceeded")
+            return
+        time.sleep(self.latency)
+        query = parse_qs(url.query).get('query', [''])[0]
+        body = self._search_result(self.artists.get(artist_key(query)), query).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _search_result(artist, query):
+        if artist is None:
+            listing = '<artist-list count="0" offset="0"/>'
+        else:
+            area = f'<area><name>{escape(artist["country"])}</name></area>' if artist['country'] != UNKNOWN else ''
+            tags = (f'<tag-list><tag count="1"><name>{escape(artist["genre"])}</name></tag></tag-list>'
+                    if artist['genre'] != UNKNOWN else '')
+            listing = (f'<artist-list count="1" offset="0"><artist id={quoteattr(artist["mbid"])} ns2:score="100">'
+                       f'<name>{escape(query)}</name><sort-name>{escape(query)}</sort-name>{area}{tags}'
+                       f'</artist></artist-list>')
+        return ('<?xml version="1.0" encoding="UTF-8"?><metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#" '
+                f'xmlns:ns2="http://musicbrainz.org/ns/ext#-2.0">{listing}</metadata>')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_artists(csv_path=ARTISTS_CSV):
+    """artist_key -> {'country', 'genre', 'mbid'}, skipping the artists with nothing known."""
+    df = pd.read_csv(csv_path).dropna(subset=['Artist']).drop_duplicates('Artist')
+    df = df[(df['Country'] != UNKNOWN) | (df['Genre'] != UNKNOWN)]
+    return {artist_key(row.Artist): {'country': row.Country, 'genre': row.Genre,
+                                     'mbid': str(uuid.uuid5(uuid.NAMESPACE_URL, row.Artist))}
+            for row in df.itertuples()}
+
+
+def start_server(artists, port=0, latency=0.0, min_interval=0.0):
+    """Start the stand-in in a background thread. Returns (server, stats); the port is server.server_port."""
+    stats = {'requests': 0, 'rejected': 0, 'last': None, 'lock': threading.Lock()}
+    handler = functools.partial(MusicBrainzStandIn, artists=artists, stats=stats, latency=latency,
+                                min_interval=min_interval)
+    server = ThreadingHTTPServer(('localhost', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the MusicBrainz artist search.")
+    parser.add_argument('--artists', default=ARTISTS_CSV, help="CSV with Artist, Country and Genre")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds before each response")
+    parser.add_argument('--min-interval', type=float, default=0.0,
+                        help="answer 503 to requests closer than this many seconds")
+    args = parser.parse_args()
+
+    server, stats = start_server(load_artists(args.artists), args.port, args.latency, args.min_interval)
+    print(f"MusicBrainz stand-in on localhost:{server.server_port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+    print(f"{stats['requests']} requests, {stats['rejected']} rejected for going over the rate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Makes the realbook modules (manifesto_audios, pipeline_downloads,
+controle_taxa...) importable from the billboard scripts. Import it before
+them, from any working directory:
+
+    import realbook_path  # noqa: F401
+    from manifesto_audios import ManifestoAudios
+"""
+
+import os
+import sys
+
+REALBOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'realbook')
+if REALBOOK_DIR not in sys.path:
+    sys.path.insert(0, REALBOOK_DIR)
@@ -0,0 +1,126 @@
+"""
+Reconcile the chart list with the downloaded audio files.
+
+Replaces the loops in compare.ipynb, which were quadratic: a list
+membership test per song (6,400 x 5,900) and a row-by-row duplicate search.
+Here every chart row and every file gets a join key. The key is the song
+and the artist without spaces, joined by '-', which is how search.py names
+the files. The sets are then computed with hash joins (pandas isin /
+duplicated), so the cost grows linearly with the chart history.
+
+The notebook cut file names at the first period (remove_after_period), so
+'Immortality-CélineDionft.BeeGees.webm' never matched its song, and
+'.part' leftovers of interrupted downloads counted as downloaded. Only the
+extension is removed here, and '.part' files are ignored.
+
+legacy_keys=True (or --legacy-keys) applies the notebook's key rule instead
+(cut at the first period, '.part' files count). It does not reproduce the
+committed notDownloadedSongs.csv exactly, because the inputs changed after
+the notebook ran. With the committed CSVs, it gives 504 rows against 501:
+- the Country of some artists in songs_and_artists_updated.csv was
+  corrected (from a city such as 'Bonn' or 'Saddle River', or from
+  'Unknown') after the notebook ran, so 11 rows differ only in Country;
+- three chart rows (Penny Lane - The Beatles 1967, Dolannes Melodie - Alain
+  Patrick 1976, Stay - Oingo Boingo 1990) have no file with their key in the
+  committed filenames.csv ('TheBeatlestribute-PennyLane.webm' and
+  'AlainPatrick-DolannesMelodie.webm' have song and artist swapped), but
+  were not in the notebook's output.
+
+Usage:
+    python reconcile.py [--songs songs_and_artists_updated.csv]
+                        [--filenames filenames.csv] [--out notDownloadedSongs.csv]
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+SONGS_CSV = 'songs_and_artists_updated.csv'
+FILENAMES_CSV = 'filenames.csv'
+NOT_DOWNLOADED_CSV = 'notDownloadedSongs.csv'
+# Columns of notDownloadedSongs.csv, as written by compare.ipynb
+NOT_DOWNLOADED_COLUMNS = ['Year', 'Position', 'Country', 'Genre', 'nameSong']
+PARTIAL_SUFFIX = '.part'
+
+
+def remove_spaces(values):
+    """The notebook's remove_spaces for a whole column (missing values become 'nan', as before)."""
+    # map(str), not astype(str): with pandas' string dtype, astype(str) keeps NaN as missing
+    return values.map(str).str.replace(' ', '', regex=False)
+
+
+def song_keys(songs):
+    """Join key of each chart row: 'SongWithoutSpaces-ArtistWithoutSpaces'."""
+    return remove_spaces(songs['Song']) + '-' + remove_spaces(songs['Artist'])
+
+
+def file_keys(filenames, legacy_keys=False):
+    """Join key of each file name: the name without its extension (or up to the first period, if legacy_keys)."""
+    filenames = filenames.astype(str)
+    if legacy_keys:
+        return filenames.str.split('.', n=1).str[0]
+    return filenames.str.rsplit('.', n=1).str[0]
+
+
+def reconcile(songs, filenames, legacy_keys=False):
+    """
+    Match the chart rows against the downloaded files. Returns a dict of DataFrames:
+    - 'downloaded': chart rows with a file (with the 'filename' column);
+    - 'missing': chart rows without a file, without repeated rows, in the
+      notDownloadedSongs.csv layout;
+    - 'chart_duplicates': chart rows whose key appears more than once (the
+      same song in several years, or listed twice in a year);
+    - 'duplicate_files': files that share a key with another file;
+    - 'orphan_files': files whose key matches no chart row.
+    """
+    songs = songs.assign(nameSong=song_keys(songs))
+    files = pd.DataFrame({'filename': filenames.astype(str)})
+    if not legacy_keys:
+        files = files[~files['filename'].str.endswith(PARTIAL_SUFFIX)]
+    files = files.assign(realName=file_keys(files['filename'], legacy_keys))
+
+    has_file = songs['nameSong'].isin(files['realName'])
+    first_files = files.drop_duplicates('realName')
+    downloaded = songs[has_file].merge(first_files, left_on='nameSong', right_on='realName', how='left')
+    missing = (songs.loc[~has_file, NOT_DOWNLOADED_COLUMNS]
+               .drop_duplicates()
+               .sort_values(['Year', 'Position'], kind='stable')
+               .reset_index(drop=True))
+    return {
+        'downloaded': downloaded.drop(columns='realName'),
+        'missing': missing,
+        'chart_duplicates': songs[songs['nameSong'].duplicated(keep=False)],
+        'duplicate_files': files[files['realName'].duplicated(keep=False)],
+        'orphan_files': files[~files['realName'].isin(songs['nameSong'])],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the chart songs that were not downloaded.")
+    parser.add_argument('--songs', default=SONGS_CSV, help="chart CSV (Year, Position, Song, Artist, ...)")
+    parser.add_argument('--filenames', default=FILENAMES_CSV, help="CSV with the downloaded file names (criarDF.py)")
+    parser.add_argument('--out', default=NOT_DOWNLOADED_CSV, help="where to write the songs that were not downloaded")
+    parser.add_argument('--legacy-keys', action='store_true',
+                        help="use compare.ipynb's key rule (cut file names at the first period, count "
+                             "'.part' files); see the module docstring for why the output still differs")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    songs = pd.read_csv(args.songs)
+    filenames = pd.read_csv(args.filenames)['filename']
+    result = reconcile(songs, filenames, args.legacy_keys)
+    result['missing'].to_csv(args.out, index=False)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(songs)} chart rows, {len(filenames)} files")
+    print(f"Downloaded: {len(result['downloaded'])} rows")
+    print(f"Not downloaded: {len(result['missing'])} rows (saved to {args.out})")
+    print(f"Chart rows sharing a key: {len(result['chart_duplicates'])}")
+    print(f"Files sharing a key: {len(result['duplicate_files'])}")
+    print(f"Files matching no chart row: {len(result['orphan_files'])}")
+    print(f"Done in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,57 @@
 import pandas as pd
 import os
-import time
-import yt_dlp
-from moviepy.editor import AudioFileClip
 from youtubesearchpython import VideosSearch
-import concurrent.futures
 
-def download_audio(video_url, output_path, song_artist):
-    try:
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'outtmpl': os.path.join(output_path, f'{song_artist}.%(ext)s'),
-            'max_filesize': 50 * 1024 * 1024,  # 50 MB limit
-        }
+import realbook_path  # noqa: F401  (the download/transcode stages are shared with the realbook downloaders)
+from cache_busca import CacheBusca
+from controle_taxa import LimitadorAdaptativo
+from fila_retentativas import indica_sobrecarga
+from pipeline_downloads import criar_pipeline
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([video_url])
+# Maximum threads per network stage; the adaptive rate limiter decides how many are active
+SEARCH_THREADS = 8
+DOWNLOAD_THREADS = 8
+# Overrides for realbook/controle_taxa.LIMITES_PADRAO (rate, initial concurrency, target latency...)
+SEARCH_LIMITS = {}
+DOWNLOAD_LIMITS = {}
+TRANSCODE_PROCESSES = os.cpu_count() or 1
+QUEUE_SIZE = 8
+# 'clipe' fetches only the first 40 seconds (falls back to 'completo' when the source can't do partial fetches)
+ACQUISITION_MODE = 'clipe'
+SEARCH_CACHE_FILE = 'search_cache.sqlite'  # Persistent search results (see realbook/cache_busca.py)
 
-        # Cut the first 40 seconds of audio
-        mp3_path = os.path.join(output_path, f'{song_artist}.mp3')
-        audio = AudioFileClip(mp3_path).subclip(0, 40)
-        audio.write_audiofile(mp3_path, logger=None)
-        audio.close()
+search_cache = None  # Opened in main()
+search_limiter = None  # Created in main()
 
-        return True
-    except Exception as e:
-        print(f"Error downloading {song_artist}: {e}")
-        return False
+def youtube_provider(query):
+    """First search result as (link, title), or (None, None). API errors propagate."""
+    with search_limiter.requisicao():
+        results = VideosSearch(query, limit=1).result()
+    if results and 'result' in results and len(results['result']) > 0:
+        return (results['result'][0]['link'], results['result'][0]['title'])
+    return (None, None)
 
 def search_youtube_link(query):
-    try:
-        videos_search = VideosSearch(query, limit=1)
-        results = videos_search.result()
-        if results and 'result' in results and len(results['result']) > 0:
-            return results['result'][0]['link']
-    except Exception as e:
-        print(f"Error searching for {query}: {e}")
-    return None
+    """Video link for the query, or None if nothing was found. API errors propagate to the search stage."""
+    return search_cache.buscar(query, youtube_provider)[0]
 
-def process_item(item, output_folder):
-    video_url = search_youtube_link(item)
-    if video_url:
-        print(f"Downloading {item} from {video_url}")
-        success = download_audio(video_url, output_folder, item)
-        if success:
-            print(f"Successfully downloaded {item}")
-        else:
-            print(f"Failed to download {item}")
+def search_stage(item):
+    """Search stage of the pipeline: fills in the video URL for item['musica_buscada']."""
+    video_url = search_youtube_link(item['musica_buscada'])
+    if not video_url:
+        item['status'] = "Video not found"
+        return item
+    item['video_url'] = video_url
+    return item
+
+def report(item):
+    if item['status'] == "Sucesso":
+        print(f"Successfully downloaded {item['musica_buscada']}")
     else:
-        print(f"Video not found for {item}")
-    time.sleep(2)  # Add a delay to avoid rate limiting
+        print(f"Failed to download {item['musica_buscada']}: {item['status']} {item.get('erro', '')}")
 
 def main():
+    global search_cache, search_limiter
     # Load the DataFrame from the CSV file
     df = pd.read_csv('songs_and_artists_updated.csv')
 
@@ -67,11 +62,28 @@ def main():
     # Folder to store downloaded audios
     output_folder = 'downloaded_audios'
     os.makedirs(output_folder, exist_ok=True)
+    search_cache = CacheBusca(SEARCH_CACHE_FILE)
+    # Only throttling-class failures (429/5xx, timeouts, dropped connections) slow the limiters down
+    search_limiter = LimitadorAdaptativo.para(
+        'busca', sobrecarga=indica_sobrecarga, **{'concorrencia_maxima': SEARCH_THREADS, **SEARCH_LIMITS})
+    download_limiter = LimitadorAdaptativo.para(
+        'download', sobrecarga=indica_sobrecarga, **{'concorrencia_maxima': DOWNLOAD_THREADS, **DOWNLOAD_LIMITS})
 
-    # Use ThreadPoolExecutor for concurrent downloads
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(process_item, item, output_folder) for item in music_artist_list]
-        concurrent.futures.wait(futures)
+    # Search, download and transcode run as separate stages, each with its own concurrency
+    items = [
+        {'musica_buscada': item, 'titulo_video_encontrado': None, 'pasta': output_folder, 'nome_arquivo': item}
+        for item in music_artist_list
+    ]
+    pipeline = criar_pipeline(search_stage, SEARCH_THREADS, DOWNLOAD_THREADS, TRANSCODE_PROCESSES, QUEUE_SIZE,
+                              ACQUISITION_MODE, limitador_download=download_limiter)
+    pipeline.executar(items, ao_concluir=report, descricao="Downloading songs")
+    print(f"Max queue depth per stage: {pipeline.profundidade_maxima}")
+    stats = search_cache.estatisticas()
+    print(f"Search cache: {stats['acertos']} hits, {stats['acertos_negativos']} negative hits, "
+          f"{stats['falhas']} API queries (hit rate {stats['taxa_de_acerto']:.0%})")
+    search_cache.fechar()
+    print(f"Rate control: {search_limiter.resumo()}")
+    print(f"Rate control: {download_limiter.resumo()}")
 
     print("Download complete.")
 
@@ -0,0 +1,221 @@
+"""
+Armazém consolidado dos resultados de batidas (BPM e tempos de cada música).
+
+Em vez de um .txt por música, todos os resultados ficam em três arquivos numa
+pasta, lidos com memória mapeada (np.memmap), sem copiar nem converter texto:
+- 'tempos.f32':       os tempos das batidas de todas as músicas, em segundos,
+                      um float32 depois do outro;
+- 'faixas.bin':       um registro binário por música (FAIXA_DTYPE) com BPM,
+                      duração analisada e a posição (início, quantidade) dos
+                      tempos dela em 'tempos.f32';
+- 'metadados.jsonl':  uma linha JSON por música, na mesma ordem: nome do
+                      arquivo de áudio, pasta de origem, horário da análise e
+                      a chave da análise (conteúdo + parâmetros, ver
+                      cache_analise.py).
+
+Novas músicas são acrescentadas ao fim dos três arquivos. O registro em
+'faixas.bin' é escrito por último, então uma gravação interrompida deixa no
+máximo sobras no fim de 'tempos.f32'/'metadados.jsonl', que são ignoradas.
+Se a mesma música for analisada de novo, o registro mais recente vale.
+
+Rodando este arquivo, os .txt de PASTA_TXT_LEGADO são importados para o
+armazém e (se EXPORTAR_TXT) o armazém é exportado de volta para .txt.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+FAIXA_DTYPE = np.dtype([
+    ('bpm', '<f8'),          # NaN quando não foi possível estimar
+    ('duracao', '<f8'),      # segundos de áudio analisados
+    ('inicio', '<i8'),       # índice do primeiro tempo em 'tempos.f32'
+    ('quantidade', '<i8'),   # número de batidas
+])
+TEMPO_DTYPE = np.dtype('<f4')
+
+# --- CONFIGURAÇÃO ---
+PASTA_ARMAZEM = "resultados_batidas/armazem"
+PASTA_TXT_LEGADO = "resultados_batidas/batidas_boa_similaridade"
+EXPORTAR_TXT = False
+PASTA_EXPORTACAO_TXT = "resultados_batidas/exportados_txt"
+
+class ArmazemBatidas:
+    """Resultados de batidas de muitas músicas, com leitura por memória mapeada."""
+
+    def __init__(self, pasta=PASTA_ARMAZEM):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+        self._caminho_tempos = os.path.join(pasta, 'tempos.f32')
+        self._caminho_faixas = os.path.join(pasta, 'faixas.bin')
+        self._caminho_metadados = os.path.join(pasta, 'metadados.jsonl')
+        self._mapear()
+        self._carregar_metadados()
+
+    def _mapear(self):
+        tamanho = os.path.getsize(self._caminho_faixas) if os.path.exists(self._caminho_faixas) else 0
+        num_faixas = tamanho // FAIXA_DTYPE.itemsize
+        self.faixas = (
+            np.memmap(self._caminho_faixas, dtype=FAIXA_DTYPE, mode='r', shape=(num_faixas,))
+            if num_faixas else np.zeros(0, dtype=FAIXA_DTYPE)
+        )
+        num_tempos = int(self.faixas['inicio'][-1] + self.faixas['quantidade'][-1]) if num_faixas else 0
+        self._tempos = (
+            np.memmap(self._caminho_tempos, dtype=TEMPO_DTYPE, mode='r', shape=(num_tempos,))
+            if num_tempos else np.zeros(0, dtype=TEMPO_DTYPE)
+        )
+
+    def _carregar_metadados(self):
+        self.metadados = []
+        self._metadados_com_sobras = False
+        if os.path.exists(self._caminho_metadados):
+            with open(self._caminho_metadados, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    if len(self.metadados) == len(self.faixas):
+                        self._metadados_com_sobras = True
+                        break
+                    self.metadados.append(json.loads(linha))
+        # A última ocorrência de cada nome vale (reanálises são acrescentadas)
+        self._indice_por_nome = {meta['nome']: i for i, meta in enumerate(self.metadados)}
+        self._indice_por_chave = {meta['chave']: i for i, meta in enumerate(self.metadados) if meta.get('chave')}
+
+    def __len__(self):
+        return len(self._indice_por_nome)
+
+    def __contains__(self, nome_arquivo):
+        return nome_arquivo in self._indice_por_nome
+
+    def nomes(self):
+        return list(self._indice_por_nome)
+
+    def indice(self, nome_arquivo):
+        return self._indice_por_nome[nome_arquivo]
+
+    def tempos(self, indice):
+        """Tempos das batidas da faixa `indice` (uma fatia do memmap, sem cópia)."""
+        faixa = self.faixas[indice]
+        return self._tempos[faixa['inicio']:faixa['inicio'] + faixa['quantidade']]
+
+    def obter(self, nome_arquivo):
+        """Retorna (bpm, tempos, metadados) da análise mais recente de `nome_arquivo`."""
+        return self._obter_indice(self._indice_por_nome[nome_arquivo])
+
+    def obter_por_chave(self, chave):
+        """Como obter(), mas pela chave da análise; None se ela não estiver no armazém."""
+        i = self._indice_por_chave.get(chave)
+        return self._obter_indice(i) if i is not None else None
+
+    def _obter_indice(self, i):
+        return float(self.faixas['bpm'][i]), self.tempos(i), self.metadados[i]
+
+    def todos_os_tempos(self):
+        """Retorna (tempos, offsets) das análises mais recentes, uma por música, na
+        ordem de nomes(): os tempos num só array e os limites de cada faixa (a
+        faixa i vai de offsets[i] a offsets[i + 1]). Sem reanálises no armazém,
+        `tempos` é o próprio memmap; com elas, uma cópia sem os registros antigos."""
+        indices = np.fromiter(self._indice_por_nome.values(), dtype=np.int64, count=len(self._indice_por_nome))
+        if np.array_equal(indices, np.arange(len(self.faixas))):
+            return self._tempos, np.append(self.faixas['inicio'], len(self._tempos))
+        inicios = self.faixas['inicio'][indices]
+        quantidades = self.faixas['quantidade'][indices]
+        offsets = np.concatenate([[0], np.cumsum(quantidades)])
+        posicoes = np.repeat(inicios - offsets[:-1], quantidades) + np.arange(offsets[-1])
+        return self._tempos[posicoes], offsets
+
+    def acrescentar(self, nome_arquivo, bpm, tempos, duracao=0.0, origem=None, chave=None):
+        """Acrescenta o resultado de uma música ao fim do armazém."""
+        tempos = np.asarray(tempos, dtype=TEMPO_DTYPE)
+        registro = np.zeros(1, dtype=FAIXA_DTYPE)
+        registro['bpm'] = bpm if bpm is not None else np.nan
+        registro['duracao'] = duracao or 0.0
+        registro['inicio'] = len(self._tempos)
+        registro['quantidade'] = len(tempos)
+
+        # Sobras de uma gravação interrompida são descartadas antes de acrescentar
+        self._truncar(self._caminho_tempos, len(self._tempos) * TEMPO_DTYPE.itemsize)
+        self._truncar(self._caminho_faixas, len(self.faixas) * FAIXA_DTYPE.itemsize)
+        with open(self._caminho_tempos, 'ab') as f:
+            f.write(tempos.tobytes())
+        meta = {'nome': nome_arquivo, 'origem': origem, 'horario': time.time(), 'chave': chave}
+        if self._metadados_com_sobras:
+            with open(self._caminho_metadados, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(m, ensure_ascii=False) + '\n' for m in self.metadados)
+            self._metadados_com_sobras = False
+        with open(self._caminho_metadados, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(meta, ensure_ascii=False) + '\n')
+        with open(self._caminho_faixas, 'ab') as f:
+            f.write(registro.tobytes())
+
+        self.metadados.append(meta)
+        self._indice_por_nome[nome_arquivo] = len(self.metadados) - 1
+        if chave:
+            self._indice_por_chave[chave] = len(self.metadados) - 1
+        self._mapear()
+
+    def duplicar(self, chave, nome_arquivo, origem=None):
+        """
+        Acrescenta para `nome_arquivo` uma cópia do resultado já salvo com a
+        chave `chave` (o mesmo áudio com outro nome ou em outra pasta).
+        """
+        i = self._indice_por_chave[chave]
+        self.acrescentar(nome_arquivo, float(self.faixas['bpm'][i]), np.array(self.tempos(i)),
+                         float(self.faixas['duracao'][i]), origem, chave)
+
+    @staticmethod
+    def _truncar(caminho, tamanho):
+        if os.path.exists(caminho) and os.path.getsize(caminho) > tamanho:
+            with open(caminho, 'r+b') as f:
+                f.truncate(tamanho)
+
+    def exportar_txt(self, pasta_destino):
+        """Escreve um .txt no formato antigo de extrair_batidas.py para cada música."""
+        from extrair_batidas import salvar_resultados_txt
+
+        os.makedirs(pasta_destino, exist_ok=True)
+        for nome_arquivo, i in self._indice_por_nome.items():
+            caminho = os.path.join(pasta_destino, f"{os.path.splitext(nome_arquivo)[0]}.txt")
+            bpm = float(self.faixas['bpm'][i])
+            salvar_resultados_txt(caminho, nome_arquivo, None if np.isnan(bpm) else bpm, self.tempos(i))
+        return len(self._indice_por_nome)
+
+def ler_txt_legado(caminho):
+    """Lê um .txt de extrair_batidas.py e retorna (nome_arquivo, bpm, tempos)."""
+    nome_arquivo, bpm, tempos = None, None, []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            linha = linha.strip()
+            if linha.startswith('Arquivo:'):
+                nome_arquivo = linha.split(':', 1)[1].strip()
+            elif linha.startswith('BPM Estimado:'):
+                valor = linha.split(':', 1)[1].strip()
+                bpm = None if valor == 'N/D' else float(valor)
+            elif linha and linha[0].isdigit():
+                tempos.append(float(linha))
+    return nome_arquivo, bpm, np.array(tempos)
+
+def importar_txt(armazem, pasta_txt):
+    """Acrescenta ao armazém os .txt de `pasta_txt` cujas músicas ainda não estão nele."""
+    importados = 0
+    for nome in sorted(os.listdir(pasta_txt)):
+        if not nome.endswith('.txt'):
+            continue
+        nome_arquivo, bpm, tempos = ler_txt_legado(os.path.join(pasta_txt, nome))
+        if nome_arquivo and nome_arquivo not in armazem:
+            armazem.acrescentar(nome_arquivo, bpm, tempos, origem=pasta_txt)
+            importados += 1
+    return importados
+
+def main():
+    armazem = ArmazemBatidas(PASTA_ARMAZEM)
+    if os.path.isdir(PASTA_TXT_LEGADO):
+        importados = importar_txt(armazem, PASTA_TXT_LEGADO)
+        print(f"{importados} resultados importados de '{PASTA_TXT_LEGADO}'.")
+    print(f"O armazém '{PASTA_ARMAZEM}' tem {len(armazem)} músicas e {len(armazem.todos_os_tempos()[0])} batidas.")
+    if EXPORTAR_TXT:
+        exportados = armazem.exportar_txt(PASTA_EXPORTACAO_TXT)
+        print(f"{exportados} arquivos .txt exportados para '{PASTA_EXPORTACAO_TXT}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Benchmark da análise de batidas (extrair_batidas.py) com áudios sintéticos.
+
+Gera arquivos .wav de vários tamanhos (cliques num andamento fixo + ruído, a
+44,1 kHz) e mede, para cada modo de carregamento, o tempo de parede e o pico
+de memória (RSS) do processo que fez a análise:
+- 'original':  librosa.load(sr=None) com o arquivo inteiro em memória;
+- 'sr_fixa':   decodificação direta em SR_ANALISE;
+- 'janela':    SR_ANALISE e só os primeiros DURACAO_JANELA segundos;
+- 'streaming': leitura em blocos com librosa.stream.
+
+Cada medição roda num processo novo (spawn), para que o pico de memória de
+uma não contamine a outra. A coluna 'base' é o RSS do processo já com o
+librosa importado, antes de abrir o áudio.
+
+Também compara a extração de várias características (extrair_caracteristicas.py)
+numa só passada com o cálculo de cada uma separadamente a partir do arquivo,
+e confere que as duas formas dão o mesmo resultado.
+
+Por fim, compara a vazão e a precisão da estimativa em lote (tempo_em_lote.py)
+com a análise arquivo a arquivo (beat_track), num conjunto de clipes de
+cliques com BPM conhecido.
+Antes, confere que o envelope e o BPM de um clipe baixo são os mesmos
+sozinho e no mesmo lote de um clipe alto, e iguais aos de onset_strength e
+beat_track arquivo a arquivo.
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# --- CONFIGURAÇÃO ---
+DURACOES_S = [40, 180, 600]     # tamanhos dos áudios sintéticos
+SR_ARQUIVOS = 44100
+BPM_SINTETICO = 128
+DURACAO_JANELA = 40
+
+# Benchmark de características
+DURACAO_CARACTERISTICAS_S = 40
+ARQUIVOS_CARACTERISTICAS = 5
+
+# Benchmark da estimativa em lote
+CLIPES_LOTE = 48
+DURACAO_CLIPES_LOTE_S = 40
+FAIXA_BPM_LOTE = (70, 180)
+TOLERANCIA_BPM = 0.04   # erro relativo aceito em relação ao BPM real
+# Paridade: um clipe baixo analisado sozinho e junto com um alto
+BPM_PARIDADE = 137
+AMPLITUDE_BAIXA = 0.001
+
+MODOS = {
+    'original':  {'SR_ANALISE': None, 'DURACAO_MAXIMA': None, 'LIMIAR_STREAMING_S': float('inf')},
+    'sr_fixa':   {'SR_ANALISE': 22050, 'DURACAO_MAXIMA': None, 'LIMIAR_STREAMING_S': float('inf')},
+    'janela':    {'SR_ANALISE': 22050, 'DURACAO_MAXIMA': DURACAO_JANELA, 'LIMIAR_STREAMING_S': float('inf')},
+    'streaming': {'SR_ANALISE': 22050, 'DURACAO_MAXIMA': None, 'LIMIAR_STREAMING_S': 0},
+}
+
+def _pico_rss_mb():
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+def gerar_audio_sintetico(caminho, duracao, sr=SR_ARQUIVOS, bpm=BPM_SINTETICO, semente=0, amplitude=1.0):
+    """Escreve um .wav com cliques a cada batida de `bpm` mais um ruído leve, em escala `amplitude`."""
+    import librosa
+    import soundfile as sf
+
+    rng = np.random.default_rng(semente)
+    batidas = np.arange(0.5, duracao, 60.0 / bpm)
+    y = librosa.clicks(times=batidas, sr=sr, length=int(duracao * sr))
+    y += 0.01 * rng.standard_normal(len(y))
+    sf.write(caminho, (amplitude * y).astype(np.float32), sr)
+    return batidas
+
+def _medir_no_filho(fila, caminho, configuracao):
+    import extrair_batidas
+
+    for nome, valor in configuracao.items():
+        setattr(extrair_batidas, nome, valor)
+    base = _pico_rss_mb()
+    inicio = time.perf_counter()
+    bpm, tempos, duracao = extrair_batidas.analisar_batidas_do_audio(caminho, verboso=False)
+    fila.put({
+        'segundos': time.perf_counter() - inicio,
+        'base_mb': base,
+        'pico_mb': _pico_rss_mb(),
+        'bpm': float(bpm) if tempos is not None else None,
+        'duracao': duracao,
+    })
+
+def medir_em_processo_novo(caminho, configuracao):
+    """Roda a análise de `caminho` num processo novo e retorna as medidas (ou None se ele morrer)."""
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_medir_no_filho, args=(fila, caminho, configuracao))
+    processo.start()
+    processo.join()
+    return fila.get() if processo.exitcode == 0 else None
+
+def _gerar_em_processo_novo(caminho, duracao):
+    # O pico de RSS passa do processo principal para os filhos, então o
+    # áudio (grande, em memória) não pode ser gerado nele.
+    processo = multiprocessing.get_context('spawn').Process(target=gerar_audio_sintetico, args=(caminho, duracao))
+    processo.start()
+    processo.join()
+
+def _caracteristicas_separadas(caminho):
+    """Cada característica com a sua própria chamada do librosa, decodificando de novo."""
+    import librosa
+    from extrair_caracteristicas import N_MFCC, SR_ANALISE
+
+    def carregar():
+        return librosa.load(caminho, sr=SR_ANALISE)
+
+    y, sr = carregar()
+    tempo, quadros = librosa.beat.beat_track(y=y, sr=sr)
+    y, sr = carregar()
+    onset = librosa.onset.onset_strength(y=y, sr=sr)
+    y, sr = carregar()
+    chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+    y, sr = carregar()
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=N_MFCC)
+    return {
+        'tempo': np.array(float(np.atleast_1d(tempo)[0])),
+        'batidas': librosa.frames_to_time(quadros, sr=sr),
+        'onset': onset,
+        'chroma': chroma,
+        'mfcc': mfcc,
+    }
+
+def comparar_caracteristicas(pasta):
+    """Tempo de extração das características numa passada vs. separadamente."""
+    from extrair_caracteristicas import extrair_do_arquivo
+
+    caminhos = []
+    for i in range(ARQUIVOS_CARACTERISTICAS):
+        caminho = os.path.join(pasta, f"caracteristicas_{i}.wav")
+        gerar_audio_sintetico(caminho, DURACAO_CARACTERISTICAS_S, bpm=90 + 15 * i, semente=i)
+        caminhos.append(caminho)
+
+    # Uma rodada de aquecimento para o JIT do numba não entrar na medição
+    extrair_do_arquivo(caminhos[0], sincronizar=False)
+    _caracteristicas_separadas(caminhos[0])
+
+    tempos = {}
+    resultados = {}
+    for descricao, funcao in (('separadas', _caracteristicas_separadas),
+                              ('numa passada', lambda c: extrair_do_arquivo(c, sincronizar=False))):
+        inicio = time.perf_counter()
+        resultados[descricao] = [funcao(caminho) for caminho in caminhos]
+        tempos[descricao] = time.perf_counter() - inicio
+
+    print(f"--- Características de {len(caminhos)} áudios de {DURACAO_CARACTERISTICAS_S} s ---")
+    for descricao, duracao in tempos.items():
+        print(f"{descricao:<15} {duracao:8.2f} s  {duracao / len(caminhos) * 1000:8.1f} ms/arquivo")
+    print(f"Economia: {1 - tempos['numa passada'] / tempos['separadas']:.0%}")
+
+    divergentes = sorted({
+        nome
+        for separado, unico in zip(resultados['separadas'], resultados['numa passada'])
+        for nome in separado
+        if not np.allclose(separado[nome], unico[nome], rtol=1e-4, atol=1e-4)
+    })
+    print("Mesmos resultados nas duas formas." if not divergentes
+          else f"Resultados diferentes em: {', '.join(divergentes)}")
+
+def comparar_lote(pasta):
+    """Vazão e precisão do BPM em lote vs. beat_track arquivo a arquivo."""
+    import extrair_batidas
+    import tempo_em_lote
+
+    rng = np.random.default_rng(0)
+    bpms_reais = rng.uniform(*FAIXA_BPM_LOTE, size=CLIPES_LOTE)
+    caminhos = []
+    for i, bpm in enumerate(bpms_reais):
+        caminho = os.path.join(pasta, f"lote_{i}.wav")
+        gerar_audio_sintetico(caminho, DURACAO_CLIPES_LOTE_S, bpm=bpm, semente=i)
+        caminhos.append(caminho)
+
+    extrair_batidas.DURACAO_MAXIMA = DURACAO_CLIPES_LOTE_S
+    extrair_batidas.analisar_batidas_do_audio(caminhos[0], verboso=False)  # aquecimento do JIT
+    tempo_em_lote.analisar_lote(caminhos[:2], calcular_batidas=True)
+
+    medidas = {}
+    inicio = time.perf_counter()
+    medidas['beat_track por arquivo'] = [
+        extrair_batidas.analisar_batidas_do_audio(caminho, verboso=False)[0] for caminho in caminhos
+    ], time.perf_counter() - inicio
+    for descricao, com_batidas in (('lote (só BPM)', False), ('lote (BPM e batidas)', True)):
+        resultados = {}
+        inicio = time.perf_counter()
+        tempo_em_lote.analisar_em_lotes(
+            caminhos, com_batidas, lambda caminho, bpm, *_: resultados.__setitem__(caminho, bpm))
+        medidas[descricao] = [resultados[caminho] for caminho in caminhos], time.perf_counter() - inicio
+
+    referencia = np.array(medidas['beat_track por arquivo'][0], dtype=float)
+    print(f"--- {CLIPES_LOTE} clipes de {DURACAO_CLIPES_LOTE_S} s, BPM real entre {FAIXA_BPM_LOTE[0]} e {FAIXA_BPM_LOTE[1]} ---")
+    print(f"{'modo':<25} {'tempo (s)':>10} {'clipes/s':>10} {'acerto':>8} {'igual ao beat_track':>20}")
+    for descricao, (bpms, duracao) in medidas.items():
+        bpms = np.array(bpms, dtype=float)
+        acerto = np.mean(np.abs(bpms - bpms_reais) / bpms_reais <= TOLERANCIA_BPM)
+        concordancia = np.mean(np.isclose(bpms, referencia, rtol=1e-3))
+        print(f"{descricao:<25} {duracao:10.2f} {CLIPES_LOTE / duracao:10.1f} {acerto:8.0%} {concordancia:20.0%}")
+
+def conferir_paridade_lote(pasta):
+    """
+    O envelope e o BPM de um clipe no lote não podem depender dos outros
+    clipes do lote: um clipe baixo (AMPLITUDE_BAIXA) é analisado sozinho e
+    junto com um alto, e os dois são comparados com onset_strength e
+    beat_track arquivo a arquivo.
+    """
+    import librosa
+    import tempo_em_lote
+
+    baixo = os.path.join(pasta, "paridade_baixo.wav")
+    alto = os.path.join(pasta, "paridade_alto.wav")
+    gerar_audio_sintetico(baixo, DURACAO_CLIPES_LOTE_S, bpm=BPM_PARIDADE, semente=1, amplitude=AMPLITUDE_BAIXA)
+    gerar_audio_sintetico(alto, DURACAO_CLIPES_LOTE_S, bpm=BPM_SINTETICO, semente=2)
+
+    sozinho, validos, _, _ = tempo_em_lote.envelopes_de_onset([baixo])
+    junto, _, _, _ = tempo_em_lote.envelopes_de_onset([baixo, alto])
+    y, sr = librosa.load(baixo, sr=tempo_em_lote.SR_ANALISE, duration=tempo_em_lote.DURACAO_MAXIMA)
+    por_arquivo = librosa.onset.onset_strength(y=y, sr=sr, hop_length=tempo_em_lote.HOP_LENGTH)
+    n = validos[0]
+    bpm_sozinho = tempo_em_lote.analisar_lote([baixo])[0][baixo][0]
+    bpm_junto = tempo_em_lote.analisar_lote([baixo, alto])[0][baixo][0]
+    bpm_arquivo = float(np.atleast_1d(librosa.beat.beat_track(y=y, sr=sr, hop_length=tempo_em_lote.HOP_LENGTH)[0])[0])
+
+    print(f"--- Paridade do lote: clipe de {BPM_PARIDADE} BPM em amplitude {AMPLITUDE_BAIXA} ---")
+    print(f"envelope sozinho x junto com um clipe alto: diferença máxima {np.abs(sozinho[0, :n] - junto[0, :n]).max():.2e}")
+    print(f"envelope do lote x onset_strength:          diferença máxima {np.abs(sozinho[0, :n] - por_arquivo[:n]).max():.2e}")
+    print(f"BPM sozinho {bpm_sozinho:.1f}, junto {bpm_junto:.1f}, beat_track por arquivo {bpm_arquivo:.1f}")
+
+def main():
+    with tempfile.TemporaryDirectory() as pasta:
+        comparar_caracteristicas(pasta)
+        print()
+        conferir_paridade_lote(pasta)
+        print()
+        comparar_lote(pasta)
+        print()
+        print(f"--- Áudios sintéticos a {SR_ARQUIVOS} Hz, {BPM_SINTETICO} BPM ---\n")
+        print(f"{'áudio':>8} {'modo':<10} {'tempo (s)':>10} {'base (MB)':>10} {'pico (MB)':>10} {'análise (MB)':>13} {'BPM':>8}")
+        for duracao in DURACOES_S:
+            caminho = os.path.join(pasta, f"sintetico_{duracao}s.wav")
+            _gerar_em_processo_novo(caminho, duracao)
+            for modo, configuracao in MODOS.items():
+                medidas = medir_em_processo_novo(caminho, configuracao)
+                if medidas is None:
+                    print(f"{duracao:>7}s {modo:<10} {'o processo de análise falhou':>55}")
+                    continue
+                bpm = f"{medidas['bpm']:.1f}" if medidas['bpm'] is not None else 'N/D'
+                print(f"{duracao:>7}s {modo:<10} {medidas['segundos']:10.2f} {medidas['base_mb']:10.0f} "
+                      f"{medidas['pico_mb']:10.0f} {medidas['pico_mb'] - medidas['base_mb']:13.0f} {bpm:>8}")
+            print()
+
+if __name__ == "__main__":
+    main()
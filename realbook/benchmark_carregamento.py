@@ -0,0 +1,103 @@
+"""
+Benchmark do carregamento das tabelas (carregamento_rapido.py).
+
+Para cada tabela de TABELAS compara, em tempo de parede (o menor de
+REPETICOES) e memória do DataFrame (memory_usage(deep=True)):
+- pd.read_csv, como os notebooks e scripts fazem hoje;
+- bpd.read_csv (babypandas, usado nos notebooks da billboard), se instalado;
+- carregar() da cópia em Parquet, inteira, só com COLUNAS e com FILTROS.
+
+Também mede a primeira carga (conversão do CSV para Parquet) e confere que
+uma mudança no CSV faz a cópia ser refeita.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+import carregamento_rapido
+from carregamento_rapido import TABELAS, carregar, converter
+
+try:
+    import babypandas as bpd
+except ImportError:
+    bpd = None
+
+# --- CONFIGURAÇÃO ---
+REPETICOES = 20
+COLUNAS = {'billboard': ['Year', 'Genre'], 'realbook': ['Titulo', 'Ano'], 'relatorio': ['status']}
+FILTROS = {
+    'billboard': [('Country', '==', 'Brazil'), ('Year', '>=', 2000)],
+    'realbook': [('Ano', '>=', 1950)],
+    'relatorio': [('status', '==', 'Sucesso')],
+}
+
+def _melhor_tempo(funcao):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, min(tempos)
+
+def _memoria(df):
+    return df.memory_usage(deep=True).sum() if isinstance(df, pd.DataFrame) else None
+
+def _linha(descricao, df, tempo, referencia=None):
+    memoria = _memoria(df)
+    comparacao = f"  ({referencia / tempo:4.1f}x)" if referencia else ""
+    memoria = f"{memoria / 1024:8.0f} KiB" if memoria is not None else "        -    "
+    print(f"   {descricao:<28} {tempo * 1000:8.2f} ms{comparacao:<9} {memoria}  {len(df)} linhas")
+
+def comparar(nome):
+    csv = TABELAS[nome]['csv']
+    print(f"\n{nome} ({os.path.basename(csv)}, {os.path.getsize(csv) / 1024:.0f} KiB)")
+    df, referencia = _melhor_tempo(lambda: pd.read_csv(csv, encoding='utf-8'))
+    _linha("pd.read_csv", df, referencia)
+    if bpd is not None:
+        df, tempo = _melhor_tempo(lambda: bpd.read_csv(csv))
+        _linha("bpd.read_csv", df, tempo, referencia)
+
+    inicio = time.perf_counter()
+    converter(nome)
+    print(f"   {'conversão (primeira carga)':<28} {(time.perf_counter() - inicio) * 1000:8.2f} ms")
+    df, tempo = _melhor_tempo(lambda: carregar(nome))
+    _linha("carregar", df, tempo, referencia)
+    colunas = [c for c in COLUNAS[nome] if c in df.columns]
+    df, tempo = _melhor_tempo(lambda: carregar(nome, colunas=colunas))
+    _linha(f"carregar {colunas}", df, tempo, referencia)
+    filtros = [f for f in FILTROS[nome] if f[0] in carregar(nome).columns]
+    df, tempo = _melhor_tempo(lambda: carregar(nome, filtros=filtros))
+    _linha("carregar com filtros", df, tempo, referencia)
+
+def conferir_reconstrucao():
+    """Uma cópia do CSV do realbook, alterada depois da primeira carga, tem que aparecer na seguinte."""
+    pasta = tempfile.mkdtemp()
+    original = (TABELAS['realbook'], carregamento_rapido.PASTA_PARQUET)
+    try:
+        csv = os.path.join(pasta, 'musicas.csv')
+        shutil.copy(TABELAS['realbook']['csv'], csv)
+        TABELAS['realbook'] = {**TABELAS['realbook'], 'csv': csv}
+        carregamento_rapido.PASTA_PARQUET = pasta
+        antes = len(carregar('realbook'))
+        with open(csv, 'a', encoding='utf-8') as arquivo:
+            arquivo.write("Música nova,Alguém,2024\n")
+        depois = carregar('realbook')
+        print(f"\nreconstrução: {antes} -> {len(depois)} linhas, última: {depois.iloc[-1].tolist()}")
+    finally:
+        TABELAS['realbook'], carregamento_rapido.PASTA_PARQUET = original
+        shutil.rmtree(pasta)
+
+def main():
+    for nome, tabela in TABELAS.items():
+        if os.path.exists(tabela['csv']):
+            comparar(nome)
+    if bpd is None:
+        print("\n(babypandas não instalado: bpd.read_csv não medido)")
+    conferir_reconstrucao()
+
+if __name__ == "__main__":
+    main()
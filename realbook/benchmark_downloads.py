@@ -0,0 +1,421 @@
+"""
+Benchmark dos downloaders com uma fonte local, sem depender do YouTube.
+
+Gera faixas sintéticas (.wav), serve a pasta com servidor_local.py (com
+latência e limite de banda por conexão, para o download pesar como pesa na
+rede) e troca a busca do YouTube por uma busca falsa que só espera
+LATENCIA_BUSCA e devolve a URL local da faixa. O yt-dlp baixa a URL direta
+com o extrator genérico, então o download e a conversão são os de verdade.
+
+Compara:
+- 'serial':   o esquema antigo, um ThreadPoolExecutor(MAX_WORKERS) em que
+              cada thread faz busca -> download -> conversão de uma música;
+- 'pipeline': pipeline_downloads.py, com um estágio (e uma concorrência)
+              para cada etapa e filas limitadas entre eles.
+
+Para cada um, mostra o tempo total, as falhas e a duração dos clipes gerados
+(que deve ser CLIP_DURATION); no pipeline, também a profundidade máxima de
+cada fila.
+
+Também compara os modos de aquisição (processamento_audio.MODO_AQUISICAO):
+bytes enviados pelo servidor, bytes recebidos e tempo do download 'completo'
+e do 'clipe', este com um servidor que atende pedidos parciais (Range), um
+que os ignora e um que os recusa (onde deve cair no download completo).
+
+Por fim, mede o tempo de CPU (deste processo e dos filhos, como o ffmpeg)
+por clipe da conversão antiga (FFmpegExtractAudio para MP3 de 192k e depois
+o moviepy cortando e codificando de novo) e da nova (uma chamada do ffmpeg,
+processamento_audio.transcodificar), a partir de faixas em WebM/Opus como as
+que o YouTube entrega.
+
+Antes de tudo, confere o cache de buscas (cache_busca.py) com um provedor
+falso: numa segunda execução, depois de uma primeira com erros da API, só as
+consultas que deram erro voltam à API; com o cache negativo expirado, os
+"não encontrado" também voltam.
+
+A fila de retentativas (fila_retentativas.py) é conferida com faixas que
+faltam no servidor (404) e faixas corrompidas: a primeira execução
+classifica as falhas; as retentativas (simulando a passagem do tempo) só
+reprocessam as falhas cuja espera passou, nunca os sucessos.
+
+E compara o controle de taxa (controle_taxa.py) com os ritmos fixos antigos
+contra um serviço simulado que recusa requisições acima de um limite de
+simultâneas e de requisições por segundo, como uma API que devolve 429.
+"""
+
+import concurrent.futures
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+import soundfile as sf
+
+import pipeline_downloads
+from cache_busca import CacheBusca
+from controle_taxa import LimitadorAdaptativo
+from fila_retentativas import FilaRetentativas, indica_sobrecarga
+from processamento_audio import CLIP_DURATION, caminho_ffmpeg, descartar_bruto, transcodificar
+from servidor_local import iniciar_servidor
+
+# --- CONFIGURAÇÃO ---
+NUM_FAIXAS = 12
+DURACAO_FAIXAS_S = 180
+SR_FAIXAS = 44100
+LATENCIA_BUSCA = 0.3                 # segundos por busca (a API de busca)
+LATENCIA_SERVIDOR = 0.05             # segundos por requisição HTTP
+TAXA_SERVIDOR = 8 * 1024 * 1024      # bytes/s por conexão
+MAX_WORKERS = 4                      # threads do esquema serial (como nos downloaders)
+
+_url_base = None
+
+def gerar_faixa(caminho, duracao=DURACAO_FAIXAS_S, sr=SR_FAIXAS, semente=0):
+    """Tom com ruído; o conteúdo não importa, só o tamanho e o formato."""
+    gerador = np.random.default_rng(semente)
+    t = np.arange(int(duracao * sr)) / sr
+    y = 0.3 * np.sin(2 * np.pi * (220 + 20 * semente) * t) + 0.05 * gerador.standard_normal(t.size)
+    sf.write(caminho, y.astype(np.float32), sr, subtype='PCM_16')
+
+def buscar_local(item):
+    """Busca falsa: espera como a API de busca e devolve a URL da faixa no servidor local."""
+    time.sleep(LATENCIA_BUSCA)
+    item['video_url'] = f"{_url_base}/{item['musica_buscada']}.wav"
+    item['titulo_video_encontrado'] = item['musica_buscada']
+    return item
+
+def _processar_em_serie(item):
+    try:
+        item = buscar_local(item)
+        item = pipeline_downloads.etapa_baixar(item)
+        return pipeline_downloads.etapa_transcodificar(item)
+    except Exception as e:
+        item['status'] = "Falha"
+        item['erro'] = f"{type(e).__name__}: {e}"
+        return item
+
+def executar_serial(itens):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        return list(executor.map(_processar_em_serie, itens))
+
+def executar_pipeline(itens):
+    pipeline = pipeline_downloads.criar_pipeline(buscar_local)
+    resultados = pipeline.executar(itens)
+    return resultados, pipeline.profundidade_maxima
+
+def _itens(nomes, pasta):
+    return [{'musica_buscada': nome, 'titulo_video_encontrado': None, 'pasta': pasta, 'nome_arquivo': nome}
+            for nome in nomes]
+
+def _resumo(resultados):
+    falhas = [item for item in resultados if item.get('status') != "Sucesso"]
+    duracoes = [sf.info(item['caminho_final']).duration for item in resultados if item.get('caminho_final')]
+    for item in falhas[:3]:
+        print(f"   falha: {item['musica_buscada']}: {item.get('erro')}")
+    faixa = f"{min(duracoes):.1f}-{max(duracoes):.1f}s" if duracoes else "-"
+    return len(falhas), faixa
+
+def comparar_aquisicao(fonte, pasta, nomes):
+    """Bytes pela rede e em disco por música em cada modo de aquisição."""
+    cenarios = [('completo', 'suportado'), ('clipe', 'suportado'), ('clipe', 'ignorado'), ('clipe', 'recusado')]
+    print(f"\n{'modo':<9} {'Range':<10} {'rede/música':>12} {'recebido/música':>16} {'tempo':>8}  modos usados")
+    for modo, modo_range in cenarios:
+        servidor, url_base = iniciar_servidor(fonte, latencia=LATENCIA_SERVIDOR, taxa_bytes=TAXA_SERVIDOR,
+                                              modo_range=modo_range)
+        destino = os.path.join(pasta, f"aquisicao_{modo}_{modo_range}")
+        os.makedirs(destino)
+        itens = [dict(item, video_url=f"{url_base}/{item['musica_buscada']}.wav") for item in _itens(nomes, destino)]
+        try:
+            inicio = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                resultados = list(executor.map(lambda item: pipeline_downloads.etapa_baixar(item, modo=modo), itens))
+            decorrido = time.perf_counter() - inicio
+        finally:
+            servidor.shutdown()
+        recebido = sum(os.path.getsize(item['arquivo_bruto']) for item in resultados)
+        for item in resultados:
+            descartar_bruto(item['arquivo_bruto'])
+        usados = {usado: sum(item['aquisicao'] == usado for item in resultados) for usado in ('clipe', 'completo')}
+        print(f"{modo:<9} {modo_range:<10} {servidor.bytes_enviados / len(nomes) / 1e6:9.2f} MB "
+              f"{recebido / len(nomes) / 1e6:13.2f} MB {decorrido:7.2f}s  {usados}")
+        shutil.rmtree(destino)
+
+class ProvedorFalso:
+    """Provedor de busca falso: conta as chamadas, não acha as consultas em `ausentes` e dá erro nas de `com_erro`."""
+
+    def __init__(self, ausentes=(), com_erro=()):
+        self.ausentes = set(ausentes)
+        self.com_erro = set(com_erro)
+        self.chamadas = []
+
+    def __call__(self, consulta):
+        self.chamadas.append(consulta)
+        if consulta in self.com_erro:
+            raise ConnectionError(f"API indisponível para '{consulta}'")
+        if consulta in self.ausentes:
+            return (None, None)
+        return (f"https://video.local/{consulta}", consulta.title())
+
+def conferir_cache_busca(pasta, num_consultas=50):
+    consultas = [f"musica {i}" for i in range(num_consultas)]
+    ausentes, com_erro = consultas[::10], consultas[5::10]
+    banco = os.path.join(pasta, 'cache_busca.sqlite')
+
+    def executar(provedor, **validades):
+        cache = CacheBusca(banco, **validades)
+        resolvidas = 0
+        for consulta in consultas:
+            try:
+                resolvidas += cache.buscar(consulta, provedor)[0] is not None
+            except ConnectionError:
+                pass
+        estatisticas = cache.estatisticas()
+        cache.fechar()
+        return resolvidas, estatisticas
+
+    print(f"\n{'execução':<28} {'chamadas à API':>15} {'resolvidas':>11}  estatísticas do cache")
+    execucoes = [
+        ('1ª (API com erros)', ProvedorFalso(ausentes, com_erro), {}),
+        ('2ª (API de volta)', ProvedorFalso(ausentes), {}),
+        ('3ª (tudo no cache)', ProvedorFalso(ausentes), {}),
+        ('4ª (negativos expirados)', ProvedorFalso(ausentes), {'validade_negativa': 0}),
+    ]
+    for descricao, provedor, validades in execucoes:
+        resolvidas, estatisticas = executar(provedor, **validades)
+        print(f"{descricao:<28} {len(provedor.chamadas):>15} {resolvidas:>11}  {estatisticas}")
+    os.remove(banco)
+
+def _sem_busca(item):
+    return item
+
+def conferir_fila_retentativas(fonte, pasta, nomes):
+    """Primeira execução com falhas e retentativas em instantes simulados (espera de cada classe)."""
+    destino = os.path.join(pasta, 'retentativas')
+    os.makedirs(destino)
+    corrompidas = nomes[2:4]
+    for nome in corrompidas:
+        with open(os.path.join(fonte, f"corrompida_{nome}.wav"), 'wb') as arquivo:
+            arquivo.write(os.urandom(64 * 1024))
+    servidor, url_base = iniciar_servidor(fonte, latencia=LATENCIA_SERVIDOR, taxa_bytes=TAXA_SERVIDOR)
+    itens = _itens(nomes, destino)
+    for i, item in enumerate(itens):
+        arquivo = {0: 'faltando', 1: 'faltando'}.get(i, 'corrompida_' if item['musica_buscada'] in corrompidas else '')
+        item['video_url'] = f"{url_base}/{'faltando_' if arquivo == 'faltando' else arquivo}{item['musica_buscada']}.wav"
+
+    fila = FilaRetentativas(os.path.join(pasta, 'downloads.sqlite'))
+    print(f"\n{'execução':<28} {'processados':>11} {'sucessos':>9}  fila (prontos/esperando/esgotados por classe)")
+    try:
+        execucoes = [
+            ('1ª (CSV inteiro)', None),
+            ('retentar agora', 0),
+            ('retentar em 15 min', 15 * 60),   # as corrompidas já foram consertadas
+            ('retentar em 25 h', 25 * 3600),
+            ('retentar em 10 dias', 10 * 24 * 3600),
+        ]
+        for descricao, avanco in execucoes:
+            if avanco is None:
+                lote = itens
+            else:
+                lote = fila.prontos(formato_alternativo=True, agora=time.time() + avanco)
+            resultados = pipeline_downloads.criar_pipeline(_sem_busca).executar(
+                lote, ao_concluir=fila.registrar, descricao=descricao) if lote else []
+            sucessos = sum(item['status'] == "Sucesso" for item in resultados)
+            resumo = {classe: f"{c['prontos']}/{c['esperando']}/{c['esgotados']}"
+                      for classe, c in fila.resumo(agora=time.time() + (avanco or 0)).items()}
+            print(f"{descricao:<28} {len(lote):>11} {sucessos:>9}  {resumo}")
+            if avanco is None:
+                for nome in corrompidas:
+                    shutil.copyfile(os.path.join(fonte, f"{nome}.wav"), os.path.join(fonte, f"corrompida_{nome}.wav"))
+    finally:
+        servidor.shutdown()
+        fila.fechar()
+        for nome in corrompidas:
+            os.remove(os.path.join(fonte, f"corrompida_{nome}.wav"))
+        shutil.rmtree(destino)
+
+class ServicoSimulado:
+    """Serviço que fica mais lento com a carga e recusa acima de `simultaneas` ou de `taxa` req/s."""
+
+    def __init__(self, simultaneas=6, taxa=20.0, latencia=0.1):
+        self.simultaneas = simultaneas
+        self.taxa = taxa
+        self.latencia = latencia
+        self.recusas = 0
+        self._em_andamento = 0
+        self._instantes = []
+        self._trava = threading.Lock()
+
+    def __call__(self):
+        with self._trava:
+            agora = time.monotonic()
+            self._instantes = [t for t in self._instantes if agora - t < 1.0] + [agora]
+            self._em_andamento += 1
+            recusar = self._em_andamento > self.simultaneas or len(self._instantes) > self.taxa
+            carga = self._em_andamento
+        try:
+            time.sleep(self.latencia * (1 + 0.2 * carga))
+            if recusar:
+                with self._trava:
+                    self.recusas += 1
+                raise ConnectionError("429 Too Many Requests")
+        finally:
+            with self._trava:
+                self._em_andamento -= 1
+
+def comparar_controle_taxa(total=200):
+    """Vazão útil (sucessos/s) e recusas com ritmo fixo e com o limitador adaptativo."""
+    def executar(servico, threads, chamar):
+        restantes = iter(range(total))
+        sucessos = []
+        trava = threading.Lock()
+
+        def trabalhador():
+            while True:
+                with trava:
+                    if next(restantes, None) is None:
+                        return
+                try:
+                    chamar(servico)
+                    with trava:
+                        sucessos.append(1)
+                except ConnectionError:
+                    pass
+
+        inicio = time.perf_counter()
+        lista = [threading.Thread(target=trabalhador) for _ in range(threads)]
+        for thread in lista:
+            thread.start()
+        for thread in lista:
+            thread.join()
+        return len(sucessos), servico.recusas, time.perf_counter() - inicio
+
+    def com_pausa(pausa):
+        def chamar(servico):
+            servico()
+            time.sleep(pausa)
+        return chamar
+
+    def adaptativo(limitador):
+        def chamar(servico):
+            with limitador.requisicao():
+                servico()
+        return chamar
+
+    servicos = {
+        'folgado': {'simultaneas': 32, 'taxa': 200.0},
+        'apertado': {'simultaneas': 6, 'taxa': 20.0},
+    }
+    print(f"\n{'serviço':<9} {'ritmo':<30} {'sucessos':>9} {'recusas':>8} {'tempo':>8} {'sucessos/s':>11}")
+    for nome_servico, parametros in servicos.items():
+        limitador = LimitadorAdaptativo('simulado', taxa=100, capacidade=5, concorrencia_inicial=2,
+                                        concorrencia_maxima=16, latencia_alvo=1.0, erros_tolerados=0.1,
+                                        sobrecarga=indica_sobrecarga)
+        cenarios = [
+            ('fixo: 5 threads + sleep(2)', 5, com_pausa(2.0)),
+            ('fixo: 4 threads + sleep(0.1)', 4, com_pausa(0.1)),
+            ('fixo: 16 threads sem pausa', 16, com_pausa(0.0)),
+            ('adaptativo: até 16 threads', 16, adaptativo(limitador)),
+        ]
+        for descricao, threads, chamar in cenarios:
+            sucessos, recusas, decorrido = executar(ServicoSimulado(**parametros), threads, chamar)
+            print(f"{nome_servico:<9} {descricao:<30} {sucessos:>9} {recusas:>8} {decorrido:7.2f}s "
+                  f"{sucessos / decorrido:11.2f}")
+        print(f"          {limitador.resumo()}")
+
+def _tempo_de_cpu():
+    proprio = resource.getrusage(resource.RUSAGE_SELF)
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return proprio.ru_utime + proprio.ru_stime + filhos.ru_utime + filhos.ru_stime
+
+def _ffmpeg(*argumentos):
+    subprocess.run([caminho_ffmpeg(), '-hide_banner', '-loglevel', 'error', '-y', *argumentos], check=True)
+
+def _conversao_antiga(origem, destino):
+    """O caminho antigo: MP3 de 192k da faixa inteira (FFmpegExtractAudio) e recodificação do corte no moviepy."""
+    from moviepy.editor import AudioFileClip
+    temporario = f"{destino}.temp.mp3"
+    _ffmpeg('-i', origem, '-vn', '-c:a', 'libmp3lame', '-b:a', '192k', temporario)
+    with AudioFileClip(temporario) as audio:
+        with audio.subclip(0, min(audio.duration, CLIP_DURATION)) as clipe:
+            clipe.write_audiofile(destino, logger=None, codec='libmp3lame')
+    os.remove(temporario)
+
+def comparar_transcodificacao(fonte, pasta, nomes):
+    """Tempo de CPU por clipe da conversão antiga e da nova."""
+    webm = os.path.join(pasta, 'webm')
+    os.makedirs(webm)
+    for nome in nomes:
+        _ffmpeg('-i', os.path.join(fonte, f"{nome}.wav"), '-c:a', 'libopus', '-b:a', '128k',
+                os.path.join(webm, f"{nome}.webm"))
+        _ffmpeg('-t', str(CLIP_DURATION), '-i', os.path.join(webm, f"{nome}.webm"), '-c:a', 'copy',
+                os.path.join(webm, f"{nome}_clipe.webm"))
+
+    def ler(caminho):
+        with open(caminho, 'rb') as f:
+            return f.read()
+
+    conversoes = {
+        'antiga (faixa inteira)': lambda nome, destino: _conversao_antiga(
+            os.path.join(webm, f"{nome}.webm"), destino),
+        'nova (faixa inteira)': lambda nome, destino: transcodificar(
+            ler(os.path.join(webm, f"{nome}.webm")), destino),
+        'nova (clipe baixado)': lambda nome, destino: transcodificar(
+            ler(os.path.join(webm, f"{nome}_clipe.webm")), destino),
+    }
+    print(f"\n{'conversão':<24} {'CPU/clipe':>10} {'duração dos clipes':>20}")
+    for descricao, converter in conversoes.items():
+        destino = os.path.join(pasta, 'conversao')
+        os.makedirs(destino)
+        inicio = _tempo_de_cpu()
+        saidas = []
+        for nome in nomes:
+            saidas.append(os.path.join(destino, f"{nome}.mp3"))
+            converter(nome, saidas[-1])
+        cpu = (_tempo_de_cpu() - inicio) / len(nomes)
+        duracoes = [sf.info(saida).duration for saida in saidas]
+        print(f"{descricao:<24} {cpu:9.3f}s {min(duracoes):9.1f}-{max(duracoes):.1f}s")
+        shutil.rmtree(destino)
+
+def main():
+    global _url_base
+    with tempfile.TemporaryDirectory() as pasta:
+        fonte = os.path.join(pasta, 'fonte')
+        os.makedirs(fonte)
+        conferir_cache_busca(pasta)
+        comparar_controle_taxa()
+        nomes = [f"faixa_{i:03d}" for i in range(NUM_FAIXAS)]
+        print(f"Gerando {NUM_FAIXAS} faixas de {DURACAO_FAIXAS_S}s...")
+        for i, nome in enumerate(nomes):
+            gerar_faixa(os.path.join(fonte, f"{nome}.wav"), semente=i)
+
+        servidor, _url_base = iniciar_servidor(fonte, latencia=LATENCIA_SERVIDOR, taxa_bytes=TAXA_SERVIDOR)
+        print(f"Fonte local em {_url_base} ({TAXA_SERVIDOR / 1024 / 1024:.0f} MB/s por conexão), "
+              f"busca de {LATENCIA_BUSCA}s, {os.cpu_count()} núcleo(s)\n")
+        try:
+            for modo in ('serial', 'pipeline'):
+                destino = os.path.join(pasta, modo)
+                os.makedirs(destino)
+                inicio = time.perf_counter()
+                if modo == 'serial':
+                    resultados, profundidades = executar_serial(_itens(nomes, destino)), None
+                else:
+                    resultados, profundidades = executar_pipeline(_itens(nomes, destino))
+                decorrido = time.perf_counter() - inicio
+                falhas, faixa = _resumo(resultados)
+                print(f"{modo:<9} {decorrido:7.2f}s  {NUM_FAIXAS / decorrido:5.2f} faixas/s  "
+                      f"falhas: {falhas}  clipes: {faixa} (esperado {CLIP_DURATION}s)")
+                if profundidades:
+                    print(f"          profundidade máxima das filas: {profundidades}")
+                shutil.rmtree(destino)
+        finally:
+            servidor.shutdown()
+
+        conferir_fila_retentativas(fonte, pasta, nomes[:6])
+        comparar_aquisicao(fonte, pasta, nomes)
+        comparar_transcodificacao(fonte, pasta, nomes[:4])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark do scraping contra o servidor local (servidor_local.py).
+
+Compara páginas por segundo de:
+- o modo original (requests.get sem sessão + time.sleep(0.05) por música);
+- o modo sequencial com sessão (keep-alive);
+- o modo assíncrono com diferentes níveis de concorrência.
+
+As URLs são geradas repetindo as páginas salvas com uma query string
+diferente ('?n=1', '?n=2', ...), que o servidor local ignora.
+"""
+
+import os
+import time
+
+import requests
+
+import scrape_realbook
+from scrape_assincrono import crawl_assincrono
+from servidor_local import iniciar_servidor
+
+# --- CONFIGURAÇÃO ---
+PASTA_PAGINAS = 'paginas_exemplo'
+NUMERO_DE_PAGINAS = 200
+LATENCIA = 0.05                    # Simula a ida e volta até o site real
+NIVEIS_DE_CONCORRENCIA = [1, 4, 8, 16, 32]
+REQUISICOES_POR_SEGUNDO = 0        # 0 = sem limite, para medir só o motor
+
+def gerar_urls(url_base, pasta, quantidade):
+    paginas = sorted(
+        os.path.splitext(nome)[0] for nome in os.listdir(pasta)
+        if nome.endswith('.html') and nome != 'index.html'
+    )
+    return [f"{url_base}/{paginas[i % len(paginas)]}/?n={i}" for i in range(quantidade)]
+
+def medir(descricao, funcao, quantidade):
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    print(f"{descricao:<40} {duracao:8.2f} s  {quantidade / duracao:8.1f} páginas/s")
+
+def main():
+    servidor, url_base = iniciar_servidor(PASTA_PAGINAS, latencia=LATENCIA)
+    urls = gerar_urls(url_base, PASTA_PAGINAS, NUMERO_DE_PAGINAS)
+    print(f"--- {len(urls)} páginas, latência simulada de {LATENCIA * 1000:.0f} ms ---\n")
+
+    def original():
+        for url in urls:
+            scrape_realbook.get_song_details(url)
+            time.sleep(0.05)
+
+    def sequencial_com_sessao():
+        with requests.Session() as sessao:
+            for url in urls:
+                scrape_realbook.get_song_details(url, sessao)
+
+    try:
+        medir("Original (sem sessão + sleep)", original, len(urls))
+        medir("Sequencial com sessão", sequencial_com_sessao, len(urls))
+        for concorrencia in NIVEIS_DE_CONCORRENCIA:
+            medir(
+                f"Assíncrono (concorrência {concorrencia})",
+                lambda: crawl_assincrono(urls, concorrencia, REQUISICOES_POR_SEGUNDO),
+                len(urls),
+            )
+    finally:
+        servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark da similaridade em lote (similaridade.py) com os CSVs do repositório.
+
+Compara, em tempo de parede:
+- 'pares': o cálculo do realbook.ipynb (limpar_string e thefuzz linha a
+  linha com DataFrame.apply) com similaridades_pareadas() (cpdist), no
+  musicas_com_boa_similaridade.csv repetido REPETICOES_PARES vezes;
+- 'matriz realbook': todas as músicas do musicas_realbook_completo_melhorado.csv
+  contra todos os títulos do lista_completa_videos.csv, com um laço duplo do
+  thefuzz (estimado a partir de LINHAS_AMOSTRA linhas) e com
+  melhores_correspondencias() (cdist), sem e com o limiar;
+- 'matriz billboard': as 6.400 músicas da Billboard
+  (songs_and_artists_updated.csv) contra os nomes dos arquivos baixados
+  (filenames.csv, 'MusicaArtista' sem espaços), com o fuzz.ratio das chaves
+  compactas, que é como os nomes dos arquivos foram montados.
+
+Também confere que as pontuações em lote são iguais às de similaridade().
+"""
+
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz
+from thefuzz import fuzz as thefuzz_fuzz
+
+from similaridade import (
+    LIMIAR_SIMILARIDADE, NUCLEOS, melhores_correspondencias, normalizar_lote, similaridade, similaridades_pareadas,
+)
+
+# --- CONFIGURAÇÃO ---
+PASTA_REALBOOK = os.path.dirname(os.path.abspath(__file__))
+PASTA_BILLBOARD = os.path.join(PASTA_REALBOOK, '..', 'billboard')
+REPETICOES_PARES = 10
+LINHAS_AMOSTRA = 20
+LIMIAR_BILLBOARD = 90
+
+def _limpar_string_notebook(texto):
+    """A limpar_string do realbook.ipynb, sem mudanças (para medir o cálculo antigo)."""
+    if not isinstance(texto, str):
+        return ""
+    texto = texto.lower()
+    palavras_para_remover = [
+        'official', 'video', 'audio', 'lyric', 'lyrics', 'hd', '4k',
+        'remastered', 'clipe', 'oficial', 'full', 'album', 'hq', 'live',
+        r'\[.*?\]', r'\(.*?\)'
+    ]
+    for palavra in palavras_para_remover:
+        texto = re.sub(palavra, '', texto)
+    texto = re.sub(r'[^\w\s]', '', texto)
+    return ' '.join(texto.split())
+
+def _cronometrar(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+def comparar_pares():
+    df = pd.read_csv(os.path.join(PASTA_REALBOOK, 'musicas_com_boa_similaridade.csv'))
+    df = pd.concat([df[['musica_buscada', 'titulo_video_encontrado']]] * REPETICOES_PARES, ignore_index=True)
+
+    def notebook(df):
+        df = df.copy()
+        df['busca_limpa'] = df['musica_buscada'].apply(_limpar_string_notebook)
+        df['titulo_limpo'] = df['titulo_video_encontrado'].apply(_limpar_string_notebook)
+        return df.apply(lambda row: thefuzz_fuzz.token_set_ratio(row['busca_limpa'], row['titulo_limpo']), axis=1)
+
+    antigo, tempo_antigo = _cronometrar(notebook, df)
+    novo, tempo_novo = _cronometrar(similaridades_pareadas, df['musica_buscada'], df['titulo_video_encontrado'])
+    um_a_um = np.array([similaridade(a, b) for a, b in zip(df['musica_buscada'][:len(df) // REPETICOES_PARES],
+                                                             df['titulo_video_encontrado'])])
+    print(f"\npares ({len(df)} linhas)")
+    print(f"   notebook (apply + thefuzz): {tempo_antigo:8.3f}s")
+    print(f"   similaridades_pareadas:     {tempo_novo:8.3f}s  ({tempo_antigo / tempo_novo:.0f}x)")
+    print(f"   iguais a similaridade(): {bool((novo[:len(um_a_um)] == um_a_um).all())}; "
+          f"diferentes do notebook: {int((novo != antigo.to_numpy()).sum())} "
+          f"(acentos e palavras de vídeo dentro de outras palavras)")
+    print(f"   acima de {LIMIAR_SIMILARIDADE}: notebook {int((antigo > LIMIAR_SIMILARIDADE).sum())}, "
+          f"lote {int((novo > LIMIAR_SIMILARIDADE).sum())}")
+
+def comparar_matriz_realbook():
+    musicas = pd.read_csv(os.path.join(PASTA_REALBOOK, 'musicas_realbook_completo_melhorado.csv'))
+    titulos = pd.read_csv(os.path.join(PASTA_REALBOOK, 'lista_completa_videos.csv'))['title'].tolist()
+    consultas = (musicas['Titulo'].fillna('') + ' ' + musicas['Autor'].fillna('').str.split('/').str[0]).tolist()
+
+    def laco_duplo(consultas):
+        limpos = [_limpar_string_notebook(t) for t in titulos]
+        return [max(thefuzz_fuzz.token_set_ratio(_limpar_string_notebook(c), t) for t in limpos) for c in consultas]
+
+    _, tempo_amostra = _cronometrar(laco_duplo, consultas[:LINHAS_AMOSTRA])
+    estimado = tempo_amostra * len(consultas) / LINHAS_AMOSTRA
+    print(f"\nmatriz realbook ({len(consultas)} músicas x {len(titulos)} títulos, {os.cpu_count()} núcleo(s))")
+    print(f"   laço duplo thefuzz (estimado): {estimado:8.3f}s")
+    for limiar in (0, LIMIAR_SIMILARIDADE):
+        resultado, tempo = _cronometrar(melhores_correspondencias, consultas, titulos, limiar, NUCLEOS)
+        print(f"   cdist, limiar {limiar:>3}:            {tempo:8.3f}s  ({estimado / tempo:.0f}x)  "
+              f"{int(resultado['titulo'].notna().sum())} músicas com título >= {max(limiar, 1)}")
+
+def comparar_matriz_billboard():
+    musicas = pd.read_csv(os.path.join(PASTA_BILLBOARD, 'songs_and_artists_updated.csv'))
+    arquivos = pd.read_csv(os.path.join(PASTA_BILLBOARD, 'filenames.csv'))['filename']
+    consultas = (musicas['Song'].fillna('') + ' ' + musicas['Artist'].fillna('')).tolist()
+    nomes = arquivos.str.rsplit('.', n=1).str[0].str.replace('-', ' ').tolist()
+
+    def compactar(textos):
+        return [texto.replace(' ', '') for texto in normalizar_lote(textos)]
+
+    resultado, tempo = _cronometrar(melhores_correspondencias, consultas, nomes, LIMIAR_BILLBOARD, NUCLEOS,
+                                    scorer=fuzz.ratio, normalizar=compactar)
+    exatos = set(compactar(nomes))
+    iguais = sum(chave in exatos for chave in compactar(consultas))
+    print(f"\nmatriz billboard ({len(consultas)} músicas x {len(nomes)} arquivos, fuzz.ratio das chaves compactas)")
+    print(f"   cdist, limiar {LIMIAR_BILLBOARD}: {tempo:8.3f}s  "
+          f"{int(resultado['titulo'].notna().sum())} músicas com arquivo (nome exatamente igual: {iguais})")
+
+def main():
+    comparar_pares()
+    comparar_matriz_realbook()
+    comparar_matriz_billboard()
+
+if __name__ == "__main__":
+    main()
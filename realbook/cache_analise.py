@@ -0,0 +1,34 @@
+"""
+Identificação do áudio pelo conteúdo, para o cache da análise de batidas.
+
+Cada arquivo é identificado por um hash BLAKE2b do conteúdo, e cada análise
+pela chave (hash do conteúdo + assinatura dos parâmetros da análise: taxa de
+amostragem, hop length, janela, versão do librosa). Assim:
+- o mesmo áudio em pastas diferentes (busca_completa, busca_por_titulo,
+  audios_baixados) ou renomeado é analisado uma vez só;
+- um arquivo que mudou, mesmo com o mesmo nome, é analisado de novo;
+- mudar os parâmetros da análise invalida os resultados antigos.
+
+Para não ler de novo todos os arquivos a cada execução, o hash de cada
+caminho fica no manifesto dos áudios (manifesto_audios.py) junto com o
+tamanho e a data de modificação do arquivo; enquanto os dois não mudam, o
+hash salvo é reaproveitado.
+"""
+
+import hashlib
+import json
+
+TAMANHO_LEITURA = 1024 * 1024
+
+def hash_do_conteudo(caminho):
+    """Hash BLAKE2b (hex, 128 bits) do conteúdo do arquivo."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_LEITURA), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def chave_da_analise(hash_conteudo, parametros):
+    """Chave que identifica a análise de um conteúdo com um conjunto de parâmetros."""
+    assinatura = json.dumps(parametros, sort_keys=True)
+    return hashlib.blake2b(f"{hash_conteudo}|{assinatura}".encode('utf-8'), digest_size=16).hexdigest()
@@ -0,0 +1,116 @@
+"""
+Cache persistente das buscas de vídeo dos downloaders.
+
+Um índice SQLite guarda, para cada consulta, o (link, título) do primeiro
+resultado, ou o fato de que a busca não encontrou nada (cache negativo). As
+duas coisas têm validades diferentes: um link encontrado vale por semanas,
+já um "não encontrado" é tentado de novo depois de um dia, porque o
+resultado da busca muda.
+
+Erros da busca (exceções do provedor) não são guardados: só respostas de
+verdade. Assim, rodar de novo depois de uma execução que falhou no meio só
+consulta a API para as músicas que nunca foram resolvidas.
+
+O provedor da busca é uma função `consulta -> (link, título)` ou
+(None, None); cada downloader passa a sua (e um provedor falso, nos testes).
+"""
+
+import sqlite3
+import threading
+import time
+
+CAMINHO_BANCO = 'cache_busca.sqlite'
+VALIDADE_POSITIVA = 30 * 24 * 3600  # segundos
+VALIDADE_NEGATIVA = 24 * 3600
+
+def normalizar_consulta(consulta):
+    """Chave da consulta: sem diferença de maiúsculas nem de espaços."""
+    return ' '.join(consulta.lower().split())
+
+class CacheBusca:
+    """Memoriza (link, título) por consulta, inclusive as que não acharam nada."""
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO, validade_positiva=VALIDADE_POSITIVA,
+                 validade_negativa=VALIDADE_NEGATIVA):
+        self.validade_positiva = validade_positiva
+        self.validade_negativa = validade_negativa
+        self.acertos = 0            # Consultas respondidas pelo cache com um link
+        self.acertos_negativos = 0  # Consultas respondidas pelo cache com "não encontrado"
+        self.falhas = 0             # Consultas que precisaram ir à API
+        self.erros = 0              # Consultas em que a API deu erro (não guardadas)
+        self._trava = threading.Lock()
+
+        self._conexao = sqlite3.connect(caminho_banco, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS buscas (
+                consulta TEXT PRIMARY KEY,
+                link TEXT,
+                titulo TEXT,
+                salvo_em REAL NOT NULL
+            )
+        """)
+        self._conexao.commit()
+
+    def obter(self, consulta):
+        """
+        Retorna (link, título) salvo e ainda válido para a consulta, com
+        (None, None) para um "não encontrado", ou None se a consulta não
+        está no cache (ou expirou).
+        """
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT link, titulo, salvo_em FROM buscas WHERE consulta = ?", (normalizar_consulta(consulta),)
+            ).fetchone()
+        if linha is None:
+            return None
+        link, titulo, salvo_em = linha
+        validade = self.validade_positiva if link else self.validade_negativa
+        if time.time() - salvo_em >= validade:
+            return None
+        return (link, titulo)
+
+    def guardar(self, consulta, link, titulo=None):
+        with self._trava:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO buscas (consulta, link, titulo, salvo_em) VALUES (?, ?, ?, ?)",
+                (normalizar_consulta(consulta), link, titulo, time.time()),
+            )
+            self._conexao.commit()
+
+    def buscar(self, consulta, provedor):
+        """
+        (link, título) da consulta: do cache, se houver, ou do `provedor`
+        (guardando a resposta). Exceções do provedor sobem sem serem guardadas.
+        """
+        salvo = self.obter(consulta)
+        if salvo is not None:
+            with self._trava:
+                if salvo[0]:
+                    self.acertos += 1
+                else:
+                    self.acertos_negativos += 1
+            return salvo
+
+        with self._trava:
+            self.falhas += 1
+        try:
+            link, titulo = provedor(consulta)
+        except Exception:
+            with self._trava:
+                self.erros += 1
+            raise
+        self.guardar(consulta, link, titulo)
+        return (link, titulo)
+
+    def estatisticas(self):
+        total = self.acertos + self.acertos_negativos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'acertos_negativos': self.acertos_negativos,
+            'falhas': self.falhas,
+            'erros': self.erros,
+            'taxa_de_acerto': (self.acertos + self.acertos_negativos) / total if total else 0.0,
+        }
+
+    def fechar(self):
+        self._conexao.close()
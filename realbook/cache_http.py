@@ -0,0 +1,203 @@
+"""
+Cache persistente em disco para as páginas baixadas pelo scraping.
+
+Os corpos das respostas ficam em arquivos dentro da pasta do cache (um por URL)
+e um índice SQLite guarda, para cada URL, o ETag, o Last-Modified, o tamanho e
+o horário do último acesso. A cada nova visita a página é revalidada com
+If-None-Match / If-Modified-Since: se o servidor responder 304, o corpo salvo
+é reaproveitado sem baixar a página de novo.
+
+Quando o cache passa de `tamanho_maximo` bytes, as entradas usadas há mais
+tempo são removidas (LRU).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+PASTA_CACHE = 'cache_http'
+TAMANHO_MAXIMO = 100 * 1024 * 1024  # 100 MB
+
+class CacheHTTP:
+    """Cache de respostas HTTP indexado por URL, com revalidação condicional."""
+
+    def __init__(self, pasta=PASTA_CACHE, tamanho_maximo=TAMANHO_MAXIMO, validade=0):
+        """
+        `validade`: segundos durante os quais uma entrada é usada sem nem
+        revalidar com o servidor (0 = sempre revalida).
+        """
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self.validade = validade
+        self.acertos = 0       # Respostas servidas pelo cache (frescas ou 304)
+        self.revalidados = 0   # Dentre os acertos, quantos vieram de um 304
+        self.falhas = 0        # Páginas que precisaram ser baixadas por inteiro
+        self._trava = threading.Lock()
+
+        os.makedirs(pasta, exist_ok=True)
+        self._conexao = sqlite3.connect(os.path.join(pasta, 'indice.sqlite'), check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                url TEXT PRIMARY KEY,
+                arquivo TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                tamanho INTEGER NOT NULL,
+                salvo_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conexao.commit()
+        self.tamanho_total = self._conexao.execute(
+            "SELECT COALESCE(SUM(tamanho), 0) FROM respostas"
+        ).fetchone()[0]
+
+    def _caminho(self, arquivo):
+        return os.path.join(self.pasta, arquivo)
+
+    def obter(self, url):
+        """
+        Retorna a entrada salva para a URL como dicionário
+        ({'corpo', 'etag', 'last_modified', 'salvo_em'}) ou None.
+        """
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT arquivo, etag, last_modified, salvo_em FROM respostas WHERE url = ?", (url,)
+            ).fetchone()
+        if linha is None:
+            return None
+        arquivo, etag, last_modified, salvo_em = linha
+        try:
+            with open(self._caminho(arquivo), 'r', encoding='utf-8') as f:
+                corpo = f.read()
+        except OSError:
+            # O arquivo sumiu do disco: trata como se não estivesse no cache
+            self.remover(url)
+            return None
+        return {'corpo': corpo, 'etag': etag, 'last_modified': last_modified, 'salvo_em': salvo_em}
+
+    def esta_fresca(self, entrada):
+        return self.validade > 0 and time.time() - entrada['salvo_em'] < self.validade
+
+    @staticmethod
+    def cabecalhos_condicionais(entrada):
+        """Cabeçalhos para revalidar uma entrada com o servidor."""
+        cabecalhos = {}
+        if entrada:
+            if entrada['etag']:
+                cabecalhos['If-None-Match'] = entrada['etag']
+            if entrada['last_modified']:
+                cabecalhos['If-Modified-Since'] = entrada['last_modified']
+        return cabecalhos
+
+    def guardar(self, url, corpo, etag=None, last_modified=None):
+        arquivo = hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html'
+        dados = corpo.encode('utf-8')
+        with open(self._caminho(arquivo), 'wb') as f:
+            f.write(dados)
+
+        agora = time.time()
+        with self._trava:
+            anterior = self._conexao.execute(
+                "SELECT tamanho FROM respostas WHERE url = ?", (url,)
+            ).fetchone()
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, arquivo, etag, last_modified, len(dados), agora, agora),
+            )
+            self._conexao.commit()
+            self.tamanho_total += len(dados) - (anterior[0] if anterior else 0)
+            self._despejar()
+
+    def renovar(self, url):
+        """Marca a entrada como revalidada e recém-usada (após um 304)."""
+        agora = time.time()
+        with self._trava:
+            self._conexao.execute(
+                "UPDATE respostas SET salvo_em = ?, ultimo_acesso = ? WHERE url = ?", (agora, agora, url)
+            )
+            self._conexao.commit()
+
+    def tocar(self, url):
+        """Marca a entrada como recém-usada, para a ordem do LRU."""
+        with self._trava:
+            self._conexao.execute("UPDATE respostas SET ultimo_acesso = ? WHERE url = ?", (time.time(), url))
+            self._conexao.commit()
+
+    def remover(self, url):
+        with self._trava:
+            self._remover(url)
+            self._conexao.commit()
+
+    def _remover(self, url):
+        linha = self._conexao.execute(
+            "SELECT arquivo, tamanho FROM respostas WHERE url = ?", (url,)
+        ).fetchone()
+        if linha is None:
+            return
+        arquivo, tamanho = linha
+        self._conexao.execute("DELETE FROM respostas WHERE url = ?", (url,))
+        self.tamanho_total -= tamanho
+        try:
+            os.remove(self._caminho(arquivo))
+        except OSError:
+            pass
+
+    def _despejar(self):
+        """Remove as entradas menos usadas recentemente até caber no limite."""
+        if self.tamanho_total <= self.tamanho_maximo:
+            return
+        for (url,) in self._conexao.execute(
+            "SELECT url FROM respostas ORDER BY ultimo_acesso ASC"
+        ).fetchall():
+            if self.tamanho_total <= self.tamanho_maximo:
+                break
+            self._remover(url)
+        self._conexao.commit()
+
+    def registrar_acerto(self, revalidado=False):
+        with self._trava:
+            self.acertos += 1
+            if revalidado:
+                self.revalidados += 1
+
+    def registrar_falha(self):
+        with self._trava:
+            self.falhas += 1
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'revalidados': self.revalidados,
+            'falhas': self.falhas,
+            'taxa_de_acerto': self.acertos / total if total else 0.0,
+            'tamanho_total': self.tamanho_total,
+        }
+
+    def fechar(self):
+        self._conexao.close()
+
+def baixar_com_cache(sessao, url, cache, timeout=None):
+    """
+    Baixa o texto de uma página passando pelo cache.
+    Levanta requests.exceptions.RequestException em caso de erro de acesso.
+    """
+    entrada = cache.obter(url)
+    if entrada and cache.esta_fresca(entrada):
+        cache.tocar(url)
+        cache.registrar_acerto()
+        return entrada['corpo']
+
+    response = sessao.get(url, headers=cache.cabecalhos_condicionais(entrada), timeout=timeout)
+    if response.status_code == 304 and entrada:
+        cache.renovar(url)
+        cache.registrar_acerto(revalidado=True)
+        return entrada['corpo']
+
+    response.raise_for_status()
+    cache.guardar(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    cache.registrar_falha()
+    return response.text
@@ -0,0 +1,113 @@
+"""
+Carregamento rápido (Parquet, com tipos) dos CSVs de músicas.
+
+Os notebooks e scripts releem do texto o songs_and_artists_updated.csv, o
+musicas_realbook_completo_melhorado.csv e o relatorio_downloads.csv, com
+tudo como objeto/texto: Country, Genre e status repetidos em cada linha e o
+Ano como float (1961.0, por causa das linhas sem ano).
+
+Aqui cada CSV ganha uma cópia em Parquet (PASTA_PARQUET) com os tipos de
+TABELAS: inteiros pequenos (Ano como Int16, que aceita vazio), categorias
+para as colunas com poucos valores e texto para o resto. carregar() lê só as
+colunas pedidas e aplica os filtros na leitura (o pyarrow pula os grupos de
+linhas que não passam, pelas estatísticas de cada grupo):
+
+    carregar('billboard', colunas=['Year', 'Genre'], filtros=[('Country', '==', 'Brazil')])
+
+A cópia guarda o tamanho e o mtime do CSV de origem nos metadados e é
+refeita sozinha quando o CSV muda. Rodando este arquivo, todas as cópias
+são (re)feitas.
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- CONFIGURAÇÃO ---
+PASTA_REALBOOK = os.path.dirname(os.path.abspath(__file__))
+PASTA_PARQUET = os.path.join(PASTA_REALBOOK, 'cache_parquet')
+# Linhas por grupo: os filtros pulam grupos inteiros, mas cada grupo tem o seu dicionário das
+# categorias, que o pandas precisa juntar. Com as tabelas de hoje, um grupo só é o mais rápido.
+LINHAS_POR_GRUPO = 100_000
+
+# nome: CSV de origem e tipo de cada coluna (as que não estão aqui ficam como o pandas ler)
+TABELAS = {
+    'billboard': {
+        'csv': os.path.join(PASTA_REALBOOK, '..', 'billboard', 'songs_and_artists_updated.csv'),
+        'tipos': {'Year': 'int16', 'Position': 'int8', 'Song': 'string', 'Artist': 'category',
+                  'Country': 'category', 'Genre': 'category'},
+    },
+    'realbook': {
+        'csv': os.path.join(PASTA_REALBOOK, 'musicas_realbook_completo_melhorado.csv'),
+        'tipos': {'Titulo': 'string', 'Autor': 'string', 'Ano': 'Int16'},
+    },
+    'relatorio': {
+        'csv': os.path.join(PASTA_REALBOOK, 'relatorio_downloads.csv'),
+        'tipos': {'musica_buscada': 'string', 'titulo_video_encontrado': 'string', 'similaridade': 'Int16',
+                  'status': 'category', 'aquisicao': 'category', 'classe_falha': 'category',
+                  'caminho_final': 'string', 'bytes': 'Int64', 'tentativas': 'Int16', 'erro': 'string'},
+    },
+}
+
+def _assinatura(caminho_csv):
+    """Tamanho e mtime do CSV, guardados na cópia para saber quando refazê-la."""
+    info = os.stat(caminho_csv)
+    return f"{info.st_size}:{info.st_mtime_ns}"
+
+def caminho_parquet(nome):
+    return os.path.join(PASTA_PARQUET, f"{nome}.parquet")
+
+def ler_csv_tipado(nome):
+    """Lê o CSV de origem da tabela já com os tipos de TABELAS."""
+    tabela = TABELAS[nome]
+    df = pd.read_csv(tabela['csv'], encoding='utf-8')
+    tipos = {coluna: tipo for coluna, tipo in tabela['tipos'].items() if coluna in df.columns}
+    for coluna, tipo in tipos.items():
+        if tipo.startswith('Int'):
+            # 1961.0 -> 1961; um valor não inteiro é erro (em vez de truncar em silêncio)
+            df[coluna] = pd.to_numeric(df[coluna]).astype(tipo)
+    return df.astype(tipos)
+
+def converter(nome):
+    """(Re)faz a cópia em Parquet da tabela. Retorna o caminho."""
+    os.makedirs(PASTA_PARQUET, exist_ok=True)
+    assinatura = _assinatura(TABELAS[nome]['csv'])
+    tabela = pa.Table.from_pandas(ler_csv_tipado(nome), preserve_index=False)
+    tabela = tabela.replace_schema_metadata({**tabela.schema.metadata, b'origem': assinatura.encode()})
+    destino = caminho_parquet(nome)
+    temporario = destino + '.tmp'
+    pq.write_table(tabela, temporario, row_group_size=LINHAS_POR_GRUPO)
+    os.replace(temporario, destino)  # quem estiver lendo nunca vê uma cópia pela metade
+    return destino
+
+def atualizado(nome):
+    """A cópia em Parquet existe e corresponde ao CSV atual?"""
+    destino = caminho_parquet(nome)
+    if not os.path.exists(destino):
+        return False
+    metadados = pq.read_schema(destino).metadata or {}
+    return metadados.get(b'origem') == _assinatura(TABELAS[nome]['csv']).encode()
+
+def carregar(nome, colunas=None, filtros=None):
+    """
+    DataFrame da tabela `nome` (ver TABELAS), com os tipos certos, a partir
+    da cópia em Parquet (refeita antes se o CSV mudou). `colunas` limita as
+    colunas lidas; `filtros` segue o formato do pyarrow, por exemplo
+    [('Year', '>=', 1990), ('Genre', 'in', ['rock', 'pop'])].
+    """
+    if not atualizado(nome):
+        converter(nome)
+    return pq.read_table(caminho_parquet(nome), columns=colunas, filters=filtros).to_pandas()
+
+def main():
+    for nome, tabela in TABELAS.items():
+        if not os.path.exists(tabela['csv']):
+            print(f"{nome}: {tabela['csv']} não existe, pulando")
+            continue
+        destino = converter(nome)
+        print(f"{nome}: {os.path.getsize(tabela['csv'])} bytes em CSV -> {os.path.getsize(destino)} em Parquet")
+
+if __name__ == "__main__":
+    main()
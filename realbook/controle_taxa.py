@@ -0,0 +1,206 @@
+"""
+Controle de taxa e de concorrência adaptativo para os acessos remotos dos
+downloaders (a API de busca e a fonte dos áudios).
+
+Antes, o ritmo era fixo: um time.sleep por item e um número fixo de threads.
+Devagar demais quando o serviço está folgado e agressivo demais quando ele
+começa a recusar. Aqui cada serviço ("backend") tem um LimitadorAdaptativo,
+compartilhado por todas as threads que o acessam, que combina:
+
+- um balde de fichas (BaldeDeFichas): no máximo `taxa` requisições por
+  segundo, com rajadas de até `capacidade`;
+- um limite de requisições simultâneas ajustado no estilo AIMD: sobe de 1
+  em 1 enquanto as requisições dão certo e são rápidas, e cai pela metade
+  quando a taxa de erros ou a latência média da janela recente passa do
+  aceitável.
+
+Só contam como erro, para o ajuste, as falhas que indicam sobrecarga: a
+função `sobrecarga(excecao)` de cada limitador decide (os downloaders usam
+fila_retentativas.indica_sobrecarga: HTTP 429/5xx, timeouts, conexões
+recusadas ou derrubadas). Uma falha permanente (vídeo indisponível,
+privado, 404) é resposta normal do serviço e não reduz a concorrência. Sem
+`sobrecarga`, toda exceção conta.
+
+As threads do pipeline são criadas com a concorrência máxima e o limitador
+decide quantas ficam ativas de cada vez. estatisticas() informa a taxa
+efetiva (requisições por segundo), os erros e o limite atual.
+
+Os parâmetros de cada serviço ficam em LIMITES_PADRAO (e podem ser
+sobrescritos na configuração de cada downloader).
+"""
+
+import collections
+import contextlib
+import threading
+import time
+
+# Parâmetros por serviço: 'busca' (API de busca) e 'download' (fonte dos áudios)
+LIMITES_PADRAO = {
+    'busca': {
+        'taxa': 5.0,                # requisições por segundo
+        'capacidade': 5,            # rajada máxima
+        'concorrencia_inicial': 2,
+        'concorrencia_maxima': 8,
+        'latencia_alvo': 3.0,       # segundos; acima disso o limite cai
+        'erros_tolerados': 0.1,     # fração de erros na janela
+    },
+    'download': {
+        'taxa': 10.0,
+        'capacidade': 10,
+        'concorrencia_inicial': 4,
+        'concorrencia_maxima': 16,
+        'latencia_alvo': 60.0,
+        'erros_tolerados': 0.2,
+    },
+}
+
+AMOSTRAS_MINIMAS_LATENCIA = 5  # requisições na janela antes de julgar a latência média
+PASSO_TAXA = 0.01              # fração da taxa máxima recuperada a cada rodada sem problemas
+TAXA_MINIMA_RELATIVA = 0.05    # a taxa nunca cai abaixo desta fração da máxima
+
+class BaldeDeFichas:
+    """Balde de fichas compartilhado entre threads: `taxa` fichas/s, até `capacidade` acumuladas."""
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = taxa
+        self.capacidade = capacidade or max(1.0, taxa)
+        self._fichas = self.capacidade
+        self._ultima = time.monotonic()
+        self._trava = threading.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultima) * self.taxa)
+        self._ultima = agora
+
+    def esvaziar(self):
+        """Descarta as fichas acumuladas (sem rajada logo depois de uma recusa)."""
+        with self._trava:
+            self._repor()
+            self._fichas = 0.0
+
+    def retirar(self, fichas=1):
+        """Espera até haver `fichas` disponíveis e as retira. Retorna o tempo esperado."""
+        inicio = time.monotonic()
+        while True:
+            with self._trava:
+                self._repor()
+                if self._fichas >= fichas:
+                    self._fichas -= fichas
+                    return time.monotonic() - inicio
+                espera = (fichas - self._fichas) / self.taxa
+            time.sleep(espera)
+
+class LimitadorAdaptativo:
+    """Balde de fichas + limite de concorrência AIMD para um serviço."""
+
+    def __init__(self, nome, taxa, capacidade=None, concorrencia_inicial=2, concorrencia_maxima=8,
+                 concorrencia_minima=1, latencia_alvo=None, erros_tolerados=0.1, janela=20, fator_reducao=0.5,
+                 sobrecarga=None):
+        self.nome = nome
+        self.sobrecarga = sobrecarga  # excecao -> bool; None = toda exceção indica sobrecarga
+        self.balde = BaldeDeFichas(taxa, capacidade)
+        self.taxa_maxima = taxa
+        self.taxa_minima = taxa * TAXA_MINIMA_RELATIVA
+        self.limite = float(concorrencia_inicial)
+        self.concorrencia_minima = concorrencia_minima
+        self.concorrencia_maxima = concorrencia_maxima
+        self.latencia_alvo = latencia_alvo
+        self.erros_tolerados = erros_tolerados
+        self.fator_reducao = fator_reducao
+        self.janela = janela
+
+        self.requisicoes = 0
+        self.erros = 0
+        self.reducoes = 0
+        self.espera_total = 0.0  # segundos esperando por fichas ou por vaga
+        self._recentes = collections.deque(maxlen=janela)  # (sucesso, latência)
+        self._em_andamento = 0
+        self._desde_reducao = 0
+        self._inicio = None
+        self._ultimo_fim = None
+        self._condicao = threading.Condition()
+
+    @classmethod
+    def para(cls, servico, **ajustes):
+        """Limitador com os parâmetros de LIMITES_PADRAO[servico], com `ajustes` por cima."""
+        return cls(servico, **{**LIMITES_PADRAO[servico], **ajustes})
+
+    @contextlib.contextmanager
+    def requisicao(self):
+        """
+        Envolve uma requisição ao serviço: espera vaga e ficha, mede a
+        latência e registra o resultado (uma exceção conta como erro e sobe;
+        só reduz a concorrência se `sobrecarga` disser que é sobrecarga).
+        """
+        inicio_espera = time.monotonic()
+        with self._condicao:
+            while self._em_andamento >= int(self.limite):
+                self._condicao.wait()
+            self._em_andamento += 1
+            if self._inicio is None:
+                self._inicio = time.monotonic()
+        try:
+            self.balde.retirar()
+            inicio = time.monotonic()
+            with self._condicao:
+                self.espera_total += inicio - inicio_espera
+            try:
+                yield
+            except Exception as e:
+                self._registrar(False, time.monotonic() - inicio,
+                                sobrecarga=self.sobrecarga is None or self.sobrecarga(e))
+                raise
+            self._registrar(True, time.monotonic() - inicio)
+        finally:
+            with self._condicao:
+                self._em_andamento -= 1
+                self._condicao.notify_all()
+
+    def _registrar(self, sucesso, latencia, sobrecarga=True):
+        with self._condicao:
+            self.requisicoes += 1
+            self.erros += not sucesso
+            self._ultimo_fim = time.monotonic()
+            # Para o ajuste, uma falha que não é de sobrecarga vale como resposta normal do serviço
+            sucesso = sucesso or not sobrecarga
+            self._recentes.append((sucesso, latencia))
+            self._desde_reducao += 1
+
+            falhas = sum(not ok for ok, _ in self._recentes)
+            latencia_media = sum(lat for _, lat in self._recentes) / len(self._recentes)
+            sobrecarregado = falhas / len(self._recentes) > self.erros_tolerados or (
+                self.latencia_alvo and len(self._recentes) >= AMOSTRAS_MINIMAS_LATENCIA
+                and latencia_media > self.latencia_alvo)
+            if sobrecarregado and self._desde_reducao >= int(self.limite):
+                # Diminuição multiplicativa, no máximo uma por "rodada" de requisições (as que
+                # já estavam em andamento falham pelo mesmo motivo); a janela recomeça
+                self.limite = max(self.concorrencia_minima, self.limite * self.fator_reducao)
+                self.balde.taxa = max(self.taxa_minima, self.balde.taxa * self.fator_reducao)
+                self.balde.esvaziar()
+                self.reducoes += 1
+                self._desde_reducao = 0
+                self._recentes.clear()
+            elif sucesso and not sobrecarregado:
+                # Aumento aditivo: +1 na concorrência a cada `limite` sucessos (uma rodada),
+                # e a taxa volta aos poucos para o máximo configurado
+                self.limite = min(self.concorrencia_maxima, self.limite + 1 / self.limite)
+                self.balde.taxa = min(self.taxa_maxima, self.balde.taxa + self.taxa_maxima * PASSO_TAXA / self.limite)
+            self._condicao.notify_all()
+
+    def estatisticas(self):
+        with self._condicao:
+            decorrido = (self._ultimo_fim or 0) - (self._inicio or 0)
+            return {
+                'requisicoes': self.requisicoes,
+                'erros': self.erros,
+                'req_por_s': self.requisicoes / decorrido if decorrido > 0 else 0.0,
+                'concorrencia': int(self.limite),
+                'reducoes': self.reducoes,
+                'espera_total': self.espera_total,
+            }
+
+    def resumo(self):
+        e = self.estatisticas()
+        return (f"{self.nome}: {e['requisicoes']} requisições, {e['erros']} erros, {e['req_por_s']:.2f} req/s, "
+                f"concorrência final {e['concorrencia']} ({e['reducoes']} reduções)")
@@ -0,0 +1,204 @@
+"""
+Descoberta incremental de links de músicas do Real Book Site.
+
+Em vez de visitar de novo todas as músicas listadas nas 'letter-section' da
+página principal, lê o sitemap do site (WordPress: wp-sitemap.xml, ou
+sitemap_index.xml / sitemap.xml) e compara os <lastmod> com o estado salvo na
+última execução bem-sucedida. Só as URLs novas ou modificadas desde então
+precisam ser baixadas.
+
+O estado fica num JSON com a data da última execução e, para cada URL
+conhecida, o lastmod visto, a chave (Titulo, Ano, Autor) da música extraída,
+que permite substituir a linha antiga no CSV quando a página muda, e se a URL
+ficou pendente (falhou e deve ser tentada de novo na próxima execução).
+
+Se o site não tiver sitemap, a descoberta cai para a lista da página
+principal e devolve só os links que não estavam no estado salvo.
+
+O sitemap também pode ser um arquivo local (por exemplo
+'paginas_exemplo/wp-sitemap.xml'); nesse caso, os sub-sitemaps de um índice
+são procurados na mesma pasta.
+"""
+
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+
+ARQUIVO_ESTADO = 'estado_descoberta.json'
+CAMINHOS_SITEMAP = ['/wp-sitemap.xml', '/sitemap_index.xml', '/sitemap.xml']
+# Num índice de sitemaps, só os sub-sitemaps de posts têm músicas
+# (WordPress: wp-sitemap-posts-post-N.xml; Yoast: post-sitemap.xml).
+PADRAO_SITEMAP_MUSICAS = re.compile(r'posts-post|post-sitemap')
+
+_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+def _ler_data(texto):
+    """Converte um <lastmod> (W3C datetime, com ou sem hora) para datetime em UTC."""
+    if not texto:
+        return None
+    try:
+        data = datetime.fromisoformat(texto.strip())
+    except ValueError:
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data.astimezone(timezone.utc)
+
+def _formatar_data(data):
+    return data.isoformat() if data else None
+
+def carregar_estado(caminho=ARQUIVO_ESTADO):
+    """Retorna {'ultima_execucao': datetime|None, 'links': {url: {'lastmod', 'chave', 'pendente'}}}."""
+    if not os.path.exists(caminho):
+        return {'ultima_execucao': None, 'links': {}}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        bruto = json.load(f)
+    return {
+        'ultima_execucao': _ler_data(bruto.get('ultima_execucao')),
+        'links': {
+            url: {
+                'lastmod': _ler_data(info.get('lastmod')),
+                'chave': info.get('chave'),
+                'pendente': info.get('pendente', False),
+            }
+            for url, info in bruto.get('links', {}).items()
+        },
+    }
+
+def salvar_estado(estado, caminho=ARQUIVO_ESTADO):
+    bruto = {
+        'ultima_execucao': _formatar_data(estado['ultima_execucao']),
+        'links': {
+            url: {'lastmod': _formatar_data(info['lastmod']), 'chave': info['chave'], 'pendente': info['pendente']}
+            for url, info in sorted(estado['links'].items())
+        },
+    }
+    caminho_temporario = caminho + '.tmp'
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump(bruto, f, ensure_ascii=False, indent=1)
+    os.replace(caminho_temporario, caminho)
+
+def _eh_local(origem):
+    return not origem.startswith(('http://', 'https://'))
+
+def _baixar_xml(origem, sessao):
+    if _eh_local(origem):
+        with open(origem, 'rb') as f:
+            return f.read()
+    response = sessao.get(origem, timeout=10)
+    response.raise_for_status()
+    return response.content
+
+def ler_sitemap(origem, sessao=None, desde=None):
+    """
+    Lê um sitemap (URL ou arquivo local) e retorna {url: lastmod}.
+
+    Índices de sitemaps são seguidos recursivamente, filtrando os sub-sitemaps
+    por PADRAO_SITEMAP_MUSICAS. Com `desde`, sub-sitemaps cujo lastmod é mais
+    antigo que essa data são pulados (nada neles mudou).
+    """
+    sessao = sessao or requests
+    raiz = ET.fromstring(_baixar_xml(origem, sessao))
+    links = {}
+
+    if raiz.tag == f'{_NS}sitemapindex':
+        for sitemap in raiz.iter(f'{_NS}sitemap'):
+            loc = sitemap.findtext(f'{_NS}loc', '').strip()
+            if not loc or not PADRAO_SITEMAP_MUSICAS.search(loc):
+                continue
+            lastmod = _ler_data(sitemap.findtext(f'{_NS}lastmod'))
+            if desde and lastmod and lastmod <= desde:
+                continue
+            if _eh_local(origem):
+                loc = os.path.join(os.path.dirname(origem), os.path.basename(urlsplit(loc).path))
+            links.update(ler_sitemap(loc, sessao, desde))
+        return links
+
+    for url in raiz.iter(f'{_NS}url'):
+        loc = url.findtext(f'{_NS}loc', '').strip()
+        if loc:
+            links[loc] = _ler_data(url.findtext(f'{_NS}lastmod'))
+    return links
+
+def encontrar_sitemap(base_url, sessao=None):
+    """Procura o sitemap do site nos caminhos usuais; retorna a URL ou None."""
+    sessao = sessao or requests
+    for caminho in CAMINHOS_SITEMAP:
+        url = f"{base_url.rstrip('/')}{caminho}"
+        try:
+            response = sessao.get(url, timeout=10)
+        except requests.exceptions.RequestException:
+            continue
+        if response.ok and (b'<urlset' in response.content or b'<sitemapindex' in response.content):
+            return url
+    return None
+
+def descobrir_links(base_url, estado, sessao=None, cache=None, sitemap=None):
+    """
+    Retorna (links_para_processar, lastmods_atuais).
+
+    `links_para_processar` são as URLs novas ou com lastmod mais recente que o
+    salvo no estado. `lastmods_atuais` é {url: lastmod} de todas as músicas do
+    site, para atualizar o estado depois de uma execução bem-sucedida.
+    """
+    from scrape_realbook import get_all_song_links
+
+    sitemap = sitemap or encontrar_sitemap(base_url, sessao)
+    conhecidos = estado['links']
+
+    if sitemap is None:
+        print("Sitemap não encontrado; usando a lista da página principal.")
+        atuais = {url: None for url in get_all_song_links(base_url, sessao, cache)}
+    else:
+        print(f"Lendo o sitemap: {sitemap}")
+        # Sub-sitemaps sem mudanças desde a última execução não são lidos, então
+        # as URLs conhecidas começam com o lastmod salvo. Se alguma URL ficou
+        # pendente, tudo é lido de novo para não perder a modificação dela.
+        pendentes = any(info['pendente'] for info in conhecidos.values())
+        desde = None if pendentes else estado['ultima_execucao']
+        atuais = {url: info['lastmod'] for url, info in conhecidos.items()}
+        atuais.update(ler_sitemap(sitemap, sessao, desde=desde))
+        atuais.pop(base_url.rstrip('/') + '/', None)
+
+    para_processar = []
+    for url, lastmod in atuais.items():
+        anterior = conhecidos.get(url)
+        if anterior is None or anterior['pendente']:
+            para_processar.append(url)
+        elif lastmod and (anterior['lastmod'] is None or lastmod > anterior['lastmod']):
+            para_processar.append(url)
+
+    print(f"{len(atuais)} músicas no site, {len(para_processar)} novas ou modificadas desde a última execução.")
+    return sorted(para_processar), atuais
+
+def atualizar_estado(estado, lastmods_atuais, links_visitados, chaves_processadas, inicio_execucao):
+    """
+    Atualiza o estado após uma execução bem-sucedida.
+
+    `links_visitados` são as URLs que esta execução tentou processar e
+    `chaves_processadas` é {url: (Titulo, Ano, Autor)} das que deram certo.
+    URLs sem lastmod (lista da página principal) recebem o horário do início
+    da execução, quando foram vistas pela última vez. As que falharam ficam
+    pendentes, com o lastmod antigo, para serem tentadas de novo.
+    """
+    visitados = set(links_visitados)
+    links = {}
+    for url, lastmod in lastmods_atuais.items():
+        anterior = estado['links'].get(url)
+        if url in chaves_processadas:
+            links[url] = {'lastmod': lastmod or inicio_execucao, 'chave': list(chaves_processadas[url]), 'pendente': False}
+        elif url in visitados:
+            if anterior is not None:
+                links[url] = {**anterior, 'pendente': True}
+            else:
+                links[url] = {'lastmod': None, 'chave': None, 'pendente': True}
+        elif anterior is not None:
+            links[url] = anterior
+    estado['links'] = links
+    estado['ultima_execucao'] = inicio_execucao
+    return estado
@@ -0,0 +1,148 @@
+"""
+Estado persistente de cada música ("job") dos downloaders.
+
+Antes, o relatorio_downloads.csv só era escrito depois que todas as
+músicas terminavam (uma queda no meio perdia tudo), cada execução
+reprocessava todas as linhas do CSV de entrada e o limpeza_downloads.py
+tinha que adivinhar, pelos nomes dos arquivos, o que tinha dado certo.
+
+Aqui cada item tem uma linha na tabela `jobs` do banco SQLite dos downloads
+(o mesmo da fila de retentativas), atualizada numa transação a cada
+mudança, enquanto o pipeline roda:
+
+- 'Pendente' ao entrar na execução;
+- 'Em andamento', com a etapa atual (busca, download, transcodificação);
+- o status final do downloader ('Sucesso' ou 'Falha (...)'), com o número
+  de tentativas, o caminho e o tamanho do arquivo final, o modo de
+  aquisição, a classe da falha e o tempo de cada etapa.
+
+Ao recomeçar, pular_concluidos() tira da lista os itens com 'Sucesso' cujo
+arquivo final ainda existe (o arquivo só ganha o nome final quando está
+completo, ver processamento_audio.transcodificar). O relatório em CSV passa
+a ser só uma exportação da tabela (exportar_csv).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from fila_retentativas import CAMINHO_BANCO, chave_do_item
+
+# Colunas do relatório exportado, na ordem
+COLUNAS_RELATORIO = ['musica_buscada', 'titulo_video_encontrado', 'similaridade', 'status', 'aquisicao',
+                     'classe_falha', 'caminho_final', 'bytes', 'tentativas', 'duracao', 'tempos', 'erro']
+
+class EstadoJobs:
+    """Status, tentativas, arquivo final e tempos de cada item, gravados em SQLite à medida que mudam."""
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO):
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_banco, check_same_thread=False)
+        # WAL: a fila de retentativas usa o mesmo arquivo por outra conexão
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                chave TEXT PRIMARY KEY,
+                musica_buscada TEXT,
+                titulo_video_encontrado TEXT,
+                video_url TEXT,
+                similaridade INTEGER,
+                status TEXT NOT NULL,
+                etapa TEXT,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                caminho_final TEXT,
+                bytes INTEGER,
+                aquisicao TEXT,
+                classe_falha TEXT,
+                erro TEXT,
+                tempos TEXT,
+                iniciado_em REAL,
+                terminado_em REAL
+            )
+        """)
+        # Bancos criados antes da coluna de similaridade
+        colunas = {linha[1] for linha in self._conexao.execute("PRAGMA table_info(jobs)")}
+        if 'similaridade' not in colunas:
+            self._conexao.execute("ALTER TABLE jobs ADD COLUMN similaridade INTEGER")
+        self._conexao.commit()
+
+    def _executar(self, sql, parametros):
+        with self._trava, self._conexao:
+            self._conexao.execute(sql, parametros)
+
+    def pular_concluidos(self, itens):
+        """
+        Retorna (restantes, pulados): os itens que ainda precisam rodar e
+        quantos já terminaram com sucesso numa execução anterior (com o
+        arquivo final no disco).
+        """
+        with self._trava:
+            concluidos = dict(self._conexao.execute(
+                "SELECT chave, caminho_final FROM jobs WHERE status = 'Sucesso'").fetchall())
+        restantes = []
+        for item in itens:
+            caminho = concluidos.get(chave_do_item(item))
+            if not (caminho and os.path.exists(caminho)):
+                restantes.append(item)
+        return restantes, len(itens) - len(restantes)
+
+    def registrar_pendentes(self, itens):
+        """Marca os itens desta execução como 'Pendente' (criando as linhas que faltam)."""
+        with self._trava, self._conexao:
+            self._conexao.executemany(
+                "INSERT INTO jobs (chave, musica_buscada, status) VALUES (?, ?, 'Pendente') "
+                "ON CONFLICT(chave) DO UPDATE SET status = 'Pendente', etapa = NULL, iniciado_em = NULL",
+                [(chave_do_item(item), item['musica_buscada']) for item in itens],
+            )
+
+    def registrar_etapa(self, item, etapa):
+        """O item começou a `etapa` do pipeline (chamado pelas threads do pipeline)."""
+        self._executar(
+            "UPDATE jobs SET status = 'Em andamento', etapa = ?, iniciado_em = COALESCE(iniciado_em, ?), "
+            "video_url = COALESCE(?, video_url) WHERE chave = ?",
+            (etapa, time.time(), item.get('video_url'), chave_do_item(item)),
+        )
+
+    def registrar_resultado(self, item):
+        """Grava o resultado final de uma tentativa do item (sucesso ou falha)."""
+        caminho = item.get('caminho_final')
+        tamanho = os.path.getsize(caminho) if caminho and os.path.exists(caminho) else None
+        tempos = item.get('tempos')
+        agora = time.time()
+        self._executar(
+            "INSERT INTO jobs (chave, musica_buscada, titulo_video_encontrado, video_url, similaridade, status, "
+            "tentativas, caminho_final, bytes, aquisicao, classe_falha, erro, tempos, iniciado_em, terminado_em) "
+            "VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(chave) DO UPDATE SET titulo_video_encontrado = excluded.titulo_video_encontrado, "
+            "video_url = COALESCE(excluded.video_url, video_url), "
+            "similaridade = COALESCE(excluded.similaridade, similaridade), status = excluded.status, etapa = NULL, "
+            "tentativas = tentativas + 1, caminho_final = excluded.caminho_final, bytes = excluded.bytes, "
+            "aquisicao = excluded.aquisicao, classe_falha = excluded.classe_falha, erro = excluded.erro, "
+            "tempos = excluded.tempos, iniciado_em = COALESCE(iniciado_em, excluded.iniciado_em), "
+            "terminado_em = excluded.terminado_em",
+            (chave_do_item(item), item['musica_buscada'], item.get('titulo_video_encontrado'), item.get('video_url'),
+             item.get('similaridade'), item['status'], caminho, tamanho, item.get('aquisicao'), item.get('classe_falha'),
+             item.get('erro'), json.dumps(tempos) if tempos else None, agora, agora),
+        )
+
+    def contagem(self):
+        """Quantos itens há em cada status."""
+        with self._trava:
+            return dict(self._conexao.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def exportar_csv(self, caminho_csv):
+        """Escreve o relatório de todos os itens (não só os desta execução) em CSV."""
+        with self._trava:
+            df = pd.read_sql_query(
+                "SELECT *, terminado_em - iniciado_em AS duracao FROM jobs ORDER BY musica_buscada", self._conexao)
+        df[['bytes', 'similaridade']] = df[['bytes', 'similaridade']].astype('Int64')
+        df['duracao'] = df['duracao'].round(3)
+        df[COLUNAS_RELATORIO].to_csv(caminho_csv, index=False, encoding='utf-8')
+        return len(df)
+
+    def fechar(self):
+        self._conexao.close()
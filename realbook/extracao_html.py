@@ -0,0 +1,146 @@
+"""
+Backends de extração de HTML para as páginas de música do Real Book Site.
+
+Das páginas de música só precisamos do texto do <h1 class="entry-title"> e do
+primeiro <p>/<div> com a classe 'has-text-align-right' ou 'entry-content'.
+Cada backend devolve esse par (titulo, texto_do_conteudo):
+
+- 'bs4':      BeautifulSoup com 'html.parser' sobre a página inteira
+              (o comportamento original do scrape_realbook.py);
+- 'strainer': BeautifulSoup com um SoupStrainer, que só monta na árvore as
+              tags com as classes que lemos (e o que estiver dentro delas);
+- 'lxml':     lxml.html com XPath, sem montar objetos Python para o resto.
+
+Rodando este arquivo, os backends são comparados nas páginas salvas em
+'paginas_exemplo' (mesmo resultado do 'bs4' e tempo de parse por página).
+
+Dependências opcionais:
+- lxml (para o backend 'lxml'; instale com: pip install lxml)
+"""
+
+import os
+import statistics
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:
+    lxml = None
+
+CLASSES_CONTEUDO = ['has-text-align-right', 'entry-content']
+_CLASSES_LIDAS = {'entry-title', *CLASSES_CONTEUDO}
+
+# --- CONFIGURAÇÃO DA COMPARAÇÃO ---
+PASTA_PAGINAS = 'paginas_exemplo'
+REPETICOES = 50
+
+def _extrair_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return _titulo_e_conteudo_bs4(soup)
+
+def _tem_classe_lida(valor):
+    # Durante o parse o atributo 'class' pode chegar como texto cru
+    # ("entry-title  post-title") ou já dividido em lista, conforme a versão do bs4.
+    if not valor:
+        return False
+    classes = valor.split() if isinstance(valor, str) else valor
+    return any(classe in _CLASSES_LIDAS for classe in classes)
+
+_FILTRO_STRAINER = SoupStrainer(attrs={'class': _tem_classe_lida})
+
+def _extrair_strainer(html):
+    soup = BeautifulSoup(html, 'html.parser', parse_only=_FILTRO_STRAINER)
+    return _titulo_e_conteudo_bs4(soup)
+
+def _titulo_e_conteudo_bs4(soup):
+    title_tag = soup.find('h1', class_='entry-title')
+    content_tag = soup.find(['p', 'div'], class_=CLASSES_CONTEUDO)
+    return (
+        title_tag.text if title_tag else None,
+        content_tag.get_text() if content_tag else None,
+    )
+
+def _xpath_classe(*classes):
+    return ' or '.join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {classe} ')" for classe in classes
+    )
+
+_XPATH_TITULO = f"(//h1[{_xpath_classe('entry-title')}])[1]"
+_XPATH_CONTEUDO = f"(//*[self::p or self::div][{_xpath_classe(*CLASSES_CONTEUDO)}])[1]"
+
+def _extrair_lxml(html):
+    if lxml is None:
+        raise ImportError("O backend 'lxml' precisa do pacote lxml (pip install lxml).")
+    try:
+        raiz = lxml.html.document_fromstring(html)
+    except ParserError:
+        return None, None
+    title_tag = raiz.xpath(_XPATH_TITULO)
+    content_tag = raiz.xpath(_XPATH_CONTEUDO)
+    return (
+        title_tag[0].text_content() if title_tag else None,
+        content_tag[0].text_content() if content_tag else None,
+    )
+
+BACKENDS = {
+    'bs4': _extrair_bs4,
+    'strainer': _extrair_strainer,
+    'lxml': _extrair_lxml,
+}
+
+def extrair_titulo_e_conteudo(html, backend='bs4'):
+    """
+    Retorna (titulo, texto_do_conteudo) de uma página de música, sem strip;
+    cada item é None se a tag correspondente não existir.
+    """
+    try:
+        extrator = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Backend de extração desconhecido: '{backend}'. Opções: {', '.join(BACKENDS)}")
+    return extrator(html)
+
+def comparar_backends(pasta=PASTA_PAGINAS, repeticoes=REPETICOES):
+    """
+    Roda todos os backends disponíveis sobre as páginas salvas e compara o
+    resultado de parse_song_details com o do backend 'bs4' (referência).
+    Imprime o tempo de parse de cada página em cada backend e retorna a
+    lista de divergências (página, backend, esperado, obtido).
+    """
+    from scrape_realbook import parse_song_details
+
+    backends = [nome for nome in BACKENDS if nome != 'lxml' or lxml is not None]
+    paginas = sorted(nome for nome in os.listdir(pasta) if nome.endswith('.html') and nome != 'index.html')
+    tempos = {nome: [] for nome in backends}
+    divergencias = []
+
+    for pagina in paginas:
+        with open(os.path.join(pasta, pagina), 'r', encoding='utf-8') as f:
+            html = f.read()
+        referencia = parse_song_details(html, 'bs4')
+        for backend in backends:
+            resultado = parse_song_details(html, backend)
+            if resultado != referencia:
+                divergencias.append((pagina, backend, referencia, resultado))
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                parse_song_details(html, backend)
+            tempos[backend].append((time.perf_counter() - inicio) / repeticoes)
+
+    print(f"--- {len(paginas)} páginas de '{pasta}', {repeticoes} repetições (ms por página) ---")
+    print(f"{'página':<30}" + ''.join(f"{backend:>10}" for backend in backends))
+    for i, pagina in enumerate(paginas):
+        print(f"{pagina:<30}" + ''.join(f"{tempos[backend][i] * 1000:10.3f}" for backend in backends))
+    print(f"{'mediana':<30}" + ''.join(f"{statistics.median(tempos[backend]) * 1000:10.3f}" for backend in backends))
+    if divergencias:
+        print(f"\n{len(divergencias)} divergências em relação ao 'bs4':")
+        for pagina, backend, esperado, obtido in divergencias:
+            print(f"  {pagina} [{backend}]: esperado {esperado}, obtido {obtido}")
+    else:
+        print("\nTodos os backends produziram os mesmos dados que o 'bs4'.")
+    return divergencias
+
+if __name__ == "__main__":
+    comparar_backends()
@@ -0,0 +1,120 @@
+"""
+Execução paralela da análise de batidas, um arquivo por processo de trabalho.
+
+Cada trabalhador é um processo próprio que recebe um arquivo por vez por um
+Pipe exclusivo e devolve o resultado pelo mesmo Pipe. O processo principal:
+- distribui os arquivos entre os trabalhadores livres;
+- interrompe (terminate) o trabalhador que passar do tempo limite num arquivo;
+- detecta o trabalhador que morreu no meio de um arquivo (ex.: falha no
+  decodificador);
+e, nos dois casos, registra a falha só daquele arquivo e sobe um trabalhador
+novo no lugar, sem derrubar o lote. Como cada trabalhador tem seu próprio
+Pipe, matar um deles não corrompe a comunicação com os outros.
+"""
+
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+def _trabalhador(conexao):
+    # Importado dentro do processo para não exigir librosa no processo principal
+    from extrair_batidas import analisar_batidas_do_audio
+
+    while True:
+        try:
+            tarefa = conexao.recv()
+        except EOFError:
+            break
+        if tarefa is None:
+            break
+        nome_arquivo, caminho = tarefa
+        try:
+            bpm, tempos, duracao = analisar_batidas_do_audio(caminho, verboso=False)
+            if tempos is None:
+                resultado = (nome_arquivo, 'erro', None, None, 0.0, 'erro no carregamento')
+            else:
+                resultado = (nome_arquivo, 'sucesso', bpm, tempos, duracao, '')
+        except Exception as e:
+            resultado = (nome_arquivo, 'erro', None, None, 0.0, f"{type(e).__name__}: {e}")
+        conexao.send(resultado)
+
+class _Trabalhador:
+    def __init__(self, contexto):
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.processo = contexto.Process(target=_trabalhador, args=(conexao_filho,), daemon=True)
+        self.processo.start()
+        conexao_filho.close()
+        self.tarefa = None
+        self.inicio = None
+
+    def enviar(self, tarefa):
+        self.tarefa = tarefa
+        self.inicio = time.monotonic()
+        self.conexao.send(tarefa)
+
+    def encerrar(self, forcar=False):
+        if forcar:
+            self.processo.terminate()
+        else:
+            try:
+                self.conexao.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.processo.join(timeout=5)
+        if self.processo.is_alive():
+            self.processo.kill()
+            self.processo.join()
+        self.conexao.close()
+
+def processar_em_paralelo(tarefas, num_processos, timeout_por_arquivo, ao_concluir):
+    """
+    Analisa `tarefas` (lista de (nome_arquivo, caminho)) com até `num_processos`
+    processos. Para cada arquivo, chama no processo principal:
+        ao_concluir(nome_arquivo, status, bpm, tempos, duracao_audio, mensagem)
+    com status 'sucesso', 'erro', 'timeout' ou 'falha_do_processo'.
+    `timeout_por_arquivo` = None ou 0 desativa o limite de tempo.
+    """
+    # 'spawn' em vez de 'fork': processos criados por fork herdam o estado do
+    # numba/LLVM (usados pelo librosa) e podem travar ou morrer com SIGSEGV.
+    contexto = multiprocessing.get_context('spawn')
+    pendentes = deque(tarefas)
+    trabalhadores = [_Trabalhador(contexto) for _ in range(min(num_processos, len(tarefas)))]
+
+    try:
+        while True:
+            for trabalhador in trabalhadores:
+                if trabalhador.tarefa is None and pendentes:
+                    trabalhador.enviar(pendentes.popleft())
+
+            ocupados = [t for t in trabalhadores if t.tarefa is not None]
+            if not ocupados:
+                break
+
+            prontas = wait([t.conexao for t in ocupados], timeout=0.5)
+            for i, trabalhador in enumerate(trabalhadores):
+                if trabalhador.tarefa is None:
+                    continue
+                nome_arquivo = trabalhador.tarefa[0]
+
+                if trabalhador.conexao in prontas:
+                    try:
+                        resultado = trabalhador.conexao.recv()
+                    except (EOFError, OSError):
+                        # O processo morreu no meio do arquivo
+                        trabalhador.encerrar(forcar=True)
+                        trabalhadores[i] = _Trabalhador(contexto)
+                        ao_concluir(nome_arquivo, 'falha_do_processo', None, None, 0.0,
+                                    f"código de saída {trabalhador.processo.exitcode}")
+                        continue
+                    trabalhador.tarefa = None
+                    ao_concluir(*resultado)
+
+                elif timeout_por_arquivo and time.monotonic() - trabalhador.inicio > timeout_por_arquivo:
+                    trabalhador.encerrar(forcar=True)
+                    trabalhadores[i] = _Trabalhador(contexto)
+                    ao_concluir(nome_arquivo, 'timeout', None, None, 0.0,
+                                f"mais de {timeout_por_arquivo} s")
+    finally:
+        for trabalhador in trabalhadores:
+            trabalhador.encerrar(forcar=trabalhador.tarefa is not None)
@@ -6,7 +6,12 @@ Script para extrair batidas (BPM e tempos) de ficheiros de áudio usando librosa
 
 Este script lê ficheiros de áudio de uma pasta de entrada, analisa-os com
 librosa.beat.beat_track() e salva os resultados (BPM e lista de tempos)
-em ficheiros .txt numa pasta de saída.
+num armazém consolidado (armazem_batidas.py) e, opcionalmente, em ficheiros
+.txt numa pasta de saída.
+
+O áudio é decodificado numa taxa fixa (SR_ANALISE), opcionalmente só a janela
+inicial (DURACAO_MAXIMA), e áudios longos são lidos em blocos, para que o
+áudio inteiro nunca fique em memória (ver benchmark_batidas.py).
 
 Dependências:
 - librosa
@@ -18,6 +23,11 @@ import librosa
 import numpy as np
 import os
 import sys
+import time
+
+from armazem_batidas import ArmazemBatidas
+from cache_analise import chave_da_analise
+from manifesto_audios import CAMINHO_BANCO as CAMINHO_MANIFESTO, ManifestoAudios
 
 # ===================================================================
 # --- CONFIGURAÇÃO DE PASTAS ---
@@ -32,26 +42,145 @@ PASTA_DE_RESULTADOS_TXT = "resultados_batidas/batidas_boa_similaridade"
 #PASTA_DE_AUDIOS = "audios_mauro"
 #PASTA_DE_RESULTADOS_TXT = "resultados_batidas/audios_mauro"
 
+# 2. Carregamento do áudio
+# Taxa de amostragem da análise: o áudio é decodificado direto nessa taxa
+# (None = taxa original do arquivo, o comportamento antigo, que usa mais memória).
+SR_ANALISE = 22050
+# Analisa só os primeiros N segundos de cada arquivo (None = arquivo inteiro).
+# Os clipes baixados já têm 40 s; útil para áudios completos.
+DURACAO_MAXIMA = None
+# Arquivos (ou janelas) mais longos que isso são lidos em blocos com
+# librosa.stream: só o espectrograma mel (128 valores por quadro) cresce com o
+# tamanho do arquivo, não o áudio decodificado.
+LIMIAR_STREAMING_S = 180
+HOP_LENGTH = 512
+N_FFT = 2048
+BLOCOS_POR_LEITURA = 256  # quadros de análise por bloco no modo streaming
+
+# 3. Processamento paralelo (ver extracao_paralela.py)
+# Número de processos analisando arquivos ao mesmo tempo (1 = um por vez).
+NUM_PROCESSOS = os.cpu_count() or 1
+# Tempo máximo por arquivo; um arquivo que passar disso é interrompido e o
+# lote segue com os demais.
+TIMEOUT_POR_ARQUIVO = 120
+
+# 4. Saída (ver armazem_batidas.py)
+# Todos os resultados vão para um armazém único, lido com memória mapeada.
+PASTA_ARMAZEM = "resultados_batidas/armazem"
+# Também escreve o .txt de cada música em PASTA_DE_RESULTADOS_TXT, no formato
+# antigo (o armazém também pode exportá-los depois com exportar_txt).
+SALVAR_TXT = False
+
+# 5. Manifesto dos áudios (manifesto_audios.CAMINHO_BANCO, o mesmo de todos os scripts): a
+# lista de arquivos e o hash de cada um vêm dele, que só relê os arquivos novos ou modificados.
+EXTENSOES_ANALISADAS = ('.mp3', '.wav', '.ogg', '.flac')
+
 # ===================================================================
 # --- FUNÇÃO DE ANÁLISE (Do seu notebook) ---
 # ===================================================================
 
-def analisar_batidas_do_audio(caminho_do_arquivo):
+def _envelope_de_onset_em_blocos(caminho_do_arquivo, duracao):
+    """
+    Calcula o envelope de onset lendo o arquivo em blocos (librosa.stream),
+    na taxa original do arquivo. Só um bloco de áudio fica em memória por vez.
+    O espectrograma mel em dB (128 bandas por quadro, bem menor que o áudio)
+    é guardado até o fim: o piso de 80 dB de onset_strength é relativo ao
+    máximo do arquivo inteiro, e só se conhece esse máximo depois do último
+    bloco. O banco de filtros mel vai só até SR_ANALISE / 2, como no áudio
+    reamostrado para SR_ANALISE.
+    """
+    sr = librosa.get_samplerate(caminho_do_arquivo)
+    # Mantém a mesma resolução de tempo da análise em SR_ANALISE
+    escala = sr / (SR_ANALISE or sr)
+    hop_length = int(round(HOP_LENGTH * escala))
+    n_fft = int(round(N_FFT * escala))
+
+    blocos = librosa.stream(
+        caminho_do_arquivo, block_length=BLOCOS_POR_LEITURA, frame_length=n_fft,
+        hop_length=hop_length, duration=DURACAO_MAXIMA, fill_value=0,
+    )
+    espectros = []
+    for bloco in blocos:
+        espectros.append(librosa.power_to_db(librosa.feature.melspectrogram(
+            y=bloco, sr=sr, n_fft=n_fft, hop_length=hop_length, center=False, fmax=(SR_ANALISE or sr) / 2),
+            top_db=None).astype(np.float32))
+    S = np.concatenate(espectros, axis=1)
+    del espectros
+    # Piso de power_to_db (top_db=80) pelo máximo global, e fluxo espectral
+    # como em librosa.onset.onset_strength (lag=1, média das bandas)
+    S = np.maximum(S, S.max() - 80.0)
+    fluxo = np.maximum(0.0, np.diff(S, axis=1)).mean(axis=0)
+
+    # Mesmo alinhamento e tamanho do envelope de onset_strength: os quadros
+    # aqui não são centralizados (center=False), então o deslocamento é o
+    # lag mais duas vezes o meio quadro que o librosa acrescenta. O total é
+    # 1 + amostras // hop_length quadros; o último bloco vem completado com
+    # zeros e é cortado aqui.
+    atraso = 1 + 2 * (n_fft // (2 * hop_length))
+    num_quadros = 1 + int(duracao * sr) // hop_length
+    envelope = np.concatenate([np.zeros(atraso), fluxo])[:num_quadros]
+    return envelope, sr, hop_length
+
+def _estimar_tempo_em_blocos(envelope, sr, hop_length, quadros_por_bloco=1024):
+    """
+    Estima o BPM como librosa.feature.tempo, mas somando o tempograma de
+    autocorrelação por trechos do envelope em vez de montá-lo inteiro
+    (para um áudio de 10 min ele ocupa dezenas de MB).
+    """
+    win_length = int(librosa.time_to_frames(8.0, sr=sr, hop_length=hop_length))
+    soma = np.zeros(win_length)
+    quadros = 0
+    for inicio in range(0, len(envelope), quadros_por_bloco):
+        # Cada trecho leva meia janela de contexto de cada lado, e só as
+        # colunas centrais (as que pertencem ao trecho) entram na soma.
+        contexto_inicio = max(0, inicio - win_length // 2)
+        fim = min(len(envelope), inicio + quadros_por_bloco)
+        trecho = envelope[contexto_inicio:min(len(envelope), fim + win_length // 2)]
+        tempograma = librosa.feature.tempogram(
+            onset_envelope=trecho, sr=sr, hop_length=hop_length, win_length=win_length,
+            center=True)
+        deslocamento = inicio - contexto_inicio
+        soma += tempograma[:, deslocamento:deslocamento + fim - inicio].sum(axis=1)
+        quadros += fim - inicio
+    media = (soma / max(quadros, 1))[:, np.newaxis]
+    return librosa.feature.tempo(tg=media, sr=sr, hop_length=hop_length, aggregate=None)[0]
+
+def analisar_batidas_do_audio(caminho_do_arquivo, verboso=True):
     """
     Analisa um ficheiro de áudio para extrair o BPM e os tempos das batidas.
+
+    O áudio é decodificado em SR_ANALISE e, se DURACAO_MAXIMA estiver
+    definida, só a janela inicial é lida. Áudios mais longos que
+    LIMIAR_STREAMING_S são lidos em blocos. A forma de onda não é devolvida:
+    retorna (bpm, tempos_das_batidas, duracao_analisada_em_segundos).
     """
-    print(f"Analisando o ficheiro: {caminho_do_arquivo}...")
+    if verboso:
+        print(f"Analisando o ficheiro: {caminho_do_arquivo}...")
 
     try:
-        y, sr = librosa.load(caminho_do_arquivo, sr=None)
+        duracao = librosa.get_duration(path=caminho_do_arquivo)
+        if DURACAO_MAXIMA:
+            duracao = min(duracao, DURACAO_MAXIMA)
+        usar_streaming = duracao > LIMIAR_STREAMING_S
+        if usar_streaming:
+            envelope, sr, hop_length = _envelope_de_onset_em_blocos(caminho_do_arquivo, duracao)
+        else:
+            y, sr = librosa.load(caminho_do_arquivo, sr=SR_ANALISE, duration=DURACAO_MAXIMA)
+            duracao = len(y) / sr
     except Exception as e:
         print(f"Erro ao carregar o áudio: {e}")
-        return None, None, None, None # Retorna None para tudo
+        return None, None, None # Retorna None para tudo
 
-    print("Calculando batidas (isso pode demorar um pouco)...")
+    if verboso:
+        print("Calculando batidas (isso pode demorar um pouco)...")
 
-    # Esta função é a mesma
-    tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
+    if usar_streaming:
+        bpm = _estimar_tempo_em_blocos(envelope, sr, hop_length)
+        tempo, beat_frames = librosa.beat.beat_track(onset_envelope=envelope, sr=sr, hop_length=hop_length, bpm=bpm)
+    else:
+        tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr, hop_length=HOP_LENGTH)
+        hop_length = HOP_LENGTH
+        del y
 
     # --- INÍCIO DA CORREÇÃO ---
     # Verificamos se 'tempo' é um array ou lista (ex: [178.20])
@@ -61,11 +190,114 @@ def analisar_batidas_do_audio(caminho_do_arquivo):
     # --- FIM DA CORREÇÃO ---
 
     # Converte frames para segundos
-    beat_times = librosa.frames_to_time(beat_frames, sr=sr)
+    beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop_length)
 
-    print("Análise concluída!")
+    if verboso:
+        print("Análise concluída!")
 
-    return tempo, beat_times, y, sr
+    return tempo, beat_times, duracao
+
+def parametros_da_analise():
+    """
+    Parâmetros que mudam o resultado da análise. Fazem parte da chave do
+    cache (ver cache_analise.py): se algum mudar, os áudios são reanalisados.
+    """
+    return {
+        'sr': SR_ANALISE,
+        'hop_length': HOP_LENGTH,
+        'n_fft': N_FFT,
+        'duracao_maxima': DURACAO_MAXIMA,
+        # Decidem quem passa pelo caminho em blocos, que não é idêntico ao direto
+        'limiar_streaming_s': LIMIAR_STREAMING_S,
+        'blocos_por_leitura': BLOCOS_POR_LEITURA,
+        'librosa': librosa.__version__,
+    }
+
+# ===================================================================
+# --- RESULTADOS ---
+# ===================================================================
+
+def bpm_e_valido(bpm_estimado):
+    return bpm_estimado is not None and isinstance(bpm_estimado, (int, float, np.number)) and not np.isnan(bpm_estimado)
+
+def salvar_resultados_txt(caminho_arquivo_resultado, nome_arquivo, bpm_estimado, tempos_das_batidas):
+    """
+    Salva o BPM e os tempos das batidas no formato .txt legível.
+    """
+    # Abrir e escrever no ficheiro
+    with open(caminho_arquivo_resultado, 'w', encoding='utf-8') as f:
+        f.write(f"Arquivo: {nome_arquivo}\n")
+
+        if bpm_e_valido(bpm_estimado):
+            f.write(f"BPM Estimado: {bpm_estimado:.2f}\n")
+        else:
+            f.write(f"BPM Estimado: N/D\n")
+
+        f.write("="*30 + "\n")
+        f.write("Tempos das Batidas (em segundos):\n")
+
+        # Escrever cada tempo de batida numa linha nova
+        for tempo in tempos_das_batidas:
+            f.write(f"{tempo:.4f}\n") # Salva com 4 casas decimais para mais precisão
+
+def registrar_resultado(armazem, nome_arquivo, bpm_estimado, tempos_das_batidas, duracao_audio, chave=None):
+    """
+    Imprime o resumo da análise de um arquivo, acrescenta o resultado ao
+    armazém e, se SALVAR_TXT, salva o .txt correspondente.
+    """
+    nome_arquivo_txt = f"{os.path.splitext(nome_arquivo)[0]}.txt"
+    caminho_arquivo_resultado = os.path.join(PASTA_DE_RESULTADOS_TXT, nome_arquivo_txt)
+
+    # --- IMPRIMIR RESULTADOS (Opcional, mas útil) ---
+    print("\n" + "="*30)
+    print("--- RESULTADOS DA ANÁLISE ---")
+    print(f"Arquivo: {nome_arquivo}")
+
+    if bpm_e_valido(bpm_estimado):
+        print(f"BPM Estimado (Batidas Por Minuto): {bpm_estimado:.2f}")
+    else:
+        print(f"Não foi possível determinar um BPM único (valor retornado: {bpm_estimado}).")
+
+    if len(tempos_das_batidas) > 0:
+        print("\nTempos das Batidas (em segundos):")
+        print(np.round(tempos_das_batidas[:10], 2))
+        if len(tempos_das_batidas) > 10:
+            print(f"...e mais {len(tempos_das_batidas) - 10} batidas.")
+    else:
+        print("\nNenhuma batida detectada.")
+    print("="*30)
+
+    armazem.acrescentar(nome_arquivo, bpm_estimado if bpm_e_valido(bpm_estimado) else None,
+                        tempos_das_batidas, duracao_audio, origem=PASTA_DE_AUDIOS, chave=chave)
+
+    # --- SALVAR RESULTADOS EM .TXT ---
+    if not SALVAR_TXT:
+        return
+    try:
+        salvar_resultados_txt(caminho_arquivo_resultado, nome_arquivo, bpm_estimado, tempos_das_batidas)
+        print(f"-> Resultados salvos com sucesso em: {nome_arquivo_txt}")
+    except Exception as e:
+        print(f"ERRO AO SALVAR O FICHEIRO .txt: {e}")
+
+def imprimir_resumo(resumo, duracao_total):
+    """
+    Imprime o resumo do lote: sucessos, falhas e vazão (arquivos/s e
+    segundos de áudio analisados por segundo).
+    """
+    print(f"\n{'='*50}")
+    print("--- RESUMO DO PROCESSAMENTO ---")
+    print(f"Arquivos analisados com sucesso: {resumo['sucesso']}")
+    if resumo['reaproveitado']:
+        print(f"Arquivos com o mesmo áudio de uma análise anterior (não reanalisados): {resumo['reaproveitado']}")
+    for status in ('erro', 'timeout', 'falha_do_processo'):
+        if resumo[status]:
+            print(f"Arquivos com {status.replace('_', ' ')}: {resumo[status]}")
+    if duracao_total > 0:
+        total = sum(resumo[status] for status in ('sucesso', 'erro', 'timeout', 'falha_do_processo'))
+        print(f"Tempo total: {duracao_total:.1f} s")
+        print(f"Vazão: {total / duracao_total:.2f} arquivos/s, "
+              f"{resumo['segundos_de_audio'] / duracao_total:.1f} segundos de áudio/s")
+    print(f"{'='*50}")
 
 # ===================================================================
 # --- LÓGICA PRINCIPAL (MAIN) ---
@@ -78,8 +310,11 @@ def main():
     
     # --- 1. CONFIGURAR PASTAS ---
     # Cria a pasta de resultados se ela não existir
-    os.makedirs(PASTA_DE_RESULTADOS_TXT, exist_ok=True)
-    print(f"Resultados de texto (.txt) serão salvos em: {PASTA_DE_RESULTADOS_TXT}")
+    armazem = ArmazemBatidas(PASTA_ARMAZEM)
+    print(f"Resultados serão salvos no armazém: {PASTA_ARMAZEM} ({len(armazem)} músicas já analisadas)")
+    if SALVAR_TXT:
+        os.makedirs(PASTA_DE_RESULTADOS_TXT, exist_ok=True)
+        print(f"Resultados de texto (.txt) serão salvos em: {PASTA_DE_RESULTADOS_TXT}")
 
     # --- 2. VERIFICAR PASTA DE ENTRADA ---
     if not os.path.isdir(PASTA_DE_AUDIOS):
@@ -88,8 +323,14 @@ def main():
         sys.exit(1) # Termina o script se a pasta de entrada não existir
 
     # --- 3. LER ARQUIVOS DE ÁUDIO ---
-    arquivos_na_pasta = os.listdir(PASTA_DE_AUDIOS)
-    arquivos_audio = [f for f in arquivos_na_pasta if f.endswith(('.mp3', '.wav', '.ogg', '.flac'))]
+    manifesto = ManifestoAudios(CAMINHO_MANIFESTO)
+    contagem = manifesto.atualizar(PASTA_DE_AUDIOS, recursivo=False)
+    print(f"Manifesto atualizado: {contagem['novos']} novos, {contagem['alterados']} alterados, "
+          f"{contagem['removidos']} removidos")
+    hashes = {linha['nome']: linha['hash']
+              for linha in manifesto.arquivos(pasta=PASTA_DE_AUDIOS, extensoes=EXTENSOES_ANALISADAS)}
+    manifesto.fechar()
+    arquivos_audio = list(hashes)
 
     if not arquivos_audio:
         print(f"Nenhum arquivo de áudio (mp3, wav, etc.) encontrado na pasta: '{PASTA_DE_AUDIOS}'")
@@ -97,77 +338,79 @@ def main():
 
     print(f"\nEncontrados {len(arquivos_audio)} arquivos de áudio na pasta.")
 
-    # --- 4. LOOP DE PROCESSAMENTO ---
+    # --- 4. VERIFICAR SE JÁ EXISTE (Requisito) ---
+    # O cache é pelo conteúdo do áudio + parâmetros da análise, não pelo nome:
+    # o mesmo áudio com outro nome reaproveita o resultado, e um arquivo que
+    # mudou (ou parâmetros que mudaram) é analisado de novo.
+    resumo = {'sucesso': 0, 'erro': 0, 'timeout': 0, 'falha_do_processo': 0,
+              'reaproveitado': 0, 'segundos_de_audio': 0.0}
+    parametros = parametros_da_analise()
+    chaves = {}
+    copias = {}  # chave -> outros arquivos com o mesmo áudio de um arquivo pendente
+    arquivos_pendentes = []
     for nome_arquivo in arquivos_audio:
-        
-        # --- 4.1. VERIFICAR SE JÁ EXISTE (Requisito) ---
-        nome_base = os.path.splitext(nome_arquivo)[0]
-        nome_arquivo_txt = f"{nome_base}.txt"
-        caminho_arquivo_resultado = os.path.join(PASTA_DE_RESULTADOS_TXT, nome_arquivo_txt)
-
-        # Verifica se o ficheiro de resultado já existe
-        if os.path.exists(caminho_arquivo_resultado):
-            print(f"\n--- Pulando {nome_arquivo}: Resultados já existem em '{nome_arquivo_txt}' ---")
-            continue # Pula para o próximo arquivo
-
-        # --- 4.2. PROCESSAR O ARQUIVO ---
-        caminho_completo_audio = os.path.join(PASTA_DE_AUDIOS, nome_arquivo)
-        print(f"\n{'='*50}")
-        print(f"PROCESSANDO: {nome_arquivo}")
-        print(f"{'='*50}")
-
-        # Chama a função de análise
-        bpm_estimado, tempos_das_batidas, onda_sonora, taxa_amostragem = analisar_batidas_do_audio(caminho_completo_audio)
-
-        if tempos_das_batidas is not None:
+        chave = chave_da_analise(hashes[nome_arquivo], parametros)
+        chaves[nome_arquivo] = chave
 
-            # --- 4.3. IMPRIMIR RESULTADOS (Opcional, mas útil) ---
-            print("\n" + "="*30)
-            print("--- RESULTADOS DA ANÁLISE ---")
-            print(f"Arquivo: {nome_arquivo}")
-
-            bpm_valido = False
-            if bpm_estimado is not None and isinstance(bpm_estimado, (int, float, np.number)) and not np.isnan(bpm_estimado):
-                print(f"BPM Estimado (Batidas Por Minuto): {bpm_estimado:.2f}")
-                bpm_valido = True
+        if armazem.obter_por_chave(chave) is not None:
+            if nome_arquivo in armazem and armazem.obter(nome_arquivo)[2].get('chave') == chave:
+                print(f"\n--- Pulando {nome_arquivo}: Resultados já existem no armazém ---")
             else:
-                print(f"Não foi possível determinar um BPM único (valor retornado: {bpm_estimado}).")
-
-            if len(tempos_das_batidas) > 0:
-                print("\nTempos das Batidas (em segundos):")
-                print(np.round(tempos_das_batidas[:10], 2))
-                if len(tempos_das_batidas) > 10:
-                    print(f"...e mais {len(tempos_das_batidas) - 10} batidas.")
+                armazem.duplicar(chave, nome_arquivo, origem=PASTA_DE_AUDIOS)
+                resumo['reaproveitado'] += 1
+                print(f"\n--- Pulando {nome_arquivo}: mesmo áudio de uma análise anterior, resultado reaproveitado ---")
+            continue # Pula para o próximo arquivo
+        if chave in copias:
+            copias[chave].append(nome_arquivo)
+            continue
+        copias[chave] = []
+        arquivos_pendentes.append(nome_arquivo)
+
+    def concluir_com_sucesso(nome_arquivo, bpm_estimado, tempos_das_batidas, duracao_audio):
+        resumo['sucesso'] += 1
+        resumo['segundos_de_audio'] += duracao_audio
+        chave = chaves[nome_arquivo]
+        registrar_resultado(armazem, nome_arquivo, bpm_estimado, tempos_das_batidas, duracao_audio, chave)
+        for copia in copias[chave]:
+            armazem.duplicar(chave, copia, origem=PASTA_DE_AUDIOS)
+            resumo['reaproveitado'] += 1
+
+    inicio = time.perf_counter()
+
+    # --- 5. PROCESSAMENTO ---
+    if NUM_PROCESSOS > 1 and len(arquivos_pendentes) > 1:
+        # Importado aqui para que o modo sequencial continue sem multiprocessing
+        from extracao_paralela import processar_em_paralelo
+
+        print(f"\nProcessando {len(arquivos_pendentes)} arquivos com {NUM_PROCESSOS} processos "
+              f"(limite de {TIMEOUT_POR_ARQUIVO} s por arquivo)...")
+
+        def ao_concluir(nome_arquivo, status, bpm_estimado, tempos_das_batidas, duracao_audio, mensagem):
+            if status == 'sucesso':
+                concluir_com_sucesso(nome_arquivo, bpm_estimado, tempos_das_batidas, duracao_audio)
             else:
-                print("\nNenhuma batida detectada.")
-            print("="*30)
-
-            # --- 4.4. SALVAR RESULTADOS EM .TXT ---
-            try:
-                # Abrir e escrever no ficheiro
-                with open(caminho_arquivo_resultado, 'w', encoding='utf-8') as f:
-                    f.write(f"Arquivo: {nome_arquivo}\n")
-
-                    if bpm_valido:
-                        f.write(f"BPM Estimado: {bpm_estimado:.2f}\n")
-                    else:
-                        f.write(f"BPM Estimado: N/D\n")
-
-                    f.write("="*30 + "\n")
-                    f.write("Tempos das Batidas (em segundos):\n")
-
-                    # Escrever cada tempo de batida numa linha nova
-                    for tempo in tempos_das_batidas:
-                        f.write(f"{tempo:.4f}\n") # Salva com 4 casas decimais para mais precisão
-
-                print(f"-> Resultados salvos com sucesso em: {nome_arquivo_txt}")
-
-            except Exception as e:
-                print(f"ERRO AO SALVAR O FICHEIRO .txt: {e}")
+                resumo[status] += 1
+                print(f"\nNão foi possível analisar o arquivo ({status}): {nome_arquivo} {mensagem}")
+
+        tarefas = [(nome, os.path.join(PASTA_DE_AUDIOS, nome)) for nome in arquivos_pendentes]
+        processar_em_paralelo(tarefas, NUM_PROCESSOS, TIMEOUT_POR_ARQUIVO, ao_concluir)
+    else:
+        for nome_arquivo in arquivos_pendentes:
+            caminho_completo_audio = os.path.join(PASTA_DE_AUDIOS, nome_arquivo)
+            print(f"\n{'='*50}")
+            print(f"PROCESSANDO: {nome_arquivo}")
+            print(f"{'='*50}")
+
+            # Chama a função de análise
+            bpm_estimado, tempos_das_batidas, duracao_audio = analisar_batidas_do_audio(caminho_completo_audio)
+
+            if tempos_das_batidas is not None:
+                concluir_com_sucesso(nome_arquivo, bpm_estimado, tempos_das_batidas, duracao_audio)
+            else:
+                resumo['erro'] += 1
+                print(f"Não foi possível analisar o arquivo (erro no carregamento): {nome_arquivo}")
 
-        else:
-            print(f"Não foi possível analisar o arquivo (erro no carregamento): {nome_arquivo}")
-            
+    imprimir_resumo(resumo, time.perf_counter() - inicio)
     print("\nProcessamento concluído!")
 
 # ===================================================================
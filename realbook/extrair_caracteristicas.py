@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Extração de várias características de áudio numa só passada, para o modelo.
+
+Calcular cada característica com a sua função do librosa a partir do áudio
+(beat_track(y=...), chroma_stft(y=...), mfcc(y=...)) decodifica o arquivo e
+calcula a STFT de novo a cada vez. Aqui o áudio é decodificado uma vez e os
+intermediários são calculados uma vez só, sob demanda, e compartilhados:
+
+    áudio -> |STFT|² -> espectrograma mel (dB) -> envelope de onset -> batidas
+                    \\-> chroma                \\-> MFCC
+
+Cada característica em CARACTERISTICAS é derivada desses intermediários, e um
+intermediário que nenhuma característica pedida usa não é calculado. Com
+SINCRONIZAR_COM_BATIDAS, também são gerados os agregados sincronizados às
+batidas ('*_por_batida': mediana do chroma, média do MFCC e do onset entre
+duas batidas consecutivas).
+
+A economia em relação a calcular cada característica separadamente é medida
+em benchmark_batidas.py.
+
+O resultado de cada áudio é salvo num .npz em PASTA_DE_SAIDA.
+
+Dependências:
+- librosa
+- numpy
+(Instale com: pip install librosa numpy)
+"""
+
+import os
+import sys
+
+import librosa
+import numpy as np
+
+# ===================================================================
+# --- CONFIGURAÇÃO ---
+# ===================================================================
+
+PASTA_DE_AUDIOS = "musicas_com_boa_similaridade"
+PASTA_DE_SAIDA = "resultados_caracteristicas/boa_similaridade"
+
+# Características calculadas (ver EXTRATORES)
+CARACTERISTICAS = ['tempo', 'batidas', 'onset', 'chroma', 'mfcc']
+# Agregados por batida das características acima (ver AGREGADOS_POR_BATIDA)
+SINCRONIZAR_COM_BATIDAS = True
+
+SR_ANALISE = 22050
+DURACAO_MAXIMA = None  # segundos lidos de cada arquivo (None = inteiro)
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+N_MFCC = 20
+
+# ===================================================================
+# --- INTERMEDIÁRIOS COMPARTILHADOS ---
+# ===================================================================
+
+class IntermediariosAudio:
+    """
+    Intermediários da análise de um áudio, calculados na primeira vez que
+    são pedidos e reaproveitados por todas as características.
+    """
+
+    def __init__(self, y, sr, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS):
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self._calculados = {}
+
+    @classmethod
+    def de_arquivo(cls, caminho, sr=SR_ANALISE, duracao=DURACAO_MAXIMA, **parametros):
+        y, sr = librosa.load(caminho, sr=sr, duration=duracao)
+        return cls(y, sr, **parametros)
+
+    def _obter(self, nome, calcular):
+        if nome not in self._calculados:
+            self._calculados[nome] = calcular()
+        return self._calculados[nome]
+
+    @property
+    def potencia(self):
+        """|STFT|², a base de todas as outras representações."""
+        return self._obter('potencia', lambda: np.abs(
+            librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length)) ** 2)
+
+    @property
+    def mel_db(self):
+        """Espectrograma mel em dB (o mesmo que onset_strength e mfcc calculam por dentro)."""
+        return self._obter('mel_db', lambda: librosa.power_to_db(
+            librosa.feature.melspectrogram(S=self.potencia, sr=self.sr, n_mels=self.n_mels)))
+
+    @property
+    def onset(self):
+        return self._obter('onset', lambda: librosa.onset.onset_strength(
+            S=self.mel_db, sr=self.sr, hop_length=self.hop_length))
+
+    @property
+    def batidas(self):
+        """(bpm, quadros_das_batidas), do envelope de onset já calculado."""
+        def calcular():
+            tempo, quadros = librosa.beat.beat_track(
+                onset_envelope=self.onset, sr=self.sr, hop_length=self.hop_length)
+            return float(np.atleast_1d(tempo)[0]), quadros
+        return self._obter('batidas', calcular)
+
+# ===================================================================
+# --- CARACTERÍSTICAS ---
+# ===================================================================
+
+EXTRATORES = {
+    'tempo':   lambda i: np.array(i.batidas[0]),
+    'batidas': lambda i: librosa.frames_to_time(i.batidas[1], sr=i.sr, hop_length=i.hop_length),
+    'onset':   lambda i: i.onset,
+    'chroma':  lambda i: librosa.feature.chroma_stft(S=i.potencia, sr=i.sr, n_fft=i.n_fft, hop_length=i.hop_length),
+    'mfcc':    lambda i: librosa.feature.mfcc(S=i.mel_db, sr=i.sr, n_mfcc=N_MFCC),
+}
+
+# Como cada característica por quadro é resumida entre duas batidas
+AGREGADOS_POR_BATIDA = {
+    'onset': np.mean,
+    'chroma': np.median,
+    'mfcc': np.mean,
+}
+
+def extrair_caracteristicas(intermediarios, caracteristicas=None, sincronizar=SINCRONIZAR_COM_BATIDAS):
+    """
+    Retorna {nome: array} com as características pedidas (todas as de
+    CARACTERISTICAS por padrão) e, se `sincronizar`, os agregados por batida
+    ('<nome>_por_batida') das características por quadro.
+    """
+    caracteristicas = caracteristicas or CARACTERISTICAS
+    desconhecidas = set(caracteristicas) - set(EXTRATORES)
+    if desconhecidas:
+        raise ValueError(f"Características desconhecidas: {', '.join(sorted(desconhecidas))}. "
+                         f"Opções: {', '.join(EXTRATORES)}")
+
+    resultado = {nome: EXTRATORES[nome](intermediarios) for nome in caracteristicas}
+
+    if sincronizar:
+        quadros = intermediarios.batidas[1]
+        for nome, agregado in AGREGADOS_POR_BATIDA.items():
+            if nome in resultado and len(quadros):
+                resultado[f"{nome}_por_batida"] = librosa.util.sync(
+                    np.atleast_2d(resultado[nome]), quadros, aggregate=agregado)
+    return resultado
+
+def extrair_do_arquivo(caminho, caracteristicas=None, sincronizar=SINCRONIZAR_COM_BATIDAS):
+    """Decodifica `caminho` uma vez e extrai as características dele."""
+    return extrair_caracteristicas(IntermediariosAudio.de_arquivo(caminho), caracteristicas, sincronizar)
+
+# ===================================================================
+# --- LÓGICA PRINCIPAL (MAIN) ---
+# ===================================================================
+
+def main():
+    if not os.path.isdir(PASTA_DE_AUDIOS):
+        print(f"ERRO: Pasta de áudios não encontrada em '{PASTA_DE_AUDIOS}'")
+        sys.exit(1)
+    os.makedirs(PASTA_DE_SAIDA, exist_ok=True)
+
+    arquivos_audio = sorted(f for f in os.listdir(PASTA_DE_AUDIOS) if f.endswith(('.mp3', '.wav', '.ogg', '.flac')))
+    print(f"Encontrados {len(arquivos_audio)} arquivos de áudio. Características: {', '.join(CARACTERISTICAS)}")
+
+    for nome_arquivo in arquivos_audio:
+        caminho_saida = os.path.join(PASTA_DE_SAIDA, f"{os.path.splitext(nome_arquivo)[0]}.npz")
+        if os.path.exists(caminho_saida):
+            print(f"--- Pulando {nome_arquivo}: características já extraídas ---")
+            continue
+        try:
+            resultado = extrair_do_arquivo(os.path.join(PASTA_DE_AUDIOS, nome_arquivo))
+        except Exception as e:
+            print(f"Não foi possível analisar o arquivo: {nome_arquivo} ({e})")
+            continue
+        np.savez_compressed(caminho_saida, **resultado)
+        print(f"-> {nome_arquivo}: " + ', '.join(f"{nome} {np.shape(valor)}" for nome, valor in resultado.items()))
+
+    print("\nProcessamento concluído!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Fila persistente de retentativas dos downloads que falharam.
+
+Antes, a única forma de recuperar as falhas era rodar tudo de novo (ou
+corrigir os status à mão no realbook.ipynb), e o erros.log só dizia que
+algo deu errado. Aqui cada falha é classificada e guardada num banco SQLite
+com o item do pipeline, o número de tentativas e quando ela pode ser
+tentada de novo:
+
+- 'nao_encontrado': a busca não achou vídeo, ou o vídeo não existe mais
+  (removido, privado...). Só adianta tentar depois que a busca mudar.
+- 'rede': queda, timeout, HTTP 429/5xx. Passa sozinho; tenta logo.
+- 'extrator': o yt-dlp não conseguiu extrair o formato (formato
+  indisponível, HTTP 403 na URL do formato...). Costuma passar com outro
+  formato ou com uma versão nova do yt-dlp.
+- 'pos_processamento': o download veio mas a conversão falhou (inclui o
+  antigo "yt-dlp não retornou um caminho de arquivo válido").
+- 'tamanho': o áudio passou de TAMANHO_MAXIMO_DOWNLOAD.
+- 'desconhecido': o resto.
+
+Cada classe tem a sua política em POLITICAS: espera inicial, fator do
+crescimento exponencial, espera máxima, quantas tentativas no total e se
+a retentativa pode usar o formato alternativo (SELETOR_ALTERNATIVO de
+processamento_audio.py). Passado o número de tentativas, o item fica na
+fila como esgotado (aparece no resumo, mas não volta mais).
+
+Um sucesso tira o item da fila; os itens que deram certo nunca entram nela,
+então o modo de retentativa dos downloaders (MODO = 'retentar') só mexe nos
+que falharam.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from processamento_audio import SELETOR_ALTERNATIVO
+
+CAMINHO_BANCO = 'downloads.sqlite'
+
+HORA = 3600
+# classe: espera inicial (s), fator, espera máxima (s), tentativas no total, usa o formato alternativo
+POLITICAS = {
+    'nao_encontrado':    {'espera': 24 * HORA, 'fator': 2, 'espera_maxima': 7 * 24 * HORA, 'tentativas': 2, 'alternativo': False},
+    'rede':              {'espera': 60, 'fator': 2, 'espera_maxima': 6 * HORA, 'tentativas': 6, 'alternativo': False},
+    'extrator':          {'espera': HORA, 'fator': 4, 'espera_maxima': 2 * 24 * HORA, 'tentativas': 3, 'alternativo': True},
+    'pos_processamento': {'espera': 10 * 60, 'fator': 3, 'espera_maxima': 24 * HORA, 'tentativas': 3, 'alternativo': True},
+    'tamanho':           {'espera': 0, 'fator': 1, 'espera_maxima': 0, 'tentativas': 2, 'alternativo': True},
+    'desconhecido':      {'espera': HORA, 'fator': 2, 'espera_maxima': 24 * HORA, 'tentativas': 2, 'alternativo': False},
+}
+
+# Padrões (no texto do erro) de cada classe, na ordem em que são testados
+PADROES_FALHA = [
+    ('tamanho', r"maior que \d+ MB|larger than max-filesize|File is larger"),
+    ('nao_encontrado', r"não encontrado|Video unavailable|Private video|has been removed|"
+                       r"account associated with this video has been terminated|This video is not available|"
+                       r"HTTP Error 404|404 Client Error"),
+    ('rede', r"ConnectionError|ConnectTimeout|ReadTimeout|Timeout|timed out|Connection (reset|refused|aborted)|"
+             r"Temporary failure in name resolution|IncompleteRead|ChunkedEncodingError|RemoteDisconnected|"
+             r"HTTP Error (429|5\d\d)|\b(429|50[0234]) (Client|Server) Error|I/O error|downloaded file is empty"),
+    ('pos_processamento', r"caminho de arquivo válido|Postprocessing|ffprobe|moviepy|duração zero"),
+    ('extrator', r"ExtractorError|Unable to extract|Requested format is not available|Unsupported URL|"
+                 r"Sign in to confirm|HTTP Error 403|403 Client Error|DownloadError|nsig|signature"),
+]
+
+# Estágio do pipeline (pelo status) quando o texto do erro não diz nada
+CLASSE_POR_STATUS = [
+    ('não encontrado', 'nao_encontrado'),
+    ('erro na busca', 'rede'),
+    ('erro na conversão', 'pos_processamento'),
+    ('erro no download', 'extrator'),
+]
+
+# Chaves do item que não vão para a fila (resultado da tentativa ou arquivos temporários)
+_CHAVES_DESCARTADAS = ('status', 'erro', 'arquivo_bruto', 'caminho_final', 'aquisicao', 'classe_falha',
+                       'seletor_formato', 'tentativas')
+
+def classificar_falha(item):
+    """Classe da falha de um item terminado (ver PADROES_FALHA e CLASSE_POR_STATUS)."""
+    texto = f"{item.get('status') or ''} {item.get('erro') or ''}"
+    for classe, padrao in PADROES_FALHA:
+        if re.search(padrao, texto, re.IGNORECASE):
+            return classe
+    status = item.get('status') or ''
+    for trecho, classe in CLASSE_POR_STATUS:
+        if trecho in status:
+            return classe
+    return 'desconhecido'
+
+def indica_sobrecarga(erro):
+    """
+    Se a exceção é de sobrecarga do serviço (classe 'rede': HTTP 429/5xx,
+    timeout, conexão recusada ou derrubada). É o `sobrecarga` dos
+    limitadores (controle_taxa.py): as outras falhas não reduzem a
+    concorrência.
+    """
+    return classificar_falha({'erro': f"{type(erro).__name__}: {erro}"}) == 'rede'
+
+def espera_para(classe, tentativas, politicas=POLITICAS):
+    """Espera (s) antes da próxima tentativa depois de `tentativas` falhas da `classe`."""
+    politica = politicas[classe]
+    return min(politica['espera_maxima'], politica['espera'] * politica['fator'] ** (tentativas - 1))
+
+def chave_do_item(item):
+    """
+    Identifica o item entre execuções: a pasta e o nome do arquivo. Sem nome
+    de arquivo (linhas do CSV sem título), a música buscada mais a URL de
+    origem ou a linha do CSV de entrada (item['linha']), para que as falhas
+    de linhas diferentes não virem uma só.
+    """
+    pasta = item.get('pasta', '')
+    if item.get('nome_arquivo'):
+        return f"{pasta}/{item['nome_arquivo']}"
+    if item.get('video_url'):
+        return f"{pasta}/{item['musica_buscada']}#{item['video_url']}"
+    if item.get('linha') is not None:
+        return f"{pasta}/{item['musica_buscada']}#linha {item['linha']}"
+    return f"{pasta}/{item['musica_buscada']}"
+
+class FilaRetentativas:
+    """Falhas classificadas, com backoff exponencial por classe, guardadas em SQLite."""
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO, politicas=POLITICAS):
+        self.politicas = politicas
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_banco, check_same_thread=False)
+        self._conexao.execute("""
+            CREATE TABLE IF NOT EXISTS retentativas (
+                chave TEXT PRIMARY KEY,
+                item TEXT NOT NULL,
+                classe TEXT NOT NULL,
+                erro TEXT,
+                tentativas INTEGER NOT NULL,
+                proxima_em REAL,
+                atualizado_em REAL NOT NULL
+            )
+        """)
+        self._conexao.commit()
+
+    def registrar_falha(self, item):
+        """
+        Classifica a falha do item e o (re)coloca na fila com a próxima
+        tentativa agendada. Retorna a classe. Sem tentativas restantes,
+        proxima_em fica vazio (esgotado).
+        """
+        classe = classificar_falha(item)
+        item['classe_falha'] = classe
+        chave = chave_do_item(item)
+        salvo = {k: v for k, v in item.items() if k not in _CHAVES_DESCARTADAS}
+        agora = time.time()
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT tentativas FROM retentativas WHERE chave = ?", (chave,)).fetchone()
+            tentativas = (linha[0] if linha else 0) + 1
+            politica = self.politicas[classe]
+            proxima_em = agora + espera_para(classe, tentativas, self.politicas) \
+                if tentativas < politica['tentativas'] else None
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO retentativas (chave, item, classe, erro, tentativas, proxima_em, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chave, json.dumps(salvo, ensure_ascii=False), classe, item.get('erro') or item.get('status'),
+                 tentativas, proxima_em, agora),
+            )
+            self._conexao.commit()
+        return classe
+
+    def registrar_sucesso(self, item):
+        """Tira o item da fila (se estava nela)."""
+        with self._trava:
+            self._conexao.execute("DELETE FROM retentativas WHERE chave = ?", (chave_do_item(item),))
+            self._conexao.commit()
+
+    def registrar(self, item):
+        """Registra o resultado de um item terminado pelo pipeline (sucesso ou falha)."""
+        if item.get('status') == "Sucesso":
+            self.registrar_sucesso(item)
+        else:
+            self.registrar_falha(item)
+
+    def prontos(self, formato_alternativo=False, agora=None):
+        """
+        Itens cuja próxima tentativa já chegou, prontos para voltar ao
+        pipeline. Com `formato_alternativo`, os das classes que permitem
+        saem com item['seletor_formato'] = SELETOR_ALTERNATIVO.
+        """
+        agora = time.time() if agora is None else agora
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT item, classe, tentativas FROM retentativas WHERE proxima_em IS NOT NULL AND proxima_em <= ? "
+                "ORDER BY proxima_em", (agora,)
+            ).fetchall()
+        itens = []
+        for item_json, classe, tentativas in linhas:
+            item = json.loads(item_json)
+            item['tentativas'] = tentativas
+            if formato_alternativo and self.politicas[classe]['alternativo']:
+                item['seletor_formato'] = SELETOR_ALTERNATIVO
+            itens.append(item)
+        return itens
+
+    def resumo(self, agora=None):
+        """Por classe: itens prontos, esperando e esgotados."""
+        agora = time.time() if agora is None else agora
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT classe, "
+                "SUM(proxima_em IS NOT NULL AND proxima_em <= ?), "
+                "SUM(COALESCE(proxima_em > ?, 0)), "
+                "SUM(proxima_em IS NULL) "
+                "FROM retentativas GROUP BY classe ORDER BY classe", (agora, agora)
+            ).fetchall()
+        return {classe: {'prontos': prontos, 'esperando': esperando, 'esgotados': esgotados}
+                for classe, prontos, esperando, esgotados in linhas}
+
+    def fechar(self):
+        self._conexao.close()
@@ -1,7 +1,10 @@
+# Só é necessário para as pastas de execuções antigas (com os arquivos 'temp_*'): os downloaders
+# agora gravam o estado de cada música em downloads.sqlite à medida que ela termina (ver
+# estado_jobs.py) e o relatorio_downloads.csv é exportado de lá.
 import os
 import pandas as pd
-import glob
 from collections import defaultdict
+from manifesto_audios import CAMINHO_BANCO as CAMINHO_MANIFESTO, ManifestoAudios
 
 # --- CONFIGURAÇÃO ---
 # Coloque aqui as mesmas pastas que você usa no script de download
@@ -15,10 +18,13 @@ def limpar_duplicatas_e_coletar_sucessos(pastas):
     uma lista com os nomes base dos arquivos mp3 encontrados.
     """
     arquivos_encontrados = []
+    manifesto = ManifestoAudios(CAMINHO_MANIFESTO)
     for pasta in pastas:
-        # Usamos glob para encontrar todos os arquivos que começam com 'temp_' na pasta
-        caminho_busca = os.path.join(pasta, 'temp_*')
-        arquivos_encontrados.extend(glob.glob(caminho_busca))
+        # O manifesto encontra os arquivos que começam com 'temp_' na pasta (só relê o que mudou)
+        manifesto.atualizar(pasta, recursivo=False)
+        arquivos_encontrados.extend(
+            linha['caminho'] for linha in manifesto.arquivos(pasta=pasta, status='temporario', prefixo='temp_'))
+    manifesto.fechar()
 
     if not arquivos_encontrados:
         print("Nenhum arquivo 'temp_' encontrado para processar.")
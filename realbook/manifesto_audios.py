@@ -0,0 +1,263 @@
+"""
+Manifesto (índice) dos arquivos de áudio, compartilhado pelos scripts.
+
+Antes, cada etapa listava as pastas de novo e tirava o que precisava dos
+nomes: o billboard/criarDF.py com os.listdir para o filenames.csv, o
+limpeza_downloads.py com glob('temp_*'), o extrair_batidas.py com
+os.listdir da pasta de entrada (e o hash de cada arquivo num índice só
+dele). Nenhum sabia o tamanho, a duração, o hash ou de onde o arquivo veio.
+
+Aqui um banco SQLite guarda, para cada arquivo: pasta, nome, extensão,
+chave da música (o nome limpo, ver similaridade.limpar_string), tamanho,
+mtime, duração, hash do conteúdo (BLAKE2b, o mesmo de cache_analise.py),
+status ('presente', 'temporario' para 'temp_*' e '.part', 'removido') e a
+origem (a URL do vídeo, quando o arquivo veio dos downloaders; ver
+vincular_origens).
+
+O banco é um só para todos os scripts (CAMINHO_BANCO: ao lado deste
+arquivo, ou em $MANIFESTO_AUDIOS) e os caminhos são guardados absolutos,
+então os de realbook/ e os de billboard/ veem os mesmos arquivos, rodando
+de qualquer pasta.
+
+atualizar(pasta) percorre a pasta com os.scandir e só lê (hash, duração)
+os arquivos novos ou com tamanho/mtime diferentes do que está no banco; os
+que sumiram viram 'removido'. Cada atualização que muda alguma coisa
+ganha um número de versão, gravado nas linhas que mudaram. Uma etapa pode
+perguntar "o que há de novo desde a última vez" com novos_para(consumidor)
+e, quando terminar, confirmar(consumidor, versao).
+
+Rodando este arquivo, as PASTAS_PADRAO são atualizadas e o resumo de cada
+uma é mostrado.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import soundfile as sf
+
+from cache_analise import hash_do_conteudo
+from similaridade import limpar_string
+
+# --- CONFIGURAÇÃO ---
+# Um só banco para todos os scripts (realbook/ e billboard/), qualquer que seja a pasta de onde rodam:
+# ao lado deste arquivo, ou onde a variável de ambiente MANIFESTO_AUDIOS indicar
+CAMINHO_BANCO = os.environ.get('MANIFESTO_AUDIOS') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'manifesto_audios.sqlite')
+EXTENSOES_AUDIO = ('.mp3', '.wav', '.ogg', '.opus', '.flac', '.m4a', '.aac', '.mka', '.webm')
+PASTAS_PADRAO = ['busca_completa', 'busca_por_titulo', 'audios_baixados', 'musicas_com_boa_similaridade']
+BANCO_DOWNLOADS = 'downloads.sqlite'  # estado dos jobs dos downloaders (ver estado_jobs.py), para a origem
+
+def chave_da_musica(nome_arquivo):
+    """Chave da música a partir do nome do arquivo: sem extensão, sem 'temp_' e limpa."""
+    base = os.path.splitext(nome_arquivo)[0]
+    if base.endswith(tuple(EXTENSOES_AUDIO)):  # 'musica.mp3.part'
+        base = os.path.splitext(base)[0]
+    return limpar_string(base.removeprefix('temp_'))
+
+def status_do_nome(nome_arquivo):
+    return 'temporario' if nome_arquivo.startswith('temp_') or nome_arquivo.endswith('.part') else 'presente'
+
+def duracao_do_audio(caminho):
+    """Duração em segundos (pelo cabeçalho, sem decodificar), ou None se o libsndfile não ler o formato."""
+    try:
+        return sf.info(caminho).duration
+    except Exception:
+        return None
+
+def _percorrer(pasta, recursivo):
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if entrada.is_dir(follow_symlinks=False):
+                if recursivo:
+                    yield from _percorrer(entrada.path, recursivo)
+            elif entrada.is_file() and entrada.name.lower().endswith(
+                    EXTENSOES_AUDIO + tuple(f"{e}.part" for e in EXTENSOES_AUDIO)):
+                yield entrada
+
+def _escapar_like(texto):
+    """Texto literal num padrão LIKE ... ESCAPE '\\' ('%' e '_' deixam de ser curingas)."""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+class ManifestoAudios:
+    """Índice SQLite dos arquivos de áudio, atualizado incrementalmente por tamanho e mtime."""
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO):
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_banco, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                pasta TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                extensao TEXT,
+                chave TEXT,
+                tamanho INTEGER,
+                mtime_ns INTEGER,
+                duracao REAL,
+                hash TEXT,
+                status TEXT NOT NULL,
+                origem TEXT,
+                versao INTEGER NOT NULL,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS arquivos_pasta ON arquivos (pasta, status);
+            CREATE INDEX IF NOT EXISTS arquivos_chave ON arquivos (chave);
+            CREATE INDEX IF NOT EXISTS arquivos_versao ON arquivos (versao);
+            CREATE TABLE IF NOT EXISTS consumidores (
+                nome TEXT PRIMARY KEY,
+                versao INTEGER NOT NULL
+            );
+        """)
+        self._conexao.commit()
+
+    def versao_atual(self):
+        with self._trava:
+            return self._conexao.execute("SELECT COALESCE(MAX(versao), 0) FROM arquivos").fetchone()[0]
+
+    def atualizar(self, pasta, recursivo=True):
+        """
+        Sincroniza o manifesto com a pasta. Retorna a contagem de arquivos
+        'novos', 'alterados', 'removidos' e 'inalterados'.
+        """
+        pasta = os.path.abspath(pasta)
+        contagem = {'novos': 0, 'alterados': 0, 'removidos': 0, 'inalterados': 0}
+        with self._trava:
+            # Sem recursão, só os arquivos da própria pasta: os das subpastas não são vistos e
+            # não podem virar 'removido'
+            consulta = "SELECT caminho, tamanho, mtime_ns, status FROM arquivos WHERE pasta = ?"
+            parametros = [pasta]
+            if recursivo:
+                consulta += " OR pasta LIKE ? ESCAPE '\\'"
+                parametros.append(_escapar_like(os.path.join(pasta, '')) + '%')
+            conhecidos = {linha['caminho']: (linha['tamanho'], linha['mtime_ns'], linha['status'])
+                          for linha in self._conexao.execute(consulta, parametros)}
+            versao = self._conexao.execute("SELECT COALESCE(MAX(versao), 0) + 1 FROM arquivos").fetchone()[0]
+
+        mudancas = []
+        vistos = set()
+        if os.path.isdir(pasta):
+            for entrada in _percorrer(pasta, recursivo):
+                caminho = os.path.abspath(entrada.path)
+                vistos.add(caminho)
+                info = entrada.stat()
+                status = status_do_nome(entrada.name)
+                anterior = conhecidos.get(caminho)
+                if anterior == (info.st_size, info.st_mtime_ns, status):
+                    contagem['inalterados'] += 1
+                    continue
+                contagem['alterados' if anterior else 'novos'] += 1
+                mudancas.append((
+                    caminho, os.path.dirname(caminho), entrada.name, os.path.splitext(entrada.name)[1].lower(),
+                    chave_da_musica(entrada.name), info.st_size, info.st_mtime_ns,
+                    duracao_do_audio(caminho) if status == 'presente' else None,
+                    hash_do_conteudo(caminho) if status == 'presente' else None,
+                    status, versao, time.time(),
+                ))
+        removidos = [caminho for caminho, (_, _, status) in conhecidos.items()
+                     if caminho not in vistos and status != 'removido']
+        contagem['removidos'] = len(removidos)
+
+        with self._trava, self._conexao:
+            self._conexao.executemany(
+                "INSERT INTO arquivos (caminho, pasta, nome, extensao, chave, tamanho, mtime_ns, duracao, hash, status, "
+                "versao, atualizado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(caminho) DO UPDATE SET tamanho = excluded.tamanho, mtime_ns = excluded.mtime_ns, "
+                "duracao = excluded.duracao, hash = excluded.hash, status = excluded.status, "
+                "versao = excluded.versao, atualizado_em = excluded.atualizado_em",
+                mudancas,
+            )
+            self._conexao.executemany(
+                "UPDATE arquivos SET status = 'removido', versao = ?, atualizado_em = ? WHERE caminho = ?",
+                [(versao, time.time(), caminho) for caminho in removidos],
+            )
+        return contagem
+
+    def vincular_origens(self, banco_downloads=BANCO_DOWNLOADS):
+        """
+        Preenche a origem (URL do vídeo) dos arquivos que vieram dos
+        downloaders. Retorna quantos mudaram. O caminho_final dos jobs é
+        relativo à pasta de onde o downloader rodou (a do banco dele), e os
+        caminhos do manifesto são absolutos.
+        """
+        if not os.path.exists(banco_downloads):
+            return 0
+        base = os.path.dirname(os.path.abspath(banco_downloads))
+        with self._trava:
+            self._conexao.execute("ATTACH DATABASE ? AS downloads", (banco_downloads,))
+            try:
+                jobs = self._conexao.execute(
+                    "SELECT caminho_final, video_url FROM downloads.jobs "
+                    "WHERE status = 'Sucesso' AND caminho_final IS NOT NULL").fetchall()
+                with self._conexao:
+                    cursor = self._conexao.executemany(
+                        "UPDATE arquivos SET origem = ? WHERE caminho = ? AND origem IS NULL",
+                        [(video_url, os.path.abspath(os.path.join(base, caminho))) for caminho, video_url in jobs])
+                return cursor.rowcount
+            finally:
+                self._conexao.execute("DETACH DATABASE downloads")
+
+    def arquivos(self, pasta=None, status='presente', chave=None, extensoes=None, prefixo=None, desde_versao=None):
+        """
+        Linhas do manifesto (sqlite3.Row, acessíveis por nome de coluna)
+        filtradas por pasta, status, chave da música, extensões, prefixo do
+        nome e versão (só as que mudaram depois de `desde_versao`).
+        """
+        condicoes, parametros = [], []
+        if pasta is not None:
+            condicoes.append("pasta = ?")
+            parametros.append(os.path.abspath(pasta))
+        if status is not None:
+            condicoes.append("status = ?")
+            parametros.append(status)
+        if chave is not None:
+            condicoes.append("chave = ?")
+            parametros.append(limpar_string(chave))
+        if extensoes:
+            condicoes.append(f"extensao IN ({', '.join('?' * len(extensoes))})")
+            parametros.extend(e.lower() for e in extensoes)
+        if prefixo:
+            condicoes.append("nome LIKE ? ESCAPE '\\'")
+            parametros.append(_escapar_like(prefixo) + '%')
+        if desde_versao is not None:
+            condicoes.append("versao > ?")
+            parametros.append(desde_versao)
+        sql = "SELECT * FROM arquivos"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        with self._trava:
+            return self._conexao.execute(sql + " ORDER BY caminho", parametros).fetchall()
+
+    def novos_para(self, consumidor, **filtros):
+        """
+        Arquivos que mudaram desde a última confirmação do `consumidor`
+        (todos, na primeira vez). Retorna (linhas, versao); passe a versão
+        para confirmar() depois de processá-los.
+        """
+        with self._trava:
+            linha = self._conexao.execute("SELECT versao FROM consumidores WHERE nome = ?", (consumidor,)).fetchone()
+        versao = self.versao_atual()
+        return self.arquivos(desde_versao=linha['versao'] if linha else None, **filtros), versao
+
+    def confirmar(self, consumidor, versao):
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "INSERT INTO consumidores (nome, versao) VALUES (?, ?) "
+                "ON CONFLICT(nome) DO UPDATE SET versao = excluded.versao", (consumidor, versao))
+
+    def fechar(self):
+        self._conexao.close()
+
+def main():
+    manifesto = ManifestoAudios(CAMINHO_BANCO)
+    for pasta in PASTAS_PADRAO:
+        inicio = time.perf_counter()
+        contagem = manifesto.atualizar(pasta)
+        print(f"{pasta}: {contagem} ({time.perf_counter() - inicio:.3f}s)")
+    print(f"Origens vinculadas: {manifesto.vincular_origens(BANCO_DOWNLOADS)}")
+    manifesto.fechar()
+
+if __name__ == "__main__":
+    main()
@@ -1,127 +1,91 @@
 # musica_downloader.py
 import pandas as pd
 import os
-import time
-import re
-import yt_dlp
 import logging
-from moviepy.editor import AudioFileClip
 from youtubesearchpython import VideosSearch
-import concurrent.futures
-from tqdm import tqdm
+from cache_busca import CacheBusca
+from controle_taxa import LimitadorAdaptativo
+from estado_jobs import EstadoJobs
+from fila_retentativas import FilaRetentativas, indica_sobrecarga
+from pipeline_downloads import criar_pipeline
+from similaridade import CANDIDATOS_BUSCA, LIMIAR_SIMILARIDADE, duracao_em_segundos, escolher_candidato, similaridade
 
 # --- CONFIGURAÇÃO ---
 INPUT_CSV_FILE = 'MusicaStudyGroup/realbook/musicas_realbook_completo_melhorado.csv'
-OUTPUT_CSV_FILE = 'relatorio_downloads.csv' # <-- MUDANÇA: Nome do novo arquivo de relatório
+OUTPUT_CSV_FILE = 'relatorio_downloads.csv' # <-- MUDANÇA: Exportado do estado dos jobs no fim de cada execução
 BUSCA_COMPLETA_FOLDER = 'busca_completa'
 BUSCA_POR_TITULO_FOLDER = 'busca_por_titulo'
 LOG_FILE = 'erros.log'
-MAX_WORKERS = 4
-CLIP_DURATION = 40
+CACHE_BUSCA_FILE = 'cache_busca.sqlite'  # Resultados das buscas (ver cache_busca.py)
+# Estado de cada música e fila de retentativas das falhas (ver estado_jobs.py e fila_retentativas.py)
+BANCO_DOWNLOADS = 'downloads.sqlite'
+# 'normal' processa o CSV de entrada; 'retentar' só as falhas da fila cuja espera já passou
+MODO = 'normal'
+# Na retentativa, falhas de extração/conversão/tamanho tentam o formato alternativo
+FORMATO_ALTERNATIVO = True
+# Concorrência de cada estágio do pipeline (ver pipeline_downloads.py). Nos estágios de rede é o
+# máximo: quantas threads ficam ativas é decidido pelo controle de taxa (ver controle_taxa.py)
+THREADS_BUSCA = 8
+THREADS_DOWNLOAD = 8
+# Ajustes sobre controle_taxa.LIMITES_PADRAO (taxa, concorrência inicial, latência alvo...)
+LIMITES_BUSCA = {}
+LIMITES_DOWNLOAD = {}
+PROCESSOS_CONVERSAO = os.cpu_count() or 1
+TAMANHO_FILA = 8  # itens esperando entre um estágio e o próximo
+# 'clipe' baixa só o começo de cada música (volta para 'completo' se a fonte não permitir)
+MODO_AQUISICAO = 'clipe'
+# Formato dos clipes (ver FORMATOS em processamento_audio.py)
+FORMATO_SAIDA = 'mp3'
+BITRATE_SAIDA = '192k'
+SR_SAIDA = None  # Hz (None = a do original)
 
 # --- CONFIGURAÇÃO DO LOGGING ---
+# <-- MUDANÇA: filemode='a' para uma execução retomada não apagar os erros da anterior
 logging.basicConfig(level=logging.ERROR, 
                     filename=LOG_FILE, 
-                    filemode='w', 
+                    filemode='a', 
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-def sanitize_filename(filename):
-    sanitized = re.sub(r'[\\/*?:"<>|]', "", filename)
-    return sanitized[:150]
-
-def download_and_process_audio(video_url, output_path, filename):
-    sanitized_filename = sanitize_filename(filename)
-    final_audio_path = os.path.join(output_path, f"{sanitized_filename}.mp3")
-    
-    # Define um "molde" para o nome do arquivo temporário.
-    # Usamos %(ext)s para deixar o yt-dlp controlar a extensão.
-    temp_path_template = os.path.join(output_path, f"temp_{sanitized_filename}.%(ext)s")
-
-    # Esta variável vai guardar o nome real do arquivo que o yt-dlp criar.
-    actual_temp_path = None 
-    
-    try:
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': temp_path_template, # Usa o molde que definimos
-            'max_filesize': 50 * 1024 * 1024,
-            'quiet': True,
-            'no_warnings': True,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
+cache_busca = None  # Aberto em main()
+fila_retentativas = None  # Aberta em main()
+estado_jobs = None  # Aberto em main()
+limitador_busca = None  # Criado em main()
+
+def _buscar_no_youtube(consulta, musica_buscada, artista=None):
+    """
+    Provedor da busca: (link, titulo) do melhor dos CANDIDATOS_BUSCA primeiros
+    resultados (ver similaridade.py), ou (None, None) se nenhum tiver
+    similaridade suficiente com a música buscada. Erros da API sobem.
+    """
+    with limitador_busca.requisicao():
+        results = VideosSearch(consulta, limit=CANDIDATOS_BUSCA).result()
+    candidatos = [
+        {
+            'link': video_result['link'],
+            'titulo': video_result['title'],
+            'duracao': duracao_em_segundos(video_result.get('duration')),
+            'canal': (video_result.get('channel') or {}).get('name'),
         }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Em vez de ydl.download, usamos ydl.extract_info.
-            # Ele baixa o vídeo E retorna um dicionário com todas as informações.
-            info_dict = ydl.extract_info(video_url, download=True)
-            
-            # Pegamos o caminho exato do arquivo final que foi criado, pós-processado.
-            # O yt-dlp nos informa isso na chave 'filepath'.
-            actual_temp_path = info_dict.get('filepath')
-
-        # Agora, a verificação é 100% confiável.
-        if not actual_temp_path or not os.path.exists(actual_temp_path):
-             logging.error(f"yt-dlp não retornou um caminho de arquivo válido para '{filename}'")
-             return False
-
-        with AudioFileClip(actual_temp_path) as audio:
-            end_duration = min(audio.duration, CLIP_DURATION)
-            if end_duration > 0:
-                with audio.subclip(0, end_duration) as final_clip:
-                    final_clip.write_audiofile(final_audio_path, logger=None, codec='libmpredlame')
-            else:
-                logging.error(f"Áudio com duração zero para '{filename}'")
-                return False
-        return True
-        
-    except Exception as e:
-        print(f"\n--- ERRO DETALHADO para '{filename}' ---")
-        print(f"URL do Vídeo: {video_url}")
-        print(f"Tipo do Erro: {type(e).__name__}")
-        print(f"Mensagem do Erro: {e}")
-        print("-------------------------------------------\n")
-        logging.error(f"Erro detalhado para '{filename}': {type(e).__name__} - {e}")
-        return False
-
-    finally:
-        # Garantimos que vamos apagar o arquivo temporário correto.
-        if actual_temp_path and os.path.exists(actual_temp_path):
-            os.remove(actual_temp_path)
-            
-def search_youtube_link(query):
-    # <-- MUDANÇA: Esta função agora retorna o link E o título do vídeo.
-    try:
-        search_query = f"{query} audio"
-        videos_search = VideosSearch(search_query, limit=1)
-        results = videos_search.result()
-        
-        video_result = None
-        if results and results.get('result') and len(results['result']) > 0:
-            video_result = results['result'][0]
-        else:
-            # Tenta a busca sem "audio" se a primeira falhar
-            videos_search = VideosSearch(query, limit=1)
-            results = videos_search.result()
-            if results and results.get('result') and len(results['result']) > 0:
-                 video_result = results['result'][0]
-
-        if video_result:
-            # Retorna uma tupla (link, titulo)
-            return (video_result['link'], video_result['title'])
-        
-    except Exception as e:
-        print(f"ERRO NA BUSCA por '{query}': {e}")
-        logging.error(f"Erro ao buscar por '{query}': {e}")
-        return (None, None) # Retorna None para ambos se houver erro
-    
-    return (None, None) # Retorna None para ambos se não encontrar nada
-
-def process_song(row_tuple):
-    # <-- MUDANÇA: Esta função agora retorna um dicionário com os resultados.
+        for video_result in (results or {}).get('result') or []
+    ]
+    melhor, _ = escolher_candidato(musica_buscada, candidatos, artista)
+    if melhor is None:
+        return (None, None)
+    return (melhor['link'], melhor['titulo'])
+
+def search_youtube_link(query, artista=None):
+    # <-- MUDANÇA: As buscas passam pelo cache (cache_busca.py); só consultas novas ou expiradas vão à API.
+    # Erros da API sobem: o estágio de busca do pipeline marca "Falha (erro na busca)" com o erro em
+    # item['erro'], e a fila de retentativas os trata como falha de rede, não como vídeo não encontrado.
+    provedor = lambda consulta: _buscar_no_youtube(consulta, query, artista)
+    video_url, video_title = cache_busca.buscar(f"{query} audio", provedor)
+    if not video_url:
+        # Tenta a busca sem "audio" se a primeira falhar
+        video_url, video_title = cache_busca.buscar(query, provedor)
+    return (video_url, video_title)
+
+def preparar_item(row_tuple):
+    # <-- MUDANÇA: Monta o item do pipeline (busca, pasta e nome do arquivo) a partir da linha do CSV.
     index, row = row_tuple
     title = str(row.get('Titulo', '')).strip()
     author = str(row.get('Autor', '')).strip()
@@ -130,93 +94,135 @@ def process_song(row_tuple):
         return {
             "musica_buscada": "Título Vazio",
             "titulo_video_encontrado": None,
+            "linha": index,  # identifica a linha entre execuções (ver fila_retentativas.chave_do_item)
             "status": "Falha"
         }
     
     if pd.isna(row.get('Autor')) or author == '':
-        query = title
-        output_folder = BUSCA_POR_TITULO_FOLDER
-        filename = title
-    else:
-        main_author = author.split('/')[0].strip()
-        query = f"{title} {main_author}"
-        output_folder = BUSCA_COMPLETA_FOLDER
-        filename = f"{title} - {main_author}"
-
-    time.sleep(0.1)
-    
-    video_url, video_title = search_youtube_link(query)
-    
-    if video_url:
-        success = download_and_process_audio(video_url, output_folder, filename)
-        if success:
-            return {
-                "musica_buscada": query,
-                "titulo_video_encontrado": video_title,
-                "status": "Sucesso"
-            }
-        else:
-            return {
-                "musica_buscada": query,
-                "titulo_video_encontrado": video_title,
-                "status": "Falha (erro no download)"
-            }
-    else:
         return {
-            "musica_buscada": query,
+            "musica_buscada": title,
             "titulo_video_encontrado": None,
-            "status": "Falha (vídeo não encontrado)"
+            "pasta": BUSCA_POR_TITULO_FOLDER,
+            "nome_arquivo": title,
         }
-
-def main():
-    print("Iniciando o processo de download de áudios...")
-    print(f"Erros detalhados serão salvos em '{LOG_FILE}'")
-
+    main_author = author.split('/')[0].strip()
+    return {
+        "musica_buscada": f"{title} {main_author}",
+        "artista": main_author,
+        "titulo_video_encontrado": None,
+        "pasta": BUSCA_COMPLETA_FOLDER,
+        "nome_arquivo": f"{title} - {main_author}",
+    }
+
+def buscar_video(item):
+    """Estágio de busca do pipeline: preenche o link e o título do vídeo."""
+    if item.get('video_url'):
+        return item  # Retentativa de um download: o vídeo já foi encontrado
+    video_url, video_title = search_youtube_link(item['musica_buscada'], item.get('artista'))
+    if not video_url:
+        item['status'] = "Falha (vídeo não encontrado)"
+        return item
+    # <-- MUDANÇA: A similaridade vai para o relatório (o filtro do notebook não é mais necessário). Resultados
+    # guardados no cache antes da escolha por similaridade também passam pelo limiar.
+    item['titulo_video_encontrado'] = video_title
+    item['similaridade'] = similaridade(item['musica_buscada'], video_title)
+    if item['similaridade'] < LIMIAR_SIMILARIDADE:
+        item['status'] = "Falha (vídeo não encontrado com similaridade suficiente)"
+        return item
+    item['video_url'] = video_url
+    return item
+
+def registrar_erro(item):
+    if item.get('erro'):
+        print(f"\n--- ERRO para '{item['musica_buscada']}' ({item['status']}): {item['erro']}")
+        logging.error(f"Erro detalhado para '{item['musica_buscada']}' [{item.get('classe_falha')}]: {item['erro']}")
+
+def concluir_item(item):
+    # <-- MUDANÇA: Cada resultado vai para a fila de retentativas (falha classificada) ou sai dela (sucesso),
+    # e é gravado no estado dos jobs assim que termina.
+    fila_retentativas.registrar(item)
+    estado_jobs.registrar_resultado(item)
+    registrar_erro(item)
+
+def itens_do_csv():
     if not os.path.exists(INPUT_CSV_FILE):
         print(f"ERRO: Arquivo de entrada '{INPUT_CSV_FILE}' não encontrado!")
-        return
-
-    os.makedirs(BUSCA_COMPLETA_FOLDER, exist_ok=True)
-    os.makedirs(BUSCA_POR_TITULO_FOLDER, exist_ok=True)
-
+        return None
     try:
         df = pd.read_csv(INPUT_CSV_FILE, encoding='utf-8')
     except Exception as e:
         print(f"ERRO ao ler o CSV: {e}. Verifique se o arquivo '{INPUT_CSV_FILE}' está salvo com a codificação correta (UTF-8).")
-        return
-
+        return None
     print(f"Encontradas {len(df)} músicas no arquivo CSV para processar.")
+    return [preparar_item(task) for task in df.iterrows()]
 
-    tasks = list(df.iterrows())
+def main():
+    global cache_busca, limitador_busca, fila_retentativas, estado_jobs
+    print("Iniciando o processo de download de áudios...")
+    print(f"Erros detalhados serão salvos em '{LOG_FILE}'")
+
+    os.makedirs(BUSCA_COMPLETA_FOLDER, exist_ok=True)
+    os.makedirs(BUSCA_POR_TITULO_FOLDER, exist_ok=True)
+
+    fila_retentativas = FilaRetentativas(BANCO_DOWNLOADS)
+    if MODO == 'retentar':
+        itens = fila_retentativas.prontos(formato_alternativo=FORMATO_ALTERNATIVO)
+        print(f"Modo de retentativa: {len(itens)} falhas prontas para tentar de novo.")
+    else:
+        itens = itens_do_csv()
+        if itens is None:
+            fila_retentativas.fechar()
+            return
+
+    # <-- MUDANÇA: Músicas que já deram certo numa execução anterior (com o arquivo no disco) são puladas
+    estado_jobs = EstadoJobs(BANCO_DOWNLOADS)
+    itens, pulados = estado_jobs.pular_concluidos(itens)
+    if pulados:
+        print(f"{pulados} músicas já baixadas em execuções anteriores serão puladas.")
+    estado_jobs.registrar_pendentes(itens)
+
+    cache_busca = CacheBusca(CACHE_BUSCA_FILE)
+    limitador_busca = LimitadorAdaptativo.para(
+        'busca', sobrecarga=indica_sobrecarga, **{'concorrencia_maxima': THREADS_BUSCA, **LIMITES_BUSCA})
+    limitador_download = LimitadorAdaptativo.para(
+        'download', sobrecarga=indica_sobrecarga, **{'concorrencia_maxima': THREADS_DOWNLOAD, **LIMITES_DOWNLOAD})
+
+    results_data = [item for item in itens if item.get('status')]  # Títulos vazios
+    for item in results_data:
+        estado_jobs.registrar_resultado(item)
     
-    # A lista 'results' agora vai armazenar os dicionários retornados por 'process_song'
-    results_data = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        with tqdm(total=len(tasks), desc="Baixando músicas") as pbar:
-            futures = [executor.submit(process_song, task) for task in tasks]
-            for future in concurrent.futures.as_completed(futures):
-                results_data.append(future.result()) # <-- MUDANÇA: Renomeado para 'results_data'
-                pbar.update(1)
+    # <-- MUDANÇA: Busca, download e conversão rodam em estágios separados, cada um com sua concorrência
+    pipeline = criar_pipeline(buscar_video, THREADS_BUSCA, THREADS_DOWNLOAD, PROCESSOS_CONVERSAO, TAMANHO_FILA,
+                              MODO_AQUISICAO, FORMATO_SAIDA, BITRATE_SAIDA, SR_SAIDA, limitador_download)
+    results_data += pipeline.executar([item for item in itens if not item.get('status')], ao_concluir=concluir_item,
+                                      ao_iniciar_etapa=estado_jobs.registrar_etapa)
+    print(f"Profundidade máxima das filas: {pipeline.profundidade_maxima}")
+    estatisticas = cache_busca.estatisticas()
+    print(f"Cache de buscas: {estatisticas['acertos']} acertos, {estatisticas['acertos_negativos']} "
+          f"'não encontrado' reaproveitados, {estatisticas['falhas']} consultas à API "
+          f"(taxa de acerto {estatisticas['taxa_de_acerto']:.0%})")
+    cache_busca.fechar()
+    print(f"Controle de taxa: {limitador_busca.resumo()}")
+    print(f"Controle de taxa: {limitador_download.resumo()}")
+    for classe, contagem in fila_retentativas.resumo().items():
+        print(f"Fila de retentativas [{classe}]: {contagem['prontos']} prontas, {contagem['esperando']} esperando, "
+              f"{contagem['esgotados']} esgotadas")
+    fila_retentativas.fechar()
 
     print("\n--- Processo de download concluído! ---")
     
-    # <-- MUDANÇA: Toda esta seção foi adicionada para criar o CSV de relatório.
+    # <-- MUDANÇA: O relatório é exportado do estado dos jobs (todas as músicas, não só as desta execução).
     print(f"\n📝 Gerando relatório de downloads...")
-    if results_data:
-        # Cria um DataFrame do pandas a partir da lista de dicionários
-        results_df = pd.DataFrame(results_data)
-        
-        # Salva o DataFrame em um novo arquivo CSV
-        results_df.to_csv(OUTPUT_CSV_FILE, index=False, encoding='utf-8')
-        print(f"Relatório salvo com sucesso em '{OUTPUT_CSV_FILE}'")
-    else:
-        print("Nenhum dado para gerar relatório.")
+    linhas = estado_jobs.exportar_csv(OUTPUT_CSV_FILE)
+    print(f"Relatório com {linhas} músicas salvo em '{OUTPUT_CSV_FILE}'")
+    contagem = estado_jobs.contagem()
+    estado_jobs.fechar()
 
-    # A contagem de sucessos e falhas agora é baseada nos dados do DataFrame
+    # A contagem de sucessos e falhas desta execução
     sucessos = sum(1 for r in results_data if r['status'] == "Sucesso")
     falhas = len(results_data) - sucessos
     
-    print(f"\n✅ Áudios baixados com sucesso: {sucessos}")
+    print(f"\n✅ Áudios baixados com sucesso: {sucessos} (no total: {contagem.get('Sucesso', 0)})")
     print(f"❌ Falhas: {falhas}")
     print(f"Verifique as pastas '{BUSCA_COMPLETA_FOLDER}' e '{BUSCA_POR_TITULO_FOLDER}'.")
     if falhas > 0:
@@ -1,175 +1,149 @@
 # musica_downloader.py
 import pandas as pd
 import os
-import time
-import re
-import yt_dlp
 import logging
-from moviepy.editor import AudioFileClip
-# import concurrent.futures # <-- MUDANÇA: Removida a biblioteca de busca
-import concurrent.futures
-from tqdm import tqdm
+from controle_taxa import LimitadorAdaptativo
+from estado_jobs import EstadoJobs
+from fila_retentativas import FilaRetentativas, indica_sobrecarga
+from pipeline_downloads import criar_pipeline
 
 # --- CONFIGURAÇÃO ---
 # <-- MUDANÇA: Coloque aqui o nome do CSV que você baixou do Colab
 INPUT_CSV_FILE = 'lista_completa_videos.csv' 
-OUTPUT_CSV_FILE = 'relatorio_downloads.csv'
+OUTPUT_CSV_FILE = 'relatorio_downloads.csv'  # Exportado do estado dos jobs no fim de cada execução
 # <-- MUDANÇA: Criamos uma pasta única para os áudios
 AUDIO_OUTPUT_FOLDER = 'audios_baixados' 
 LOG_FILE = 'erros.log'
-MAX_WORKERS = 4
-CLIP_DURATION = 40
+# Máximo de threads do estágio de download (ver pipeline_downloads.py); quantas ficam ativas
+# é decidido pelo controle de taxa (ver controle_taxa.py)
+THREADS_DOWNLOAD = 8
+# Ajustes sobre controle_taxa.LIMITES_PADRAO['download'] (taxa, concorrência inicial, latência alvo...)
+LIMITES_DOWNLOAD = {}
+PROCESSOS_CONVERSAO = os.cpu_count() or 1
+# Estado de cada música e fila de retentativas das falhas (ver estado_jobs.py e fila_retentativas.py)
+BANCO_DOWNLOADS = 'downloads.sqlite'
+# 'normal' processa o CSV de entrada; 'retentar' só as falhas da fila cuja espera já passou
+MODO = 'normal'
+FORMATO_ALTERNATIVO = True
 
 # --- CONFIGURAÇÃO DO LOGGING ---
+# <-- MUDANÇA: filemode='a' para uma execução retomada não apagar os erros da anterior
 logging.basicConfig(level=logging.ERROR, 
                     filename=LOG_FILE, 
-                    filemode='w', 
+                    filemode='a', 
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-def sanitize_filename(filename):
-    """Função para limpar nomes de arquivos."""
-    sanitized = re.sub(r'[\\/*?:"<>|]', "", filename)
-    return sanitized[:150]
+fila_retentativas = None  # Aberta em main()
+estado_jobs = None  # Aberto em main()
 
-def download_and_process_audio(video_url, output_path, filename):
-    """
-    Esta função baixa, converte para MP3 e corta o áudio.
-    (Esta função está perfeita, não mudei nada nela)
-    """
-    sanitized_filename = sanitize_filename(filename)
-    final_audio_path = os.path.join(output_path, f"{sanitized_filename}.mp3")
-    
-    temp_path_template = os.path.join(output_path, f"temp_{sanitized_filename}.%(ext)s")
-    actual_temp_path = None 
-    
-    try:
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': temp_path_template,
-            'max_filesize': 50 * 1024 * 1024,
-            'quiet': True,
-            'no_warnings': True,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(video_url, download=True)
-            actual_temp_path = info_dict.get('filepath')
-
-        if not actual_temp_path or not os.path.exists(actual_temp_path):
-             logging.error(f"yt-dlp não retornou um caminho de arquivo válido para '{filename}'")
-             return False
-
-        with AudioFileClip(actual_temp_path) as audio:
-            end_duration = min(audio.duration, CLIP_DURATION)
-            if end_duration > 0:
-                with audio.subclip(0, end_duration) as final_clip:
-                    # Usamos 'libmp3lame' que é um codec comum para mp3
-                    final_clip.write_audiofile(final_audio_path, logger=None, codec='libmp3lame')
-            else:
-                logging.error(f"Áudio com duração zero para '{filename}'")
-                return False
-        return True
-        
-    except Exception as e:
-        print(f"\n--- ERRO DETALHADO para '{filename}' ---")
-        print(f"URL do Vídeo: {video_url}")
-        print(f"Tipo do Erro: {type(e).__name__}")
-        print(f"Mensagem do Erro: {e}")
-        print("-------------------------------------------\n")
-        logging.error(f"Erro detalhado para '{filename}': {type(e).__name__} - {e}")
-        return False
+# <-- MUDANÇA: O download e a conversão agora são os estágios do pipeline (pipeline_downloads.py);
+# o antigo download_and_process_audio falhava com "yt-dlp não retornou um caminho de arquivo válido".
 
-    finally:
-        if actual_temp_path and os.path.exists(actual_temp_path):
-            os.remove(actual_temp_path)
-            
-# <-- MUDANÇA: A função 'search_youtube_link' foi removida, pois não é mais necessária.
+def sem_busca(item):
+    """Estágio de busca do pipeline: a URL já vem do CSV da playlist."""
+    return item
 
-def process_song(row_tuple):
+def preparar_item(row_tuple):
     """
-    Esta é a função "trabalhadora" que cada thread vai executar.
+    Monta o item do pipeline a partir da linha do CSV.
     Ela foi modificada para ler as colunas 'url' e 'title' do seu CSV.
     """
     index, row = row_tuple
     
     # <-- MUDANÇA: Lemos as colunas 'url' e 'title' do CSV da playlist
-    video_url = str(row.get('url', '')).strip()
-    video_title = str(row.get('title', '')).strip() # Usamos o título do vídeo como nome do arquivo
+    video_url = '' if pd.isna(row.get('url')) else str(row.get('url')).strip()
+    video_title = '' if pd.isna(row.get('title')) else str(row.get('title')).strip() # Usamos o título do vídeo como nome do arquivo
 
     # Se a linha do CSV não tiver URL ou título, pulamos
     if not video_url or not video_title:
         return {
             "musica_buscada": video_title or "Título Vazio",
             "titulo_video_encontrado": video_title,
+            "video_url": video_url or None,
+            "linha": index,  # identifica a linha entre execuções (ver fila_retentativas.chave_do_item)
             "status": "Falha (URL ou Título vazio no CSV)"
         }
     
-    # <-- MUDANÇA: Chamamos diretamente o download, sem pesquisar
-    success = download_and_process_audio(video_url, AUDIO_OUTPUT_FOLDER, video_title)
-    
-    if success:
-        return {
-            "musica_buscada": video_title, # O nome do arquivo é o "item buscado"
-            "titulo_video_encontrado": video_title,
-            "status": "Sucesso"
-        }
-    else:
-        return {
-            "musica_buscada": video_title,
-            "titulo_video_encontrado": video_title,
-            "status": "Falha (erro no download)"
-        }
+    return {
+        "musica_buscada": video_title, # O nome do arquivo é o "item buscado"
+        "titulo_video_encontrado": video_title,
+        "video_url": video_url,
+        "pasta": AUDIO_OUTPUT_FOLDER,
+        "nome_arquivo": video_title,
+    }
+
+def concluir_item(item):
+    fila_retentativas.registrar(item)
+    estado_jobs.registrar_resultado(item)
+    if item.get('erro'):
+        print(f"\n--- ERRO DETALHADO para '{item['musica_buscada']}' ---")
+        print(f"URL do Vídeo: {item.get('video_url')}")
+        print(f"Erro ({item['classe_falha']}): {item['erro']}")
+        print("-------------------------------------------\n")
+        logging.error(f"Erro detalhado para '{item['musica_buscada']}' [{item['classe_falha']}]: {item['erro']}")
 
 def main():
+    global fila_retentativas, estado_jobs
     print("Iniciando o processo de download de áudios...")
     print(f"Erros detalhados serão salvos em '{LOG_FILE}'")
 
-    if not os.path.exists(INPUT_CSV_FILE):
-        print(f"ERRO: Arquivo de entrada '{INPUT_CSV_FILE}' não encontrado!")
-        print("Verifique se o nome do arquivo está correto e na mesma pasta do script.")
-        return
-
     # <-- MUDANÇA: Criamos a pasta de saída única
     os.makedirs(AUDIO_OUTPUT_FOLDER, exist_ok=True)
+    fila_retentativas = FilaRetentativas(BANCO_DOWNLOADS)
 
-    try:
-        df = pd.read_csv(INPUT_CSV_FILE, encoding='utf-8')
-    except Exception as e:
-        print(f"ERRO ao ler o CSV: {e}. Verifique se o arquivo '{INPUT_CSV_FILE}' está salvo com a codificação correta (UTF-8).")
-        return
-
-    print(f"Encontradas {len(df)} músicas no arquivo CSV para processar.")
-
-    tasks = list(df.iterrows())
+    if MODO == 'retentar':
+        tasks = fila_retentativas.prontos(formato_alternativo=FORMATO_ALTERNATIVO)
+        print(f"Modo de retentativa: {len(tasks)} falhas prontas para tentar de novo.")
+    else:
+        if not os.path.exists(INPUT_CSV_FILE):
+            print(f"ERRO: Arquivo de entrada '{INPUT_CSV_FILE}' não encontrado!")
+            print("Verifique se o nome do arquivo está correto e na mesma pasta do script.")
+            return
+
+        try:
+            df = pd.read_csv(INPUT_CSV_FILE, encoding='utf-8')
+        except Exception as e:
+            print(f"ERRO ao ler o CSV: {e}. Verifique se o arquivo '{INPUT_CSV_FILE}' está salvo com a codificação correta (UTF-8).")
+            return
+
+        print(f"Encontradas {len(df)} músicas no arquivo CSV para processar.")
+        tasks = [preparar_item(task) for task in df.iterrows()]
+
+    # <-- MUDANÇA: Vídeos que já deram certo numa execução anterior (com o arquivo no disco) são pulados
+    estado_jobs = EstadoJobs(BANCO_DOWNLOADS)
+    tasks, pulados = estado_jobs.pular_concluidos(tasks)
+    if pulados:
+        print(f"{pulados} vídeos já baixados em execuções anteriores serão pulados.")
+    estado_jobs.registrar_pendentes(tasks)
     
-    results_data = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        with tqdm(total=len(tasks), desc="Baixando músicas") as pbar:
-            futures = [executor.submit(process_song, task) for task in tasks]
-            for future in concurrent.futures.as_completed(futures):
-                results_data.append(future.result())
-                pbar.update(1)
+    results_data = [item for item in tasks if item.get('status')]  # Linhas sem URL ou título
+    for item in results_data:
+        estado_jobs.registrar_resultado(item)
+    limitador_download = LimitadorAdaptativo.para(
+        'download', sobrecarga=indica_sobrecarga, **{'concorrencia_maxima': THREADS_DOWNLOAD, **LIMITES_DOWNLOAD})
+    pipeline = criar_pipeline(sem_busca, 1, THREADS_DOWNLOAD, PROCESSOS_CONVERSAO,
+                              limitador_download=limitador_download)
+    results_data += pipeline.executar([item for item in tasks if not item.get('status')], ao_concluir=concluir_item,
+                                      ao_iniciar_etapa=estado_jobs.registrar_etapa)
+    print(f"Controle de taxa: {limitador_download.resumo()}")
+    for classe, contagem in fila_retentativas.resumo().items():
+        print(f"Fila de retentativas [{classe}]: {contagem['prontos']} prontas, {contagem['esperando']} esperando, "
+              f"{contagem['esgotados']} esgotadas")
+    fila_retentativas.fechar()
 
     print("\n--- Processo de download concluído! ---")
     
-    # O seu código de relatório já estava perfeito para esta nova lógica.
+    # <-- MUDANÇA: O relatório é exportado do estado dos jobs (todos os vídeos, não só os desta execução).
     print(f"\n📝 Gerando relatório de downloads...")
-    if results_data:
-        results_df = pd.DataFrame(results_data)
-        results_df.to_csv(OUTPUT_CSV_FILE, index=False, encoding='utf-8')
-        print(f"Relatório salvo com sucesso em '{OUTPUT_CSV_FILE}'")
-    else:
-        print("Nenhum dado para gerar relatório.")
+    linhas = estado_jobs.exportar_csv(OUTPUT_CSV_FILE)
+    print(f"Relatório com {linhas} vídeos salvo em '{OUTPUT_CSV_FILE}'")
+    contagem = estado_jobs.contagem()
+    estado_jobs.fechar()
 
     sucessos = sum(1 for r in results_data if r['status'] == "Sucesso")
     falhas = len(results_data) - sucessos
     
-    print(f"\n✅ Áudios baixados com sucesso: {sucessos}")
+    print(f"\n✅ Áudios baixados com sucesso: {sucessos} (no total: {contagem.get('Sucesso', 0)})")
     print(f"❌ Falhas: {falhas}")
     # <-- MUDANÇA: Atualizada a mensagem final
     print(f"Verifique a pasta '{AUDIO_OUTPUT_FOLDER}'.") 
@@ -0,0 +1,219 @@
+"""
+Pipeline em estágios para os downloaders de áudio.
+
+Antes, cada thread de um ThreadPoolExecutor fazia, em série, a busca, o
+download e a conversão de uma música; com 4 threads, a conversão (CPU)
+segurava threads que poderiam estar baixando (rede), e vice-versa.
+
+Aqui cada etapa é um estágio com a sua própria concorrência, ligado ao
+próximo por uma fila limitada:
+
+    itens -> [busca: threads] -> fila -> [download: threads] -> fila
+          -> [transcodificação: processos] -> resultados
+
+- os estágios de rede (busca, download) usam threads;
+- o estágio de CPU (transcodificação) usa um pool de processos do tamanho do
+  número de núcleos;
+- as filas limitadas seguram os estágios rápidos quando o seguinte está
+  atrasado (nada de centenas de áudios brutos esperando conversão no disco
+  temporário); entre os estágios passa só o caminho do áudio bruto;
+- a profundidade de cada fila aparece na barra de progresso e o máximo de
+  cada uma é devolvido no fim.
+
+Cada item é um dicionário (com as chaves do relatório dos downloaders:
+'musica_buscada', 'titulo_video_encontrado', 'status'). Cada estágio recebe
+o item e o devolve atualizado; um item com 'status' preenchido antes do fim
+(uma falha) pula direto para os resultados. As funções dos estágios de
+processo precisam ser funções de módulo (para serem enviadas ao processo).
+
+As etapas padrão de download e transcodificação estão aqui (etapa_baixar,
+etapa_transcodificar); a busca é de cada downloader. Para testar sem a
+internet, veja benchmark_downloads.py (fonte local servida por HTTP).
+"""
+
+import contextlib
+import functools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from processamento_audio import (
+    BITRATE_SAIDA, FORMATO_SAIDA, MODO_AQUISICAO, SELETOR_FORMATO, SR_SAIDA, baixar_audio, descartar_bruto,
+    extensao_do_formato, sanitize_filename, transcodificar_bruto,
+)
+
+_FIM = object()
+
+class Estagio:
+    """Um estágio do pipeline: `funcao(item) -> item` rodando com `concorrencia` trabalhadores."""
+
+    def __init__(self, nome, funcao, concorrencia, usar_processos=False, status_em_erro=None):
+        self.nome = nome
+        self.funcao = funcao
+        self.concorrencia = max(1, concorrencia)
+        self.usar_processos = usar_processos
+        self.status_em_erro = status_em_erro or f"Falha (erro em {nome})"
+
+class PipelineDownloads:
+    def __init__(self, estagios, tamanho_fila=8, intervalo_relatorio=0.5):
+        self.estagios = estagios
+        self.tamanho_fila = tamanho_fila
+        self.intervalo_relatorio = intervalo_relatorio
+        self.filas = [queue.Queue(maxsize=tamanho_fila) for _ in estagios]
+        self.resultados = queue.Queue()
+        self.profundidade_maxima = {estagio.nome: 0 for estagio in estagios}
+        self._ativos = [estagio.concorrencia for estagio in estagios]
+        self._trava = threading.Lock()
+        self._ao_iniciar_etapa = None
+
+    def profundidades(self):
+        """Itens esperando na fila de entrada de cada estágio."""
+        return {estagio.nome: fila.qsize() for estagio, fila in zip(self.estagios, self.filas)}
+
+    def _trabalhador(self, indice, executor):
+        estagio = self.estagios[indice]
+        entrada = self.filas[indice]
+        try:
+            while True:
+                item = entrada.get()
+                if item is _FIM:
+                    break
+                tempos = item.setdefault('tempos', {})
+                inicio = time.perf_counter()
+                try:
+                    # Dentro do try: uma falha do callback (ex.: banco travado) é uma falha do item,
+                    # não do trabalhador
+                    if self._ao_iniciar_etapa is not None:
+                        self._ao_iniciar_etapa(item, estagio.nome)
+                    if executor is not None:
+                        item = executor.submit(estagio.funcao, item).result()
+                    else:
+                        item = estagio.funcao(item)
+                except Exception as e:
+                    item['status'] = estagio.status_em_erro
+                    item['erro'] = f"{type(e).__name__}: {e}"
+                    # Item que falhou não segue: o áudio bruto dele (arquivo temporário) não tem mais uso
+                    descartar_bruto(item.pop('arquivo_bruto', None))
+                tempos[estagio.nome] = round(time.perf_counter() - inicio, 3)
+                item['tempos'] = tempos
+
+                if item.get('status') or indice + 1 == len(self.estagios):
+                    self.resultados.put(item)
+                else:
+                    self.filas[indice + 1].put(item)
+        finally:
+            # O último trabalhador a sair avisa o estágio seguinte (mesmo se este morrer,
+            # para o pipeline não ficar esperando para sempre)
+            with self._trava:
+                self._ativos[indice] -= 1
+                ultimo = self._ativos[indice] == 0
+            if ultimo and indice + 1 < len(self.estagios):
+                for _ in range(self.estagios[indice + 1].concorrencia):
+                    self.filas[indice + 1].put(_FIM)
+
+    def _alimentar(self, itens):
+        for item in itens:
+            self.filas[0].put(item)
+        for _ in range(self.estagios[0].concorrencia):
+            self.filas[0].put(_FIM)
+
+    def executar(self, itens, ao_concluir=None, descricao="Baixando músicas", ao_iniciar_etapa=None):
+        """
+        Passa `itens` pelos estágios. Chama ao_concluir(item) no processo
+        principal a cada item terminado (com sucesso ou não) e retorna a
+        lista dos itens terminados. ao_iniciar_etapa(item, nome_do_estagio)
+        é chamada pelas threads dos estágios antes de cada etapa. O tempo
+        de cada etapa (segundos) fica em item['tempos'].
+        """
+        itens = list(itens)
+        self._ao_iniciar_etapa = ao_iniciar_etapa
+        executores = [
+            ProcessPoolExecutor(max_workers=estagio.concorrencia) if estagio.usar_processos else None
+            for estagio in self.estagios
+        ]
+        threads = [threading.Thread(target=self._alimentar, args=(itens,), daemon=True)]
+        for indice, estagio in enumerate(self.estagios):
+            threads.extend(
+                threading.Thread(target=self._trabalhador, args=(indice, executores[indice]), daemon=True)
+                for _ in range(estagio.concorrencia)
+            )
+        for thread in threads:
+            thread.start()
+
+        concluidos = []
+        try:
+            with tqdm(total=len(itens), desc=descricao) as barra:
+                while len(concluidos) < len(itens):
+                    try:
+                        item = self.resultados.get(timeout=self.intervalo_relatorio)
+                    except queue.Empty:
+                        item = None
+                    profundidades = self.profundidades()
+                    for nome, profundidade in profundidades.items():
+                        self.profundidade_maxima[nome] = max(self.profundidade_maxima[nome], profundidade)
+                    barra.set_postfix({f"fila {nome}": profundidade for nome, profundidade in profundidades.items()})
+                    if item is None:
+                        continue
+                    concluidos.append(item)
+                    if ao_concluir is not None:
+                        ao_concluir(item)
+                    barra.update(1)
+        finally:
+            for thread in threads:
+                thread.join(timeout=1)
+            for executor in executores:
+                if executor is not None:
+                    executor.shutdown(wait=True)
+        return concluidos
+
+# ===================================================================
+# --- ETAPAS PADRÃO ---
+# ===================================================================
+
+def etapa_baixar(item, modo=MODO_AQUISICAO, limitador=None):
+    """
+    Baixa o áudio bruto de item['video_url'] para um arquivo temporário
+    (estágio de rede), cujo caminho fica em item['arquivo_bruto']. Em item['aquisicao'] fica o modo usado ('clipe' ou 'completo', se
+    a fonte não aceitou o download parcial). Com um `limitador`
+    (controle_taxa.LimitadorAdaptativo), o download espera a vez dele. O
+    formato é escolhido por item['seletor_formato'], se houver (retentativas).
+    """
+    with limitador.requisicao() if limitador else contextlib.nullcontext():
+        item['arquivo_bruto'], item['aquisicao'] = baixar_audio(
+            item['video_url'], modo=modo, seletor=item.get('seletor_formato', SELETOR_FORMATO))
+    return item
+
+def etapa_transcodificar(item, formato=FORMATO_SAIDA, bitrate=BITRATE_SAIDA, sr=SR_SAIDA):
+    """
+    Corta e converte o áudio bruto para o arquivo final numa só chamada do
+    ffmpeg (estágio de CPU) e apaga o arquivo temporário.
+    """
+    caminho_final = os.path.join(
+        item['pasta'], f"{sanitize_filename(item['nome_arquivo'])}.{extensao_do_formato(formato)}")
+    transcodificar_bruto(item.pop('arquivo_bruto'), caminho_final, formato, bitrate, sr)
+    item['caminho_final'] = caminho_final
+    item['status'] = "Sucesso"
+    return item
+
+def criar_pipeline(buscar, concorrencia_busca=4, concorrencia_download=4, processos_transcodificacao=None,
+                   tamanho_fila=8, modo_aquisicao=MODO_AQUISICAO, formato=FORMATO_SAIDA, bitrate=BITRATE_SAIDA,
+                   sr=SR_SAIDA, limitador_download=None):
+    """
+    Pipeline busca -> download -> transcodificação dos downloaders.
+    `buscar(item)` preenche item['video_url'] e item['titulo_video_encontrado']
+    (ou marca item['status'] como falha). Com um `limitador_download`, o
+    estágio de download tem concorrencia_download threads, mas só as que o
+    limitador libera ficam baixando ao mesmo tempo.
+    """
+    return PipelineDownloads([
+        Estagio('busca', buscar, concorrencia_busca, status_em_erro="Falha (erro na busca)"),
+        Estagio('download', functools.partial(etapa_baixar, modo=modo_aquisicao, limitador=limitador_download), concorrencia_download,
+                status_em_erro="Falha (erro no download)"),
+        Estagio('transcodificação', functools.partial(etapa_transcodificar, formato=formato, bitrate=bitrate, sr=sr),
+                processos_transcodificacao or os.cpu_count() or 1,
+                usar_processos=True, status_em_erro="Falha (erro na conversão)"),
+    ], tamanho_fila=tamanho_fila)
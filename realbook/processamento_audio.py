@@ -0,0 +1,259 @@
+"""
+Download e transcodificação dos áudios, compartilhados pelos downloaders
+(musica_downloader.py e billboard/search.py).
+
+O download e a transcodificação ficam em funções separadas para poderem rodar
+em estágios diferentes do pipeline (pipeline_downloads.py): o download (rede)
+num pool de threads e a transcodificação (CPU) num pool de processos.
+
+Download: o yt-dlp só escolhe o formato (a URL do melhor áudio) e o áudio
+é gravado, como veio, num arquivo temporário (em PASTA_TEMPORARIA), cujo
+caminho passa de um estágio para o outro. Não são os antigos 'temp_*' do
+yt-dlp (um por etapa, deixados na pasta de saída quando algo falhava): é um
+só arquivo bruto por música, que quem transcodifica apaga (com sucesso ou
+não), e que um download que falha apaga na hora. O arquivo é o preço de não
+levar até TAMANHO_MAXIMO_DOWNLOAD bytes por item nas filas do pipeline e no
+envio (pickle) ao pool de processos; um pipe direto do download para a
+transcodificação ligaria os dois estágios (a conversão de uma música
+seguraria uma thread de rede, e vice-versa). O limite de tamanho vale nos
+dois caminhos do download completo (requests e ffmpeg, com -fs).
+Como só os primeiros CLIP_DURATION segundos são usados, no modo de aquisição
+'clipe' quem baixa é o ffmpeg, com a entrada limitada a CLIP_DURATION
+segundos (como no download_ranges do yt-dlp), e ele para de ler a fonte ao
+chegar lá. Banda por música cai na proporção da duração da faixa para
+CLIP_DURATION. Se a fonte não aceitar download parcial (protocolo que o
+ffmpeg não lê, servidor que recusa pedidos parciais...), baixar_audio() volta
+para o download completo ('completo').
+
+Transcodificação: uma única chamada do ffmpeg vai do contêiner baixado
+(webm, m4a...) direto para o clipe no formato final, lendo o arquivo bruto
+(ou, para bytes em memória, o stdin) e escrevendo no stdout, que vai para
+um '.part' renomeado no fim. Ler de um arquivo também resolve os
+contêineres que precisam de busca (MP4 com o índice no fim), que de um pipe
+não podiam ser lidos. Antes eram duas codificações: o FFmpegExtractAudio do
+yt-dlp gerava um MP3 de 192k e o moviepy o decodificava e codificava de novo.
+Com FORMATO_SAIDA = 'copia' o áudio não é recodificado (só cortado e
+colocado num contêiner Matroska).
+
+Dependências:
+- yt-dlp
+- ffmpeg (do sistema ou o do imageio-ffmpeg, que vem com o moviepy)
+- requests
+(Instale com: pip install yt-dlp imageio-ffmpeg requests)
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+import requests
+import yt_dlp
+
+CLIP_DURATION = 40
+TAMANHO_MAXIMO_DOWNLOAD = 50 * 1024 * 1024  # 50 MB
+MODO_AQUISICAO = 'clipe'  # 'clipe' (só os primeiros CLIP_DURATION s) ou 'completo'
+TIMEOUT_REDE = 30  # segundos sem resposta da fonte
+# Protocolos (do yt-dlp) que o ffmpeg sabe ler parcialmente
+PROTOCOLOS_PARCIAIS = ('http', 'https', 'm3u8', 'm3u8_native')
+# Seletores de formato do yt-dlp: o padrão e o alternativo, usado ao retentar
+# falhas de extração/tamanho (ver fila_retentativas.py): áudio menor e outro contêiner
+SELETOR_FORMATO = 'bestaudio/best'
+SELETOR_ALTERNATIVO = 'bestaudio[abr<=128][protocol^=http]/worstaudio/worst'
+PASTA_TEMPORARIA = None  # onde ficam os áudios brutos até a transcodificação (None = a do sistema)
+
+# Saída da transcodificação
+FORMATO_SAIDA = 'mp3'  # uma das chaves de FORMATOS
+BITRATE_SAIDA = '192k'
+SR_SAIDA = None        # taxa de amostragem em Hz (None = a do original)
+
+# formato: (codec do ffmpeg, muxer, extensão do arquivo)
+FORMATOS = {
+    'mp3':   ('libmp3lame', 'mp3', 'mp3'),
+    'opus':  ('libopus', 'ogg', 'opus'),
+    'aac':   ('aac', 'adts', 'aac'),
+    'flac':  ('flac', 'flac', 'flac'),
+    'wav':   ('pcm_s16le', 'wav', 'wav'),
+    'copia': ('copy', 'matroska', 'mka'),  # sem recodificar
+}
+
+def sanitize_filename(filename):
+    """Função para limpar nomes de arquivos."""
+    sanitized = re.sub(r'[\\/*?:"<>|]', "", filename)
+    return sanitized[:150]
+
+def caminho_ffmpeg():
+    """O ffmpeg do sistema ou, se não houver, o que vem com o imageio-ffmpeg (dependência do moviepy)."""
+    encontrado = shutil.which('ffmpeg')
+    if encontrado:
+        return encontrado
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+def extensao_do_formato(formato=FORMATO_SAIDA):
+    return FORMATOS[formato][2]
+
+# ===================================================================
+# --- DOWNLOAD ---
+# ===================================================================
+
+def resolver_audio(video_url, seletor=SELETOR_FORMATO):
+    """
+    Usa o yt-dlp só para escolher o formato de áudio (sem baixar).
+    Retorna o dicionário do formato ('url', 'http_headers', 'protocol', 'ext'...).
+    """
+    ydl_opts = {'format': seletor, 'noplaylist': True, 'quiet': True, 'no_warnings': True}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info_dict = ydl.extract_info(video_url, download=False)
+    return (info_dict.get('requested_formats') or [info_dict])[0]
+
+def _cabecalhos_ffmpeg(formato):
+    return ''.join(f"{nome}: {valor}\r\n" for nome, valor in (formato.get('http_headers') or {}).items())
+
+def _arquivo_temporario():
+    descritor, caminho = tempfile.mkstemp(suffix='.bruto', dir=PASTA_TEMPORARIA)
+    os.close(descritor)
+    return caminho
+
+def descartar_bruto(caminho):
+    """Apaga o arquivo temporário de um áudio bruto, se ainda existir."""
+    if caminho and os.path.exists(caminho):
+        os.remove(caminho)
+
+def _copiar_com_ffmpeg(formato, duracao=None):
+    """
+    O ffmpeg lê a fonte (só os primeiros `duracao` segundos, se dado) e copia
+    o áudio, sem recodificar, para um Matroska num arquivo temporário.
+    Retorna o caminho do arquivo. Com -fs, o ffmpeg para de gravar ao chegar
+    a TAMANHO_MAXIMO_DOWNLOAD (o max_filesize do yt-dlp, antes), e isso é
+    tratado como erro.
+    """
+    comando = [caminho_ffmpeg(), '-hide_banner', '-loglevel', 'error', '-nostdin', '-y',
+               '-rw_timeout', str(TIMEOUT_REDE * 1_000_000), '-headers', _cabecalhos_ffmpeg(formato)]
+    if duracao:
+        comando += ['-t', str(duracao)]
+    caminho = _arquivo_temporario()
+    comando += ['-i', formato['url'], '-map', '0:a:0', '-c', 'copy', '-fs', str(TAMANHO_MAXIMO_DOWNLOAD),
+                '-f', 'matroska', caminho]
+    resultado = subprocess.run(comando, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if os.path.getsize(caminho) >= TAMANHO_MAXIMO_DOWNLOAD:
+        descartar_bruto(caminho)
+        raise RuntimeError(f"Arquivo maior que {TAMANHO_MAXIMO_DOWNLOAD // (1024 * 1024)} MB")
+    if resultado.returncode != 0 or os.path.getsize(caminho) == 0:
+        descartar_bruto(caminho)
+        erro = resultado.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(f"ffmpeg falhou ({resultado.returncode}): {erro[-1] if erro else 'nenhum dado recebido'}")
+    return caminho
+
+def baixar_clipe_bruto(formato, duracao=CLIP_DURATION):
+    """
+    Baixa só os primeiros `duracao` segundos do áudio, sem recodificar, para
+    um arquivo temporário (retorna o caminho). Levanta uma exceção se a
+    fonte não permitir o download parcial.
+    """
+    if formato.get('protocol') not in PROTOCOLOS_PARCIAIS:
+        raise RuntimeError(f"Download parcial não suportado para o protocolo '{formato.get('protocol')}'")
+    return _copiar_com_ffmpeg(formato, duracao)
+
+def baixar_audio_bruto(formato):
+    """
+    Baixa o áudio inteiro como veio da fonte (webm, m4a...), sem converter,
+    para um arquivo temporário, e retorna o caminho. Levanta uma exceção
+    (e apaga o temporário) se o download falhar ou passar de
+    TAMANHO_MAXIMO_DOWNLOAD.
+    """
+    if formato.get('protocol') not in ('http', 'https'):
+        return _copiar_com_ffmpeg(formato)
+    caminho = _arquivo_temporario()
+    try:
+        recebido = 0
+        with requests.get(formato['url'], headers=formato.get('http_headers'), stream=True,
+                          timeout=TIMEOUT_REDE) as resposta, open(caminho, 'wb') as arquivo:
+            resposta.raise_for_status()
+            for bloco in resposta.iter_content(chunk_size=256 * 1024):
+                recebido += len(bloco)
+                if recebido > TAMANHO_MAXIMO_DOWNLOAD:
+                    raise RuntimeError(f"Arquivo maior que {TAMANHO_MAXIMO_DOWNLOAD // (1024 * 1024)} MB")
+                arquivo.write(bloco)
+    except BaseException:
+        descartar_bruto(caminho)
+        raise
+    return caminho
+
+def baixar_audio(video_url, modo=MODO_AQUISICAO, duracao=CLIP_DURATION, seletor=SELETOR_FORMATO):
+    """
+    Baixa o áudio no modo pedido ('clipe' ou 'completo'), voltando para o
+    download completo se o parcial falhar. Retorna (caminho do arquivo
+    temporário com o áudio bruto, modo_usado); apague-o com descartar_bruto()
+    (ou deixe transcodificar_bruto() apagar).
+    """
+    formato = resolver_audio(video_url, seletor)
+    if modo == 'clipe':
+        try:
+            return baixar_clipe_bruto(formato, duracao), 'clipe'
+        except RuntimeError:
+            pass
+    return baixar_audio_bruto(formato), 'completo'
+
+# ===================================================================
+# --- TRANSCODIFICAÇÃO ---
+# ===================================================================
+
+def comando_transcodificacao(entrada='pipe:0', formato=FORMATO_SAIDA, bitrate=BITRATE_SAIDA, sr=SR_SAIDA,
+                             duracao=CLIP_DURATION):
+    """Comando do ffmpeg que lê `entrada` e escreve os primeiros `duracao` s no formato pedido no stdout."""
+    codec, muxer, _ = FORMATOS[formato]
+    # -xerror: erro de leitura (ex.: MP4 incompleto vindo de um pipe) faz o ffmpeg falhar
+    comando = [caminho_ffmpeg(), '-hide_banner', '-loglevel', 'error', '-xerror',
+               '-t', str(duracao), '-i', entrada, '-vn', '-c:a', codec]
+    if codec != 'copy':
+        if bitrate and formato not in ('flac', 'wav'):
+            comando += ['-b:a', str(bitrate)]
+        if sr:
+            comando += ['-ar', str(sr)]
+    return comando + ['-f', muxer, 'pipe:1']
+
+def transcodificar_bruto(caminho_bruto, caminho_saida, formato=FORMATO_SAIDA, bitrate=BITRATE_SAIDA, sr=SR_SAIDA,
+                         duracao=CLIP_DURATION):
+    """transcodificar() do arquivo temporário de baixar_audio(), apagando-o no fim (com sucesso ou não)."""
+    try:
+        return transcodificar(caminho_bruto, caminho_saida, formato, bitrate, sr, duracao)
+    finally:
+        descartar_bruto(caminho_bruto)
+
+def transcodificar(audio, caminho_saida, formato=FORMATO_SAIDA, bitrate=BITRATE_SAIDA, sr=SR_SAIDA,
+                   duracao=CLIP_DURATION):
+    """
+    Converte os primeiros `duracao` segundos de `audio` (bytes de qualquer
+    contêiner que o ffmpeg leia, ou o caminho de um arquivo) para `formato`,
+    numa só chamada do ffmpeg, e grava em `caminho_saida`.
+
+    A saída é escrita num '.part' e renomeada no fim, para que uma falha não
+    deixe um arquivo pela metade com o nome final.
+    """
+    em_memoria = isinstance(audio, (bytes, bytearray, memoryview))
+    comando = comando_transcodificacao('pipe:0' if em_memoria else audio, formato, bitrate, sr, duracao)
+    caminho_parcial = f"{caminho_saida}.part"
+    try:
+        with open(caminho_parcial, 'wb') as saida:
+            resultado = subprocess.run(comando, input=audio if em_memoria else None,
+                                       stdin=None if em_memoria else subprocess.DEVNULL,
+                                       stdout=saida, stderr=subprocess.PIPE)
+        if resultado.returncode != 0 or os.path.getsize(caminho_parcial) == 0:
+            if em_memoria:
+                # Contêineres que precisam de busca no arquivo (MP4 com o índice
+                # no fim) não podem ser lidos de um pipe: tenta de um arquivo.
+                with tempfile.NamedTemporaryFile(suffix='.bruto', delete=False) as temporario:
+                    temporario.write(audio)
+                try:
+                    return transcodificar(temporario.name, caminho_saida, formato, bitrate, sr, duracao)
+                finally:
+                    os.remove(temporario.name)
+            erro = resultado.stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise RuntimeError(f"ffmpeg falhou ({resultado.returncode}): {erro[-1] if erro else 'saída vazia'}")
+        os.replace(caminho_parcial, caminho_saida)
+    finally:
+        if os.path.exists(caminho_parcial):
+            os.remove(caminho_parcial)
+    return caminho_saida
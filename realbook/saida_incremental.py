@@ -0,0 +1,188 @@
+"""
+Saída incremental e retomável para o scraping do Real Book Site.
+
+- JornalScrape: registro (checkpoint) de cada URL processada e do resultado,
+  uma linha JSON por URL, gravado assim que a página termina;
+- EscritorCSVIncremental: acrescenta cada música ao CSV parcial assim que ela
+  chega, em vez de guardar tudo em memória até o fim;
+- compactar_saida: passada final que remove duplicatas (Titulo/Ano/Autor) do
+  CSV parcial, na ordem das URLs (e não na de chegada), e escreve o CSV
+  definitivo (opcionalmente mesclando com o CSV de uma execução anterior, no
+  modo incremental).
+
+Se a execução for interrompida (erro, Ctrl-C), o jornal e o CSV parcial ficam
+no disco e a próxima execução pula as URLs que já deram certo.
+"""
+
+import csv
+import json
+import os
+import time
+
+STATUS_SUCESSO = 'sucesso'
+STATUS_FALHA = 'falha'
+
+class JornalScrape:
+    """Checkpoint das URLs processadas, em formato JSON Lines (append-only)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = None
+
+    def carregar(self):
+        """
+        Lê o jornal e retorna {url: status}, valendo o último registro de cada URL.
+        Uma última linha incompleta (escrita interrompida) é ignorada.
+        """
+        status = {}
+        if not os.path.exists(self.caminho):
+            return status
+        with open(self.caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+                status[registro['url']] = registro['status']
+        return status
+
+    def urls_concluidas(self):
+        return {url for url, status in self.carregar().items() if status == STATUS_SUCESSO}
+
+    def registrar(self, url, status):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._arquivo.write(json.dumps({'url': url, 'status': status, 'horario': time.time()}, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def apagar(self):
+        self.fechar()
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+class EscritorCSVIncremental:
+    """Acrescenta linhas a um CSV à medida que chegam, escrevendo o cabeçalho só uma vez."""
+
+    def __init__(self, caminho, colunas):
+        self.caminho = caminho
+        self.colunas = colunas
+        novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        self._arquivo = open(caminho, 'a', encoding='utf-8', newline='')
+        self._escritor = csv.DictWriter(self._arquivo, fieldnames=colunas, extrasaction='ignore')
+        if novo:
+            self._escritor.writeheader()
+            self._arquivo.flush()
+
+    def escrever(self, linha):
+        self._escritor.writerow(linha)
+        self._arquivo.flush()
+
+    def fechar(self):
+        self._arquivo.close()
+
+def _ler_linhas(caminho):
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f)
+
+def _leitor_csv(arquivo, inicios):
+    """csv.reader sobre `arquivo` (binário), anotando em `inicios` o byte de início de cada linha lida."""
+    def linhas():
+        while True:
+            inicio = arquivo.tell()
+            linha = arquivo.readline()
+            if not linha:
+                return
+            inicios.append(inicio)
+            yield linha.decode('utf-8')
+    return csv.reader(linhas())
+
+def _registros_com_offsets(caminho):
+    """(byte de início, linha como dicionário) de cada registro do CSV, lendo um por vez."""
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, 'rb') as f:
+        inicios = []
+        leitor = _leitor_csv(f, inicios)
+        cabecalho = next(leitor, None)
+        while cabecalho is not None:
+            inicios.clear()
+            campos = next(leitor, None)
+            if campos is None:
+                return
+            if campos:  # linhas em branco são puladas, como no DictReader
+                yield inicios[0], dict(zip(cabecalho, campos))
+
+def compactar_saida(caminho_parcial, caminho_saida, chave, colunas_saida, anterior=None, descartar=(), ordem=None,
+                    coluna_url='URL'):
+    """
+    Copia o CSV parcial para o definitivo removendo linhas com a mesma `chave`
+    (como drop_duplicates(subset=chave), mantendo a primeira ocorrência).
+
+    No modo assíncrono as linhas chegam ao parcial na ordem em que as páginas
+    terminam, então "a primeira" dependeria do tempo de cada página. Com
+    `ordem` (as URLs na ordem em que o modo sequencial as processaria), as
+    linhas do parcial são ordenadas pela posição da URL antes de remover as
+    duplicatas, e o resultado é o mesmo em qualquer execução. Sem `ordem`,
+    vale a ordem do arquivo.
+
+    Duas passadas pelo parcial: a primeira guarda só, para cada chave, a
+    posição e o byte de início da linha que fica; a segunda relê essas
+    linhas, na ordem das posições. As linhas do `anterior` são lidas uma a
+    uma. O conjunto de dados inteiro nunca fica em memória.
+
+    Com `anterior` (o CSV de uma execução anterior), as linhas dele são
+    mantidas depois das novas, exceto as de chave em `descartar` (músicas
+    cujas páginas mudaram e foram extraídas de novo).
+
+    Retorna o número de linhas escritas; com zero linhas, nada é escrito.
+    """
+    descartar = {tuple(identificador) for identificador in descartar}
+    posicoes = {url: indice for indice, url in enumerate(ordem)} if ordem is not None else {}
+    vencedoras = {}  # chave -> ((posição da URL, índice da linha), byte de início da linha)
+    for indice, (inicio, linha) in enumerate(_registros_com_offsets(caminho_parcial)):
+        identificador = tuple(linha[coluna] for coluna in chave)
+        posicao = (posicoes.get(linha.get(coluna_url), len(posicoes)), indice)
+        if identificador not in vencedoras or posicao < vencedoras[identificador][0]:
+            vencedoras[identificador] = (posicao, inicio)
+
+    escritas = 0
+    caminho_temporario = caminho_saida + '.tmp'
+    with open(caminho_temporario, 'w', encoding='utf-8', newline='') as saida:
+        escritor = csv.DictWriter(saida, fieldnames=colunas_saida, extrasaction='ignore')
+        escritor.writeheader()
+        if vencedoras:
+            with open(caminho_parcial, 'rb') as parcial:
+                cabecalho = next(_leitor_csv(parcial, []))
+                for _, inicio in sorted(vencedoras.values()):
+                    parcial.seek(inicio)
+                    escritor.writerow(dict(zip(cabecalho, next(_leitor_csv(parcial, [])))))
+                    escritas += 1
+        if anterior:
+            vistas = set(vencedoras)
+            for linha in _ler_linhas(anterior):
+                identificador = tuple(linha[coluna] for coluna in chave)
+                if identificador in vistas or identificador in descartar:
+                    continue
+                vistas.add(identificador)
+                escritor.writerow(linha)
+                escritas += 1
+
+    if escritas:
+        os.replace(caminho_temporario, caminho_saida)
+    else:
+        os.remove(caminho_temporario)
+    return escritas
+
+def chaves_por_url(caminho_parcial, chave, coluna_url='URL'):
+    """Retorna {url: chave} das linhas do CSV parcial (a última vence)."""
+    return {
+        linha[coluna_url]: tuple(linha[coluna] for coluna in chave)
+        for linha in _ler_linhas(caminho_parcial)
+    }
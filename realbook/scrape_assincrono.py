@@ -0,0 +1,144 @@
+"""
+Modo assíncrono do scraping do Real Book Site.
+
+Em vez de baixar uma página por vez (uma conexão nova por música), todas as
+páginas passam por um único cliente aiohttp com pool de conexões (keep-alive).
+O número de downloads simultâneos é limitado por CONCORRENCIA e o ritmo de
+requisições por host por REQUISICOES_POR_SEGUNDO, de modo que a vazão depende
+do limite escolhido e não da latência de cada ida e volta ao servidor.
+
+A extração dos dados de cada página continua sendo feita por
+parse_song_details, do scrape_realbook.py, e as páginas passam pelo mesmo
+cache em disco (cache_http.py) do modo sequencial.
+
+Dependências:
+- aiohttp
+(Instale com: pip install aiohttp)
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from tqdm import tqdm
+
+from scrape_realbook import parse_song_details
+
+class LimitadorPorHost:
+    """
+    Espaça as requisições para que cada host receba no máximo
+    `requisicoes_por_segundo` requisições por segundo.
+    """
+
+    def __init__(self, requisicoes_por_segundo):
+        self.intervalo = 1.0 / requisicoes_por_segundo if requisicoes_por_segundo else 0.0
+        self.proximo_horario = {}
+
+    async def aguardar(self, url):
+        if not self.intervalo:
+            return
+        host = urlsplit(url).netloc
+        agora = time.monotonic()
+        # Reserva o próximo horário livre do host antes de dormir; como o loop
+        # de eventos é single-thread, a reserva não precisa de trava.
+        horario = max(agora, self.proximo_horario.get(host, agora))
+        self.proximo_horario[host] = horario + self.intervalo
+        if horario > agora:
+            await asyncio.sleep(horario - agora)
+
+def _consultar_cache(cache, url):
+    """Entrada do cache para `url` e se ela ainda está fresca (registrando o acerto)."""
+    entrada = cache.obter(url)
+    if entrada and cache.esta_fresca(entrada):
+        cache.tocar(url)
+        cache.registrar_acerto()
+        return entrada, True
+    return entrada, False
+
+def _revalidado(cache, url):
+    cache.renovar(url)
+    cache.registrar_acerto(revalidado=True)
+
+def _guardar(cache, url, html, cabecalhos):
+    cache.guardar(url, html, cabecalhos.get('ETag'), cabecalhos.get('Last-Modified'))
+    cache.registrar_falha()
+
+async def baixar_html(sessao, url, limitador, cache=None):
+    """
+    Baixa o HTML de uma página respeitando o limite por host.
+    Com um cache, revalida a cópia salva (304) em vez de baixar de novo.
+    O acesso ao cache (SQLite e arquivos) roda numa thread (asyncio.to_thread),
+    para não parar o loop de eventos enquanto as outras páginas baixam.
+    Retorna None em caso de erro de acesso.
+    """
+    entrada = None
+    if cache is not None:
+        entrada, fresca = await asyncio.to_thread(_consultar_cache, cache, url)
+        if fresca:
+            return entrada['corpo']
+
+    cabecalhos = cache.cabecalhos_condicionais(entrada) if cache is not None else None
+    await limitador.aguardar(url)
+    try:
+        async with sessao.get(url, headers=cabecalhos) as resposta:
+            if resposta.status == 304 and entrada:
+                await asyncio.to_thread(_revalidado, cache, url)
+                return entrada['corpo']
+            resposta.raise_for_status()
+            html = await resposta.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+
+    if cache is not None:
+        await asyncio.to_thread(_guardar, cache, url, html, resposta.headers)
+    return html
+
+async def _processar_link(sessao, url, limitador, semaforo, cache):
+    async with semaforo:
+        html = await baixar_html(sessao, url, limitador, cache)
+    if html is None:
+        return url, None
+    return url, parse_song_details(html)
+
+async def _crawl(song_links, concorrencia, requisicoes_por_segundo, timeout, cache, ao_concluir):
+    conector = aiohttp.TCPConnector(limit=concorrencia, limit_per_host=concorrencia, ttl_dns_cache=300)
+    limitador = LimitadorPorHost(requisicoes_por_segundo)
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async with aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=timeout)) as sessao:
+        tarefas = [
+            asyncio.ensure_future(_processar_link(sessao, url, limitador, semaforo, cache))
+            for url in song_links
+        ]
+        for tarefa in tqdm(asyncio.as_completed(tarefas), total=len(tarefas), desc="Extraindo dados das músicas"):
+            url, detalhes = await tarefa
+            ao_concluir(url, detalhes)
+
+def crawl_assincrono(song_links, concorrencia=8, requisicoes_por_segundo=10, timeout=10, cache=None, ao_concluir=None):
+    """
+    Baixa e extrai os dados de todas as músicas de forma concorrente.
+
+    Retorna (all_songs_data, failed_links) na mesma ordem de `song_links`,
+    igual ao loop sequencial do scrape_realbook.main().
+
+    Se `ao_concluir` for dado, ele é chamado com (url, detalhes) assim que cada
+    página termina (detalhes é None em caso de falha), nada é acumulado em
+    memória e a função retorna None.
+    """
+    if ao_concluir is not None:
+        asyncio.run(_crawl(song_links, concorrencia, requisicoes_por_segundo, timeout, cache, ao_concluir))
+        return None
+
+    resultados = {}
+    asyncio.run(_crawl(song_links, concorrencia, requisicoes_por_segundo, timeout, cache, resultados.__setitem__))
+
+    all_songs_data = []
+    failed_links = []
+    for url in song_links:
+        detalhes = resultados.get(url)
+        if detalhes:
+            all_songs_data.append(detalhes)
+        else:
+            failed_links.append(url)
+    return all_songs_data, failed_links
@@ -1,37 +1,116 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-import pandas as pd
 from tqdm import tqdm
 import time
 import os
 import re
+from datetime import datetime, timezone
 
-def get_all_song_links(base_url):
+from cache_http import CacheHTTP, baixar_com_cache
+from extracao_html import extrair_titulo_e_conteudo
+from saida_incremental import (
+    STATUS_FALHA, STATUS_SUCESSO, EscritorCSVIncremental, JornalScrape, chaves_por_url, compactar_saida,
+)
+import descoberta_incremental
+
+# --- CONFIGURAÇÃO DO CRAWL ---
+# Modo assíncrono: baixa várias páginas ao mesmo tempo por um cliente com pool
+# de conexões (ver scrape_assincrono.py). Com False, volta ao modo sequencial.
+MODO_ASSINCRONO = True
+CONCORRENCIA = 8              # Máximo de páginas sendo baixadas ao mesmo tempo
+REQUISICOES_POR_SEGUNDO = 10  # Limite de requisições por host
+TAMANHO_POOL = CONCORRENCIA   # Conexões mantidas abertas no modo sequencial
+
+# --- CONFIGURAÇÃO DO CACHE ---
+# Guarda as páginas em disco e, nas próximas execuções, só as baixa de novo
+# se o servidor indicar que mudaram (ETag/Last-Modified -> resposta 304).
+USAR_CACHE = True
+PASTA_CACHE = 'cache_http'
+TAMANHO_MAXIMO_CACHE_MB = 100
+
+# --- CONFIGURAÇÃO DA EXTRAÇÃO ---
+# 'bs4' (árvore completa, original), 'strainer' (só as tags que lemos) ou
+# 'lxml' (mais rápido; precisa do lxml). Ver extracao_html.py.
+BACKEND_EXTRACAO = 'lxml'
+
+# --- CONFIGURAÇÃO DA RETOMADA ---
+# Cada música é gravada no CSV parcial assim que é extraída e cada URL
+# processada vai para o jornal. Se a execução for interrompida, a próxima
+# (com RETOMAR = True) pula as URLs que já deram certo. Ao final, o CSV
+# parcial é compactado (sem duplicatas) no arquivo definitivo e o jornal
+# e o CSV parcial são apagados.
+RETOMAR = True
+ARQUIVO_JORNAL = 'jornal_scrape.jsonl'
+
+# --- CONFIGURAÇÃO DA DESCOBERTA DE LINKS ---
+# 'completa': visita todas as músicas da página principal (como antes).
+# 'incremental': lê o sitemap do site e só visita músicas novas ou modificadas
+# desde a última execução bem-sucedida, mesclando-as ao CSV existente.
+# Ver descoberta_incremental.py.
+MODO_DESCOBERTA = 'completa'
+ARQUIVO_ESTADO_DESCOBERTA = 'estado_descoberta.json'
+SITEMAP = None  # None = procura no site; ou a URL/caminho local de um sitemap
+
+def criar_sessao():
+    """
+    Cria uma sessão HTTP com pool de conexões (keep-alive), para que todas as
+    páginas reaproveitem a mesma conexão TCP/TLS em vez de abrir uma por música.
+    """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=TAMANHO_POOL)
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    return sessao
+
+def baixar_pagina(url, sessao=None, cache=None, timeout=None):
+    """
+    Baixa o HTML de uma página, passando pelo cache em disco se houver um.
+    Levanta requests.exceptions.RequestException em caso de erro de acesso.
+    """
+    sessao = sessao or requests
+    if cache is not None:
+        return baixar_com_cache(sessao, url, cache, timeout)
+    response = sessao.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+def parse_song_links(html, base_url):
+    """
+    Extrai os links de músicas do HTML da página principal, procurando dentro
+    das seções alfabéticas 'letter-section'. Retorna None se nenhuma seção existir.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    letter_sections = soup.find_all('div', class_='letter-section')
+    if not letter_sections:
+        return None
+
+    song_links = []
+    for section in letter_sections:
+        links_in_section = section.find_all('a', href=True)
+        for link in links_in_section:
+            href = link['href']
+            if href.startswith(base_url) or href.startswith('/'):
+                full_url = href if href.startswith('http') else f"{base_url.rstrip('/')}{href}"
+                song_links.append(full_url)
+
+    return sorted(list(set(song_links)))
+
+def get_all_song_links(base_url, sessao=None, cache=None):
     """
     Varre a página principal para encontrar todos os links de músicas,
     procurando dentro das seções alfabéticas 'letter-section'.
     """
     try:
         print(f"Acessando a página principal: {base_url}")
-        response = requests.get(base_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        html = baixar_pagina(base_url, sessao, cache)
 
-        letter_sections = soup.find_all('div', class_='letter-section')
-        if not letter_sections:
+        song_links = parse_song_links(html, base_url)
+        if song_links is None:
             print("ERRO: Não foi possível encontrar nenhuma 'div' com a classe 'letter-section'.")
             return []
 
-        song_links = []
-        for section in letter_sections:
-            links_in_section = section.find_all('a', href=True)
-            for link in links_in_section:
-                href = link['href']
-                if href.startswith(base_url) or href.startswith('/'):
-                    full_url = href if href.startswith('http') else f"{base_url.rstrip('/')}{href}"
-                    song_links.append(full_url)
-
-        song_links = sorted(list(set(song_links)))
         print(f"Encontrados {len(song_links)} links de músicas únicos.")
         return song_links
 
@@ -65,49 +144,43 @@ def extract_year_and_author(text):
 
     return None, None
 
-def get_song_details(song_url):
+def parse_song_details(html, backend=None):
+    """
+    Extrai título, ano e autor do HTML de uma página de música.
+    Retorna None se a página não tiver título.
+    O `backend` escolhe o parser (ver extracao_html.py); por padrão, BACKEND_EXTRACAO.
+    """
+    title, text_content = extrair_titulo_e_conteudo(html, backend or BACKEND_EXTRACAO)
+    title = title.strip() if title else None
+
+    if not title:
+        return None
+
+    year = None
+    author = None
+    
+    # Procura em diferentes tags que podem conter ano e autor
+    # Primeiro, o padrão que você identificou <p class="has-text-align-right">
+    # (ou, se vier antes, a <div class="entry-content">)
+    if text_content:
+        # Tenta encontrar a informação diretamente no texto da tag
+        text_content = text_content.strip()
+        if text_content:
+            # Usa a nova função auxiliar para tentar extrair ano e autor
+            extracted_year, extracted_author = extract_year_and_author(text_content)
+            if extracted_author:
+                author = extracted_author
+                year = extracted_year
+
+    return {'Titulo': title, 'Ano': year, 'Autor': author}
+
+def get_song_details(song_url, sessao=None, cache=None):
     """
     Melhorado para extrair título, ano e autor de forma mais robusta.
     """
     try:
-        response = requests.get(song_url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        title_tag = soup.find('h1', class_='entry-title')
-        title = title_tag.text.strip() if title_tag else None
-
-        if not title:
-            return None
-
-        year = None
-        author = None
-        
-        # Procura em diferentes tags que podem conter ano e autor
-        # Primeiro, o padrão que você identificou <p class="has-text-align-right">
-        content_tag = soup.find(['p', 'div'], class_=['has-text-align-right', 'entry-content'])
-        
-        if content_tag:
-            # Tenta encontrar a informação diretamente no texto da tag
-            text_content = content_tag.get_text().strip()
-            if text_content:
-                # Usa a nova função auxiliar para tentar extrair ano e autor
-                extracted_year, extracted_author = extract_year_and_author(text_content)
-                if extracted_author:
-                    author = extracted_author
-                    year = extracted_year
-        
-        # Se ainda não encontramos o autor, tenta buscar em outras divs de metadados
-        if not author:
-            author_meta_tags = soup.find_all('div', class_='entry-meta')
-            for meta_tag in author_meta_tags:
-                meta_text = meta_tag.get_text().strip()
-                if 'by' in meta_text.lower():
-                    # Lógica para extrair de outros formatos, se necessário
-                    # No momento, a busca por <p> já deve cobrir a maioria dos casos.
-                    pass
-
-        return {'Titulo': title, 'Ano': year, 'Autor': author}
+        html = baixar_pagina(song_url, sessao, cache, timeout=10)
+        return parse_song_details(html)
 
     except requests.exceptions.RequestException:
         return None
@@ -119,41 +192,110 @@ def main():
     
     print("--- Iniciando o scraping do Real Book Site (Melhorado) ---")
     
-    all_song_links = get_all_song_links(BASE_URL)
+    inicio_execucao = datetime.now(timezone.utc)
+    sessao = criar_sessao()
+    cache = CacheHTTP(PASTA_CACHE, TAMANHO_MAXIMO_CACHE_MB * 1024 * 1024) if USAR_CACHE else None
+    estado = descoberta_incremental.carregar_estado(ARQUIVO_ESTADO_DESCOBERTA)
+    incremental = MODO_DESCOBERTA == 'incremental' and os.path.exists(OUTPUT_FILENAME)
+
+    if incremental:
+        all_song_links, lastmods_atuais = descoberta_incremental.descobrir_links(
+            BASE_URL, estado, sessao, cache, SITEMAP
+        )
+        if not all_song_links:
+            descoberta_incremental.salvar_estado(
+                descoberta_incremental.atualizar_estado(
+                    estado, lastmods_atuais, [], {}, inicio_execucao
+                ),
+                ARQUIVO_ESTADO_DESCOBERTA,
+            )
+            print("\nNenhuma música nova ou modificada desde a última execução.")
+            return
+    else:
+        all_song_links = get_all_song_links(BASE_URL, sessao, cache)
+        lastmods_atuais = {link: None for link in all_song_links}
     
     if not all_song_links:
         print("\nNenhum link de música encontrado.")
         return
 
-    all_songs_data = []
+    jornal = JornalScrape(ARQUIVO_JORNAL)
+    arquivo_parcial = f"{OUTPUT_FILENAME}.parcial"
+    if RETOMAR:
+        concluidos = jornal.urls_concluidas()
+        if concluidos:
+            print(f"Retomando execução anterior: {len(concluidos)} músicas já processadas.")
+    else:
+        concluidos = set()
+        jornal.apagar()
+        if os.path.exists(arquivo_parcial):
+            os.remove(arquivo_parcial)
+
+    pending_links = [link for link in all_song_links if link not in concluidos]
+    escritor = EscritorCSVIncremental(arquivo_parcial, ['URL', 'Titulo', 'Ano', 'Autor'])
     failed_links = []
-    
-    for link in tqdm(all_song_links, desc="Extraindo dados das músicas"):
-        details = get_song_details(link)
+
+    def registrar(link, details):
+        # A linha vai para o CSV antes do jornal: uma URL marcada como
+        # sucesso sempre tem sua música salva.
         if details:
-            all_songs_data.append(details)
+            escritor.escrever({'URL': link, **details})
+            jornal.registrar(link, STATUS_SUCESSO)
         else:
+            jornal.registrar(link, STATUS_FALHA)
             failed_links.append(link)
-        
-        time.sleep(0.05)
 
-    if not all_songs_data:
+    try:
+        if MODO_ASSINCRONO:
+            # Importado aqui para que o modo sequencial não dependa do aiohttp
+            from scrape_assincrono import crawl_assincrono
+            crawl_assincrono(
+                pending_links, CONCORRENCIA, REQUISICOES_POR_SEGUNDO, cache=cache, ao_concluir=registrar
+            )
+        else:
+            for link in tqdm(pending_links, desc="Extraindo dados das músicas"):
+                registrar(link, get_song_details(link, sessao, cache))
+                
+                time.sleep(0.05)
+    finally:
+        escritor.fechar()
+        jornal.fechar()
+
+    chave = ['Titulo', 'Ano', 'Autor']
+    chaves_processadas = chaves_por_url(arquivo_parcial, chave)
+    # No modo incremental, as linhas antigas das músicas extraídas de novo saem do CSV
+    chaves_antigas = [
+        estado['links'][link]['chave'] for link in chaves_processadas
+        if incremental and link in estado['links'] and estado['links'][link]['chave']
+    ]
+    total_salvo = compactar_saida(
+        arquivo_parcial, OUTPUT_FILENAME, chave=chave, colunas_saida=['Titulo', 'Autor', 'Ano'],
+        anterior=OUTPUT_FILENAME if incremental else None, descartar=chaves_antigas, ordem=all_song_links,
+    )
+    if not total_salvo:
         print("\nERRO: Nenhum dado de música foi extraído.")
         return
 
-    df = pd.DataFrame(all_songs_data)
-    
-    df.drop_duplicates(subset=['Titulo', 'Ano', 'Autor'], inplace=True)
-    
-    df = df[['Titulo', 'Autor', 'Ano']]
-    
-    df.to_csv(OUTPUT_FILENAME, index=False, encoding='utf-8')
+    descoberta_incremental.salvar_estado(
+        descoberta_incremental.atualizar_estado(
+            estado, lastmods_atuais, all_song_links, chaves_processadas, inicio_execucao
+        ),
+        ARQUIVO_ESTADO_DESCOBERTA,
+    )
+    jornal.apagar()
+    os.remove(arquivo_parcial)
     
     print(f"\n--- Scraping concluído! ---")
-    print(f"-> {len(df)} músicas salvas com sucesso em '{OUTPUT_FILENAME}'.")
+    print(f"-> {total_salvo} músicas salvas com sucesso em '{OUTPUT_FILENAME}'.")
     
     if failed_links:
         print(f"-> {len(failed_links)} links não puderam ser processados (nenhum título encontrado ou erro de acesso).")
 
+    if cache is not None:
+        stats = cache.estatisticas()
+        print(f"-> Cache: {stats['acertos']} acertos ({stats['revalidados']} revalidados com 304), "
+              f"{stats['falhas']} páginas baixadas, taxa de acerto de {stats['taxa_de_acerto']:.0%}.")
+        cache.fechar()
+
 if __name__ == "__main__":
     main()
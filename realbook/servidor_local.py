@@ -0,0 +1,178 @@
+"""
+Servidor HTTP local que imita o realbook.site a partir de páginas salvas.
+
+Serve os arquivos de uma pasta (por padrão 'paginas_exemplo') mapeando as URLs
+do site para os arquivos salvos:
+    /                -> index.html
+    /alone-together/ -> alone-together.html
+A query string é ignorada, então '/alone-together/?n=3' devolve a mesma página
+(útil para gerar muitas URLs distintas em benchmarks).
+
+Uma latência artificial por requisição simula a ida e volta até o site real,
+e um limite opcional de banda (bytes/s por conexão) simula o download de
+arquivos grandes: o servidor também serve áudios (qualquer arquivo com
+extensão, como '/faixa.ogg'), de fonte local para os downloaders
+(ver benchmark_downloads.py). O tratamento de pedidos parciais (Range) é
+configurável, para simular fontes com e sem suporte a download parcial.
+As respostas levam ETag e Last-Modified e o servidor responde 304 às
+requisições condicionais, como o site real, para exercitar o cache_http.py.
+
+A pasta 'paginas_exemplo' traz páginas sintéticas com a mesma estrutura do
+site (tema WordPress, 'letter-section', 'entry-title', 'has-text-align-right').
+Para trabalhar com páginas reais, use salvar_paginas() para guardá-las na pasta.
+"""
+
+import functools
+import os
+import re
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+
+# --- CONFIGURAÇÃO ---
+PASTA_PAGINAS = 'paginas_exemplo'
+PORTA = 8000
+LATENCIA = 0.05  # segundos de espera antes de cada resposta
+
+class ManipuladorPaginasSalvas(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Permite keep-alive, como o site real
+    latencia = 0.0
+    taxa_bytes = None  # bytes/s por conexão (None = sem limite)
+    # Pedidos parciais (cabeçalho Range): 'ignorado' (responde o arquivo
+    # inteiro), 'suportado' (responde 206 com o trecho) ou 'recusado' (416)
+    modo_range = 'ignorado'
+
+    def translate_path(self, path):
+        caminho = urlsplit(path).path.strip('/')
+        if not caminho:
+            caminho = 'index.html'
+        elif '.' not in os.path.basename(caminho):
+            caminho = f"{caminho}.html"
+        return super().translate_path('/' + caminho)
+
+    def _etag(self):
+        try:
+            info = os.stat(self.translate_path(self.path))
+        except OSError:
+            return None
+        return f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+
+    def do_GET(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+        self.etag_atual = self._etag()
+        if self.etag_atual and self.headers.get('If-None-Match') == self.etag_atual:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if 'Range' in self.headers and self.modo_range == 'recusado':
+            self.send_error(416, "Pedidos parciais não são aceitos")
+            return
+        if 'Range' in self.headers and self.modo_range == 'suportado':
+            caminho = self.translate_path(self.path)
+            intervalo = self._intervalo_pedido(caminho)
+            if intervalo:
+                self._enviar_parcial(caminho, *intervalo)
+                return
+        super().do_GET()
+
+    def _intervalo_pedido(self, caminho):
+        """(início, fim) do cabeçalho 'Range: bytes=a-b', ou None se inválido."""
+        pedido = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', '').strip())
+        if not pedido or not os.path.isfile(caminho) or not any(pedido.groups()):
+            return None
+        tamanho = os.path.getsize(caminho)
+        if pedido.group(1):
+            inicio = int(pedido.group(1))
+            fim = min(int(pedido.group(2)), tamanho - 1) if pedido.group(2) else tamanho - 1
+        else:  # 'bytes=-N': os últimos N bytes
+            inicio, fim = max(0, tamanho - int(pedido.group(2))), tamanho - 1
+        return (inicio, fim) if inicio <= fim else None
+
+    def _enviar_parcial(self, caminho, inicio, fim):
+        with open(caminho, 'rb') as f:
+            self.send_response(206)
+            self.send_header('Content-Type', self.guess_type(caminho))
+            self.send_header('Content-Range', f'bytes {inicio}-{fim}/{os.path.getsize(caminho)}')
+            self.send_header('Content-Length', str(fim - inicio + 1))
+            self.end_headers()
+            f.seek(inicio)
+            self._copiar(f, self.wfile, limite=fim - inicio + 1)
+
+    def _copiar(self, source, outputfile, limite=None):
+        tamanho_bloco = 64 * 1024
+        try:
+            while limite is None or limite > 0:
+                bloco = source.read(tamanho_bloco if limite is None else min(tamanho_bloco, limite))
+                if not bloco:
+                    break
+                outputfile.write(bloco)
+                with self.server.trava_contagem:
+                    self.server.bytes_enviados += len(bloco)
+                if limite is not None:
+                    limite -= len(bloco)
+                if self.taxa_bytes:
+                    time.sleep(len(bloco) / self.taxa_bytes)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # O cliente desistiu no meio (ex.: só queria o começo do arquivo)
+
+    def copyfile(self, source, outputfile):
+        self._copiar(source, outputfile)
+
+    def end_headers(self):
+        if getattr(self, 'etag_atual', None):
+            self.send_header('ETag', self.etag_atual)
+        if self.modo_range == 'suportado':
+            self.send_header('Accept-Ranges', 'bytes')
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def iniciar_servidor(pasta=PASTA_PAGINAS, porta=0, latencia=0.0, taxa_bytes=None, modo_range='ignorado'):
+    """
+    Sobe o servidor numa thread em segundo plano.
+    Retorna (servidor, url_base); use servidor.shutdown() para parar.
+    Com porta=0 o sistema escolhe uma porta livre. servidor.bytes_enviados
+    conta os bytes de corpo enviados desde o início.
+    """
+    manipulador = type('Manipulador', (ManipuladorPaginasSalvas,),
+                       {'latencia': latencia, 'taxa_bytes': taxa_bytes, 'modo_range': modo_range})
+    servidor = ThreadingHTTPServer(('127.0.0.1', porta), functools.partial(manipulador, directory=pasta))
+    servidor.daemon_threads = True
+    servidor.bytes_enviados = 0
+    servidor.trava_contagem = threading.Lock()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    return servidor, url_base
+
+def nome_arquivo_da_url(url):
+    """Converte a URL de uma página no nome do arquivo salvo (inverso do servidor)."""
+    caminho = urlsplit(url).path.strip('/')
+    return 'index.html' if not caminho else f"{caminho.replace('/', '_')}.html"
+
+def salvar_paginas(urls, pasta=PASTA_PAGINAS):
+    """Baixa e salva páginas do site real, para montar um corpus local."""
+    os.makedirs(pasta, exist_ok=True)
+    with requests.Session() as sessao:
+        for url in urls:
+            try:
+                resposta = sessao.get(url, timeout=10)
+                resposta.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                print(f"Erro ao salvar {url}: {e}")
+                continue
+            with open(os.path.join(pasta, nome_arquivo_da_url(url)), 'w', encoding='utf-8') as f:
+                f.write(resposta.text)
+
+if __name__ == "__main__":
+    servidor, url_base = iniciar_servidor(PASTA_PAGINAS, PORTA, LATENCIA)
+    print(f"Servindo '{PASTA_PAGINAS}' em {url_base} (latência de {LATENCIA}s). Ctrl-C para parar.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
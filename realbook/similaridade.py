@@ -0,0 +1,263 @@
+"""
+Similaridade entre a música buscada e o título do vídeo, e escolha do
+melhor candidato da busca antes do download.
+
+Antes, a busca pegava o primeiro resultado (limit=1), o downloader baixava
+e convertia tudo e só depois o realbook.ipynb calculava a similaridade
+(thefuzz.token_set_ratio das strings limpas) e descartava o que ficava
+abaixo de 85. Aqui a mesma medida é usada na hora da busca: os
+CANDIDATOS_BUSCA primeiros resultados são pontuados, só os que passam de
+LIMIAR_SIMILARIDADE podem ser escolhidos, e entre esses ganha o de maior
+nota (similaridade mais os ajustes de duração e de canal). Se nenhum passa,
+nada é baixado.
+
+limpar_string() é a do notebook, com duas correções: as palavras de vídeo
+('live', 'hd', 'video'...) só são removidas como palavras inteiras (no
+notebook, 'live' sumia de dentro de 'oliver'), e os acentos das letras
+latinas são removidos ('Bonfá' = 'Bonfa'), assim como o 'ё' cirílico vira
+'е' ('Пётр' = 'Петр'); as demais letras cirílicas (inclusive o 'й') ficam
+como estão. A pontuação é a do rapidfuzz (a mesma biblioteca que o thefuzz
+usa por baixo).
+
+Para muitos pares de uma vez (o relatório inteiro, várias músicas contra
+vários títulos, a lista da Billboard contra os arquivos baixados), use as
+funções em lote: normalizar_lote() limpa cada string distinta uma vez só,
+e similaridades_pareadas() / matriz_similaridade() calculam as pontuações no
+código em C do rapidfuzz (cpdist/cdist), em todos os núcleos, descartando
+(zerando) as abaixo do limiar. melhores_correspondencias() dá o melhor título
+de cada consulta, em blocos de linhas para não montar a matriz inteira.
+
+Também pode ser usado pela linha de comando (python similaridade.py --help):
+- pares: pontua duas colunas de um CSV, linha a linha (o que o notebook
+  fazia para gerar o musicas_com_boa_similaridade.csv);
+- melhores: o melhor título de um CSV para cada linha de outro.
+Veja benchmark_similaridade.py para as medições.
+
+Dependências:
+- rapidfuzz
+- numpy, pandas
+(Instale com: pip install rapidfuzz numpy pandas)
+"""
+
+import argparse
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+LIMIAR_SIMILARIDADE = 85   # mesmo corte do realbook.ipynb
+CANDIDATOS_BUSCA = 5       # resultados da busca pontuados por música
+
+# Ajustes na nota (só mudam a ordem entre os candidatos acima do limiar)
+DURACAO_MINIMA = 60        # segundos; abaixo disso é trecho/short
+DURACAO_MAXIMA = 15 * 60   # acima disso é álbum/compilação
+AJUSTE_DURACAO = -15
+AJUSTE_CANAL_OFICIAL = 5   # canais "Artista - Topic" (áudio oficial) e VEVO
+AJUSTE_CANAL_DO_ARTISTA = 5
+PALAVRAS_PENALIZADAS = ('karaoke', 'tutorial', 'lesson', 'aula', 'reaction', 'cover')
+AJUSTE_PALAVRA_PENALIZADA = -10
+# Só palavras inteiras: 'aula' não está em 'Paula', nem 'cover' em 'Discover'
+_PADROES_PENALIZADOS = tuple(re.compile(rf'\b{palavra}\b') for palavra in PALAVRAS_PENALIZADAS)
+
+PALAVRAS_PARA_REMOVER = [
+    'official', 'video', 'audio', 'lyric', 'lyrics', 'hd', '4k',
+    'remastered', 'clipe', 'oficial', 'full', 'album', 'hq', 'live',
+]
+_PADRAO_REMOVER = re.compile(r'\[.*?\]|\(.*?\)|\b(?:' + '|'.join(PALAVRAS_PARA_REMOVER) + r')\b')
+_ACENTOS_LATINOS = re.compile(r'(?<=[a-z])[\u0300-\u036f]+')
+_PONTUACAO = re.compile(r'[^\w\s]')
+
+# Núcleos usados pelo rapidfuzz nas funções em lote (-1 = todos)
+NUCLEOS = -1
+LINHAS_POR_BLOCO = 1000  # linhas da matriz calculadas de cada vez em melhores_correspondencias
+
+def remover_acentos(texto):
+    """Tira os acentos das letras latinas e troca 'ё' por 'е'; o resto do texto não muda."""
+    texto = _ACENTOS_LATINOS.sub('', unicodedata.normalize('NFKD', texto))
+    return unicodedata.normalize('NFC', texto).replace('ё', 'е')
+
+def limpar_string(texto):
+    """
+    Pré-processa as strings antes da comparação (funciona com qualquer
+    alfabeto, ex: Cirílico): minúsculas, sem palavras de vídeo, sem o que
+    está entre parênteses/colchetes, sem acentos e sem pontuação.
+    """
+    if not isinstance(texto, str):
+        return ""
+    texto = remover_acentos(_PADRAO_REMOVER.sub('', texto.lower()))
+    texto = _PONTUACAO.sub('', texto)
+    return ' '.join(texto.split())
+
+def similaridade(musica_buscada, titulo_video):
+    """token_set_ratio (0-100, inteiro) entre as duas strings limpas, como no notebook."""
+    return int(round(fuzz.token_set_ratio(limpar_string(musica_buscada), limpar_string(titulo_video))))
+
+def duracao_em_segundos(duracao):
+    """'4:13' ou '1:02:03' -> segundos; None se não houver (ex: transmissões ao vivo)."""
+    if not duracao:
+        return None
+    try:
+        segundos = 0
+        for parte in str(duracao).split(':'):
+            segundos = segundos * 60 + int(parte)
+        return segundos
+    except ValueError:
+        return None
+
+def nota_do_candidato(musica_buscada, candidato, artista=None):
+    """
+    Similaridade do título e nota com os ajustes de duração, canal e
+    palavras penalizadas. `candidato` é um dicionário com 'titulo' e,
+    opcionalmente, 'duracao' (segundos) e 'canal'. Retorna (similaridade, nota).
+    """
+    valor = similaridade(musica_buscada, candidato['titulo'])
+    nota = valor
+    duracao = candidato.get('duracao')
+    if duracao is not None and not DURACAO_MINIMA <= duracao <= DURACAO_MAXIMA:
+        nota += AJUSTE_DURACAO
+    canal = candidato.get('canal') or ''
+    if canal.endswith(' - Topic') or 'vevo' in canal.lower():
+        nota += AJUSTE_CANAL_OFICIAL
+    if artista and canal and fuzz.partial_ratio(limpar_string(artista), limpar_string(canal)) >= LIMIAR_SIMILARIDADE:
+        nota += AJUSTE_CANAL_DO_ARTISTA
+    titulo, buscada = candidato['titulo'].lower(), musica_buscada.lower()
+    if any(padrao.search(titulo) and not padrao.search(buscada) for padrao in _PADROES_PENALIZADOS):
+        nota += AJUSTE_PALAVRA_PENALIZADA
+    return valor, nota
+
+def escolher_candidato(musica_buscada, candidatos, artista=None, limiar=LIMIAR_SIMILARIDADE):
+    """
+    Entre os candidatos com similaridade >= `limiar`, o de maior nota.
+    Retorna (candidato, similaridade), ou (None, maior similaridade vista)
+    se nenhum passar do limiar.
+    """
+    melhor, melhor_nota, melhor_valor, maior_similaridade = None, None, 0, 0
+    for candidato in candidatos:
+        valor, nota = nota_do_candidato(musica_buscada, candidato, artista)
+        maior_similaridade = max(maior_similaridade, valor)
+        if valor >= limiar and (melhor_nota is None or nota > melhor_nota):
+            melhor, melhor_nota, melhor_valor = candidato, nota, valor
+    return (melhor, melhor_valor) if melhor is not None else (None, maior_similaridade)
+
+# ===================================================================
+# --- EM LOTE ---
+# ===================================================================
+
+def normalizar_lote(textos):
+    """limpar_string() de cada texto, calculando cada string distinta uma vez só."""
+    textos = list(textos)
+    limpos = {texto: limpar_string(texto) for texto in dict.fromkeys(t for t in textos if isinstance(t, str))}
+    return [limpos.get(texto, "") if isinstance(texto, str) else "" for texto in textos]
+
+def _arredondar(pontuacoes, limiar=0):
+    # Inteiros como os do thefuzz (int(round(x)); o np.rint também arredonda .5 para o par), com 0 nos
+    # que ficaram abaixo de `limiar` depois de arredondados
+    inteiras = np.rint(pontuacoes).astype(np.uint8)
+    if limiar:
+        inteiras[inteiras < limiar] = 0
+    return inteiras
+
+def _corte(limiar):
+    """score_cutoff do rapidfuzz para `limiar`: a nota sem arredondar de quem arredonda para o limiar (84,6 -> 85)."""
+    return limiar - 0.5 if limiar else None
+
+def similaridades_pareadas(buscas, titulos, nucleos=NUCLEOS, scorer=fuzz.token_set_ratio):
+    """Similaridade de cada busca com o título da mesma posição (como similaridade(), para vários pares)."""
+    return _arredondar(process.cpdist(normalizar_lote(buscas), normalizar_lote(titulos), scorer=scorer,
+                                      processor=None, workers=nucleos, dtype=np.float32))
+
+def matriz_similaridade(consultas, titulos, limiar=0, nucleos=NUCLEOS, scorer=fuzz.token_set_ratio,
+                        normalizar=normalizar_lote):
+    """
+    Matriz (consultas x títulos) de similaridades inteiras. As abaixo de
+    `limiar` viram 0 (e o rapidfuzz para de calcular cada uma assim que ela
+    não tem como chegar ao limiar). `normalizar` recebe a lista de strings e
+    devolve as strings limpas.
+    """
+    return _arredondar(process.cdist(normalizar(consultas), normalizar(titulos), scorer=scorer, processor=None,
+                                     score_cutoff=_corte(limiar), workers=nucleos, dtype=np.float32), limiar)
+
+def melhores_correspondencias(consultas, titulos, limiar=LIMIAR_SIMILARIDADE, nucleos=NUCLEOS,
+                              scorer=fuzz.token_set_ratio, normalizar=normalizar_lote,
+                              linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Para cada consulta, o título mais parecido com similaridade >= `limiar`.
+    Retorna um DataFrame com 'consulta', 'indice_titulo', 'titulo' e
+    'similaridade' (índice e título vazios quando nenhum passa do limiar).
+    """
+    consultas, titulos = list(consultas), list(titulos)
+    limpas, titulos_limpos = normalizar(consultas), normalizar(titulos)
+    indices = np.full(len(consultas), -1)
+    melhores = np.zeros(len(consultas), dtype=np.uint8)
+    for inicio in range(0, len(consultas), linhas_por_bloco):
+        bloco = _arredondar(process.cdist(limpas[inicio:inicio + linhas_por_bloco], titulos_limpos, scorer=scorer,
+                                          processor=None, score_cutoff=_corte(limiar), workers=nucleos,
+                                          dtype=np.float32), limiar)
+        if not bloco.size:
+            continue
+        fim = inicio + len(bloco)
+        indices[inicio:fim] = bloco.argmax(axis=1)
+        melhores[inicio:fim] = bloco.max(axis=1)
+    encontrados = melhores >= max(limiar, 1)
+    return pd.DataFrame({
+        'consulta': consultas,
+        'indice_titulo': pd.Series(indices).where(encontrados).astype('Int64'),
+        'titulo': [titulos[i] if ok else None for i, ok in zip(indices, encontrados)],
+        'similaridade': melhores,
+    })
+
+# ===================================================================
+# --- LINHA DE COMANDO ---
+# ===================================================================
+
+def _comando_pares(args):
+    df = pd.read_csv(args.entrada, encoding='utf-8')
+    df['busca_limpa'] = normalizar_lote(df[args.coluna_busca])
+    df['titulo_limpo'] = normalizar_lote(df[args.coluna_titulo])
+    df['similaridade'] = similaridades_pareadas(df[args.coluna_busca], df[args.coluna_titulo], args.nucleos)
+    if args.limiar:
+        df = df[df['similaridade'] >= args.limiar]
+    df.to_csv(args.saida, index=False, encoding='utf-8')
+    print(f"{len(df)} linhas salvas em '{args.saida}'")
+
+def _comando_melhores(args):
+    consultas = pd.read_csv(args.consultas, encoding='utf-8')
+    titulos = pd.read_csv(args.titulos, encoding='utf-8')
+    textos_consultas = consultas[args.colunas_consulta].fillna('').astype(str).agg(' '.join, axis=1)
+    resultado = melhores_correspondencias(textos_consultas, titulos[args.coluna_titulo], args.limiar, args.nucleos)
+    saida = pd.concat([consultas.reset_index(drop=True),
+                       resultado[['titulo', 'similaridade']].rename(columns={'titulo': 'melhor_titulo'})], axis=1)
+    saida.to_csv(args.saida, index=False, encoding='utf-8')
+    print(f"{resultado['titulo'].notna().sum()} de {len(resultado)} consultas com um título acima de "
+          f"{args.limiar}; salvo em '{args.saida}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Similaridade entre músicas buscadas e títulos de vídeos.")
+    parser.add_argument('--nucleos', type=int, default=NUCLEOS, help="núcleos usados (-1 = todos)")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+
+    pares = subcomandos.add_parser('pares', help="pontua duas colunas de um CSV, linha a linha")
+    pares.add_argument('entrada')
+    pares.add_argument('saida')
+    pares.add_argument('--coluna-busca', default='musica_buscada')
+    pares.add_argument('--coluna-titulo', default='titulo_video_encontrado')
+    pares.add_argument('--limiar', type=int, default=0, help="mantém só as linhas com similaridade >= limiar")
+    pares.set_defaults(funcao=_comando_pares)
+
+    melhores = subcomandos.add_parser('melhores', help="o melhor título de um CSV para cada linha de outro")
+    melhores.add_argument('consultas')
+    melhores.add_argument('titulos')
+    melhores.add_argument('saida')
+    melhores.add_argument('--colunas-consulta', nargs='+', default=['Titulo', 'Autor'],
+                          help="colunas juntadas (com espaço) para formar a consulta")
+    melhores.add_argument('--coluna-titulo', default='title')
+    melhores.add_argument('--limiar', type=int, default=LIMIAR_SIMILARIDADE)
+    melhores.set_defaults(funcao=_comando_melhores)
+
+    args = parser.parse_args()
+    args.funcao(args)
+
+if __name__ == "__main__":
+    main()
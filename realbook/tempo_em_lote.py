@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Estimativa de BPM (e batidas) de muitos clipes curtos de uma vez.
+
+Com milhares de clipes de 40 s, o custo por chamada do librosa (uma STFT, um
+tempograma e uma estimativa de tempo por arquivo) pesa mais que a conta em
+si. Aqui os clipes são processados em lotes:
+
+1. os áudios do lote são empilhados num array 2-D (um clipe por linha,
+   completado com zeros); a STFT de todos é feita de uma vez, em float32 e
+   com scipy.fft (em várias threads), e o envelope de onset sai do
+   espectrograma mel como em onset_strength;
+2. o tempograma de autocorrelação de todos os clipes é calculado com NumPy
+   vetorizado (janelas deslizantes + FFT sobre o lote inteiro), e o BPM de
+   cada clipe sai da média do tempograma, com o mesmo prior log-normal de
+   librosa.feature.tempo;
+3. só quando as batidas são pedidas (CALCULAR_BATIDAS) a programação
+   dinâmica de beat_track roda, clipe a clipe, já com o BPM estimado.
+
+Com CALCULAR_BATIDAS = False ("só BPM"), o resultado vai para um CSV, para
+triagem do conjunto de dados. Com as batidas, vai para o armazém
+(armazem_batidas.py), como em extrair_batidas.py.
+
+A precisão em relação ao beat_track e a vazão são medidas em
+benchmark_batidas.py, com um conjunto de clipes de cliques sintéticos.
+
+Dependências:
+- librosa
+- numpy
+(Instale com: pip install librosa numpy)
+"""
+
+import csv
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cache_analise import chave_da_analise
+from manifesto_audios import CAMINHO_BANCO as CAMINHO_MANIFESTO, ManifestoAudios
+
+# ===================================================================
+# --- CONFIGURAÇÃO ---
+# ===================================================================
+
+PASTA_DE_AUDIOS = "musicas_com_boa_similaridade"
+ARQUIVO_CSV_BPM = "resultados_batidas/bpm_em_lote.csv"
+PASTA_ARMAZEM = "resultados_batidas/armazem"
+EXTENSOES_ANALISADAS = ('.mp3', '.wav', '.ogg', '.flac')
+
+# False = só BPM (triagem rápida); True = também os tempos das batidas
+CALCULAR_BATIDAS = False
+CLIPES_POR_LOTE = 64
+# Clipes por bloco na STFT e no tempograma (cada clipe usa quadros x janela floats)
+CLIPES_POR_BLOCO_STFT = 8
+CLIPES_POR_BLOCO_TEMPOGRAMA = 16
+# O BPM sai da média do tempograma no tempo; como janelas vizinhas (de 8 s)
+# quase se sobrepõem por inteiro, basta uma coluna a cada PASSO_TEMPOGRAMA
+# quadros (1 = todas, exatamente como o librosa).
+PASSO_TEMPOGRAMA = 8
+
+# Threads usadas nas FFTs do lote
+TRABALHADORES_FFT = os.cpu_count() or 1
+
+SR_ANALISE = 22050
+DURACAO_MAXIMA = 40
+N_FFT = 2048
+HOP_LENGTH = 512
+AC_SIZE = 8.0         # janela da autocorrelação, em segundos (como no librosa)
+START_BPM = 120.0     # centro do prior log-normal
+STD_BPM = 1.0         # desvio do prior, em oitavas
+MAX_TEMPO = 320.0
+
+# ===================================================================
+# --- ENVELOPES DE ONSET ---
+# ===================================================================
+
+def potencia_para_db_por_clipe(mel, amin=1e-10, top_db=80.0):
+    """
+    librosa.power_to_db (ref=1.0) de um bloco (clipes, bandas, quadros), mas
+    com o piso de `top_db` tirado do máximo de cada clipe, e não do bloco
+    inteiro: assim o envelope de um clipe não depende dos outros do lote.
+    """
+    db = 10.0 * np.log10(np.maximum(amin, mel))
+    return np.maximum(db, db.max(axis=(-2, -1), keepdims=True) - top_db)
+
+def envelopes_de_onset(caminhos, sr=SR_ANALISE, duracao=DURACAO_MAXIMA, hop_length=HOP_LENGTH):
+    """
+    Decodifica os clipes e calcula o envelope de onset de todos numa chamada.
+
+    Retorna (envelopes, quadros_validos, duracoes, erros): `envelopes` tem
+    uma linha por clipe carregado, com zeros depois de `quadros_validos[i]`;
+    `erros` é {caminho: mensagem} dos que não puderam ser carregados (e que
+    ficam fora das linhas).
+    """
+    sinais = []
+    erros = {}
+    for caminho in caminhos:
+        try:
+            y, _ = librosa.load(caminho, sr=sr, duration=duracao)
+        except Exception as e:
+            erros[caminho] = f"{type(e).__name__}: {e}"
+            continue
+        sinais.append(y)
+    if not sinais:
+        return np.zeros((0, 0)), np.zeros(0, dtype=int), np.zeros(0), erros
+
+    amostras = np.array([len(y) for y in sinais])
+    # Mesmo enquadramento de librosa.stft (center=True, borda com zeros)
+    lote = np.zeros((len(sinais), amostras.max() + 2 * (N_FFT // 2)), dtype=np.float32)
+    for i, y in enumerate(sinais):
+        lote[i, N_FFT // 2:N_FFT // 2 + len(y)] = y
+    janela = librosa.filters.get_window('hann', N_FFT, fftbins=True).astype(np.float32)
+    filtro_mel = librosa.filters.mel(sr=sr, n_fft=N_FFT).astype(np.float32)
+
+    envelopes = []
+    for inicio in range(0, len(sinais), CLIPES_POR_BLOCO_STFT):
+        quadros = sliding_window_view(lote[inicio:inicio + CLIPES_POR_BLOCO_STFT], N_FFT, axis=-1)[:, ::hop_length]
+        espectro = scipy.fft.rfft(quadros * janela, axis=-1, workers=TRABALHADORES_FFT)
+        mel = np.abs(espectro) ** 2 @ filtro_mel.T
+        envelopes.append(librosa.onset.onset_strength(
+            S=potencia_para_db_por_clipe(np.swapaxes(mel, -1, -2)), sr=sr, hop_length=hop_length))
+    quadros_validos = 1 + amostras // hop_length
+    return np.concatenate(envelopes), quadros_validos, amostras / sr, erros
+
+# ===================================================================
+# --- TEMPOGRAMA E BPM VETORIZADOS ---
+# ===================================================================
+
+def tempograma_medio(envelopes, quadros_validos, win_length, passo=PASSO_TEMPOGRAMA):
+    """
+    Média no tempo do tempograma de autocorrelação de cada clipe, como
+    librosa.feature.tempogram (janela de Hann, centralizada, cada coluna
+    normalizada pelo máximo), mas para o lote inteiro de uma vez e só com
+    uma coluna a cada `passo` quadros.
+    Retorna um array (clipes, win_length).
+    """
+    num_clipes, num_quadros = envelopes.shape
+    janela = librosa.filters.get_window('hann', win_length, fftbins=True).astype(np.float32)
+    meio = win_length // 2
+    medias = np.zeros((num_clipes, win_length))
+
+    for inicio in range(0, num_clipes, CLIPES_POR_BLOCO_TEMPOGRAMA):
+        validos = quadros_validos[inicio:inicio + CLIPES_POR_BLOCO_TEMPOGRAMA]
+        # Mesma borda do librosa: rampa linear até zero antes e depois da
+        # parte válida de cada clipe
+        bloco = np.zeros((len(validos), num_quadros + 2 * meio), dtype=np.float32)
+        for i, n in enumerate(validos):
+            bloco[i, :n + 2 * meio] = np.pad(envelopes[inicio + i, :n], meio, mode='linear_ramp')
+
+        colunas = np.arange(0, num_quadros, passo)
+        quadros = sliding_window_view(bloco, win_length, axis=-1)[:, colunas] * janela
+        espectro = scipy.fft.rfft(quadros, n=2 * win_length, axis=-1, workers=TRABALHADORES_FFT)
+        autocorrelacao = scipy.fft.irfft(np.abs(espectro) ** 2, n=2 * win_length, axis=-1,
+                                         workers=TRABALHADORES_FFT)[..., :win_length]
+        maximos = np.abs(autocorrelacao).max(axis=-1, keepdims=True)
+        autocorrelacao /= np.where(maximos > np.finfo(np.float32).tiny, maximos, 1.0)
+
+        mascara = colunas[np.newaxis, :] < validos[:, np.newaxis]
+        soma = (autocorrelacao * mascara[..., np.newaxis]).sum(axis=1)
+        medias[inicio:inicio + len(validos)] = soma / np.maximum(mascara.sum(axis=1), 1)[:, np.newaxis]
+    return medias
+
+def bpm_do_tempograma(tempogramas, sr=SR_ANALISE, hop_length=HOP_LENGTH,
+                      start_bpm=START_BPM, std_bpm=STD_BPM, max_tempo=MAX_TEMPO):
+    """BPM de cada linha de `tempogramas` (clipes, win_length), com o prior de librosa.feature.tempo."""
+    bpms = librosa.tempo_frequencies(tempogramas.shape[-1], hop_length=hop_length, sr=sr)
+    with np.errstate(divide='ignore'):
+        log_prior = -0.5 * ((np.log2(bpms) - np.log2(start_bpm)) / std_bpm) ** 2
+    if max_tempo is not None:
+        log_prior[:int(np.argmax(bpms < max_tempo))] = -np.inf
+    melhor_periodo = np.argmax(np.log1p(1e6 * tempogramas) + log_prior, axis=-1)
+    return bpms[melhor_periodo]
+
+def estimar_bpm_em_lote(envelopes, quadros_validos, sr=SR_ANALISE, hop_length=HOP_LENGTH):
+    win_length = int(librosa.time_to_frames(AC_SIZE, sr=sr, hop_length=hop_length))
+    return bpm_do_tempograma(tempograma_medio(envelopes, quadros_validos, win_length), sr, hop_length)
+
+# ===================================================================
+# --- ANÁLISE DE UM LOTE ---
+# ===================================================================
+
+def analisar_lote(caminhos, calcular_batidas=CALCULAR_BATIDAS):
+    """
+    Retorna {caminho: (bpm, tempos_das_batidas, duracao)} dos clipes do lote
+    (tempos é None no modo só BPM) e {caminho: erro} dos que falharam.
+    """
+    envelopes, quadros_validos, duracoes, erros = envelopes_de_onset(caminhos)
+    carregados = [caminho for caminho in caminhos if caminho not in erros]
+    if not carregados:
+        return {}, erros
+    bpms = estimar_bpm_em_lote(envelopes, quadros_validos)
+
+    resultados = {}
+    for i, caminho in enumerate(carregados):
+        tempos = None
+        if calcular_batidas:
+            # A programação dinâmica recebe o BPM do lote e pula a estimativa
+            _, quadros = librosa.beat.beat_track(
+                onset_envelope=envelopes[i, :quadros_validos[i]], sr=SR_ANALISE,
+                hop_length=HOP_LENGTH, bpm=bpms[i])
+            tempos = librosa.frames_to_time(quadros, sr=SR_ANALISE, hop_length=HOP_LENGTH)
+        resultados[caminho] = (float(bpms[i]), tempos, float(duracoes[i]))
+    return resultados, erros
+
+def analisar_em_lotes(caminhos, calcular_batidas=CALCULAR_BATIDAS, ao_concluir=None):
+    """
+    Processa `caminhos` em lotes de CLIPES_POR_LOTE. Chama
+    ao_concluir(caminho, bpm, tempos, duracao, erro) para cada clipe.
+    """
+    for inicio in range(0, len(caminhos), CLIPES_POR_LOTE):
+        lote = caminhos[inicio:inicio + CLIPES_POR_LOTE]
+        resultados, erros = analisar_lote(lote, calcular_batidas)
+        for caminho in lote:
+            if caminho in resultados:
+                ao_concluir(caminho, *resultados[caminho], None)
+            else:
+                ao_concluir(caminho, None, None, 0.0, erros.get(caminho))
+
+# ===================================================================
+# --- LÓGICA PRINCIPAL (MAIN) ---
+# ===================================================================
+
+def parametros_da_analise():
+    """
+    Parâmetros que mudam o resultado da análise em lote. Fazem parte da
+    chave do cache (ver cache_analise.py), como em extrair_batidas.py; o
+    'metodo' separa estes resultados dos da análise arquivo a arquivo.
+    """
+    return {
+        'metodo': 'lote',
+        'sr': SR_ANALISE,
+        'hop_length': HOP_LENGTH,
+        'n_fft': N_FFT,
+        'duracao_maxima': DURACAO_MAXIMA,
+        'ac_size': AC_SIZE,
+        'start_bpm': START_BPM,
+        'std_bpm': STD_BPM,
+        'max_tempo': MAX_TEMPO,
+        'passo_tempograma': PASSO_TEMPOGRAMA,
+        'librosa': librosa.__version__,
+    }
+
+def main():
+    if not os.path.isdir(PASTA_DE_AUDIOS):
+        print(f"ERRO: Pasta de áudios não encontrada em '{PASTA_DE_AUDIOS}'")
+        sys.exit(1)
+
+    manifesto = ManifestoAudios(CAMINHO_MANIFESTO)
+    manifesto.atualizar(PASTA_DE_AUDIOS, recursivo=False)
+    hashes = {linha['caminho']: linha['hash']
+              for linha in manifesto.arquivos(pasta=PASTA_DE_AUDIOS, extensoes=EXTENSOES_ANALISADAS)}
+    manifesto.fechar()
+    caminhos = sorted(hashes)
+    modo = "BPM e batidas" if CALCULAR_BATIDAS else "só BPM"
+    print(f"Encontrados {len(caminhos)} arquivos de áudio. Modo: {modo}, lotes de {CLIPES_POR_LOTE}.")
+
+    falhas = []
+    inicio = time.perf_counter()
+    if CALCULAR_BATIDAS:
+        from armazem_batidas import ArmazemBatidas
+        armazem = ArmazemBatidas(PASTA_ARMAZEM)
+        parametros = parametros_da_analise()
+        chaves = {caminho: chave_da_analise(hashes[caminho], parametros) for caminho in caminhos}
+
+        # Como em extrair_batidas.py: o que já está no armazém com a mesma
+        # chave não é reanalisado, e o mesmo áudio com outro nome reaproveita
+        # o resultado.
+        pendentes = []
+        copias = {}  # chave -> outros arquivos com o mesmo áudio de um arquivo pendente
+        for caminho in caminhos:
+            nome_arquivo, chave = os.path.basename(caminho), chaves[caminho]
+            if armazem.obter_por_chave(chave) is not None:
+                if not (nome_arquivo in armazem and armazem.obter(nome_arquivo)[2].get('chave') == chave):
+                    armazem.duplicar(chave, nome_arquivo, origem=PASTA_DE_AUDIOS)
+            elif chave in copias:
+                copias[chave].append(nome_arquivo)
+            else:
+                copias[chave] = []
+                pendentes.append(caminho)
+        print(f"{len(caminhos) - len(pendentes)} arquivos já analisados (ou cópias de outros), pulando.")
+        caminhos = pendentes
+
+        def ao_concluir(caminho, bpm, tempos, duracao, erro):
+            if erro is not None or bpm is None:
+                falhas.append((caminho, erro))
+                return
+            chave = chaves[caminho]
+            armazem.acrescentar(os.path.basename(caminho), bpm, tempos, duracao, origem=PASTA_DE_AUDIOS, chave=chave)
+            for copia in copias[chave]:
+                armazem.duplicar(chave, copia, origem=PASTA_DE_AUDIOS)
+
+        analisar_em_lotes(caminhos, True, ao_concluir)
+        print(f"Resultados acrescentados ao armazém: {PASTA_ARMAZEM}")
+    else:
+        os.makedirs(os.path.dirname(ARQUIVO_CSV_BPM) or '.', exist_ok=True)
+        with open(ARQUIVO_CSV_BPM, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(['Arquivo', 'BPM', 'Duracao'])
+
+            def ao_concluir(caminho, bpm, tempos, duracao, erro):
+                if erro is not None or bpm is None:
+                    falhas.append((caminho, erro))
+                    return
+                escritor.writerow([os.path.basename(caminho), f"{bpm:.2f}", f"{duracao:.2f}"])
+
+            analisar_em_lotes(caminhos, False, ao_concluir)
+        print(f"BPMs salvos em: {ARQUIVO_CSV_BPM}")
+
+    duracao_total = time.perf_counter() - inicio
+    for caminho, erro in falhas:
+        print(f"Não foi possível analisar o arquivo: {caminho} ({erro})")
+    if duracao_total > 0:
+        print(f"{len(caminhos) - len(falhas)} arquivos em {duracao_total:.1f} s "
+              f"({len(caminhos) / duracao_total:.1f} arquivos/s)")
+
+if __name__ == "__main__":
+    main()